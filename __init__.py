@@ -42,7 +42,7 @@ from bpy.types import WindowManager, Object, Scene, Material
 from bpy.utils import register_class, unregister_class
 
 # Module imports
-from .functions.brick import get_legal_brick_sizes
+from .functions.brick import get_legal_brick_sizes, get_legal_brick_size_masks
 from .functions.common import b280, make_annotations
 from .functions.app_handlers import *
 from .functions.timers import register_bricker_timers, handle_selections, handle_undo_stack
@@ -50,6 +50,8 @@ from .functions.property_callbacks import select_source_model
 from .lib import keymaps, classes_to_register
 from .lib.property_groups import BRICKER_UL_collections_tuple, CreatedModelProperties
 from .lib.mat_properties import mat_properties
+from .subtrees.background_processing.classes.progress_server import ProgressServer
+from .subtrees.background_processing.classes.worker_pool import WorkerPool
 
 # store keymaps here to access after registration
 addon_keymaps = []
@@ -69,7 +71,7 @@ def register():
     bpy.props.bricker_last_selected = []
     bpy.props.bricker_trans_and_anim_data = []
     bpy.props.manual_cmlist_update = False
-    bpy.props.bfm_cache_bytes_hex = None
+    bpy.props.bfm_cache_arrays = None
     bpy.props.abs_mat_properties = mat_properties  # duplicate from ABS Plastic Mats, necessary for exporting to ldraw from non-abs mats
 
     Object.protected = BoolProperty(
@@ -112,6 +114,7 @@ def register():
 
     # define legal brick sizes (key:height, val:[width,depth])
     bpy.props.bricker_legal_brick_sizes = get_legal_brick_sizes()
+    bpy.props.bricker_legal_brick_size_masks = get_legal_brick_size_masks(bpy.props.bricker_legal_brick_sizes)
 
     # Add attribute for Bricker Instructions addon
     Scene.is_bricker_installed = BoolProperty(default=True)
@@ -177,6 +180,10 @@ def unregister():
         bpy.app.handlers.scene_update_pre.remove(handle_selections)
     bpy.app.handlers.frame_change_post.remove(handle_animation)
 
+    # stop resident workers and free the progress server socket
+    WorkerPool.shutdown()
+    ProgressServer.shutdown()
+
     # handle the keymaps
     wm = bpy.context.window_manager
     for km in addon_keymaps:
@@ -205,7 +212,7 @@ def unregister():
     del Object.protected
     # if hasattr(bpy.props, "abs_mat_properties"):
     #     del bpy.props.abs_mat_properties  # don't unregister this cause ABS still may need it
-    del bpy.props.bfm_cache_bytes_hex
+    del bpy.props.bfm_cache_arrays
     del bpy.props.manual_cmlist_update
     del bpy.props.bricker_trans_and_anim_data
     del bpy.props.bricker_last_selected
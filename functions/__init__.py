@@ -30,6 +30,7 @@ from .hash_object import *
 from .logo_obj import *
 from .mat_utils import *
 from .matlist_utils import *
+from .mesh_assembly import *
 from .model_info import *
 from .post_hollowing import *
 from .post_merging import *
@@ -221,6 +221,20 @@ def get_legal_brick_sizes():
     return legal_brick_sizes
 
 
+def get_legal_brick_size_masks(legal_brick_sizes=None):
+    """ returns legal brick sizes as bitmasks (bit 'd' of 'masks[height][type][w]' is set if [w, d] is legal) """
+    legal_brick_sizes = legal_brick_sizes or get_legal_brick_sizes()
+    legal_brick_size_masks = {}
+    for height_key, types in legal_brick_sizes.items():
+        legal_brick_size_masks[height_key] = {}
+        for typ, sizes in types.items():
+            masks = [0] * (max([s[0] for s in sizes], default=-1) + 1)
+            for w, d in sizes:
+                masks[w] |= 1 << d
+            legal_brick_size_masks[height_key][typ] = masks
+    return legal_brick_size_masks
+
+
 def get_legal_bricks():
     """ returns a list of legal brick sizes and part numbers """
     return legal_bricks
@@ -236,7 +250,9 @@ def get_obscuring_types(direction="BELOW"):
 def is_legal_brick_size(size, type):
     # access blender property for performance improvement over running 'get_legal_brick_sizes' every time
     assert isinstance(size, list)
-    return size[:2] in bpy.props.bricker_legal_brick_sizes[size[2]][type]
+    masks = bpy.props.bricker_legal_brick_size_masks[size[2]][type]
+    w, d = size[:2]
+    return 0 <= w < len(masks) and d >= 0 and (masks[w] >> d) & 1 == 1
 
 def get_part(legal_bricks, size, typ):
     parts = legal_bricks[size[2]][typ]
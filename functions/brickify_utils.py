@@ -35,6 +35,10 @@ from .make_bricks import *
 from .model_info import set_model_info
 from .smoke_cache import *
 from .transform_data import *
+from ..lib.caches import bricker_last_frame_cache
+
+# estimated memory used by each lattice location while brickifying (bricksdict entry, lattice matrices and brick geometry)
+LATTICE_LOC_BYTES = 2048
 
 
 def get_action(cm):
@@ -194,6 +198,11 @@ def get_model_resolution(source, cm):
     return res
 
 
+def get_background_job_memory(r):
+    """ estimate memory (in bytes) needed to brickify one frame with model resolution 'r' in a background instance """
+    return 0 if r is None else int(r.x * r.y * r.z * LATTICE_LOC_BYTES)
+
+
 def should_brickify_in_background(cm, r, action):
     brickify_in_background = get_addon_preferences().brickify_in_background
     if brickify_in_background != "AUTO" or r is None:
@@ -212,7 +221,7 @@ def should_brickify_in_background(cm, r, action):
                     # accounts for internal supports
                     * (1.35 if cm.internal_supports != "NONE" else 1)
                     # accounts for costly ray casting
-                    * (3 if cm.insideness_ray_cast_dir != "HIGH_EFFICIENCY" else 1)
+                    * (3 if cm.insideness_ray_cast_dir != "HIGH_EFFICIENCY" and cm.voxelize_method == "RAY_CAST" else 1)
                     # accounts for merging algorithm
                     * (1.5 if mergable_brick_type(cm.brick_type) else 1)
                     # accounts for additional merging calculations for connectivity
@@ -327,6 +336,82 @@ def draw_updated_bricks(cm, bricksdict, keys_to_update, action="redrawing", sele
     return bricks_created
 
 
+def update_edited_regions(cm, source, bricksdict):
+    """ redraw bricks in lattice regions affected by edits to the source since the model was last brickified
+
+    returns keys of updated bricksdict entries (or None if the full bricksdict must be regenerated)
+    """
+    n = source.name
+    old_dup = bpy.data.objects.get(n + "__dup__")
+    if old_dup is None:
+        return set()
+    safe_link(old_dup)
+    depsgraph_update()
+    old_tris = get_triangle_data(old_dup)[0]
+    # replace source duplicate with a fresh copy of the source
+    delete(old_dup, remove_meshes=True)
+    source_dup = get_duplicate_object(cm, n, source)
+    depsgraph_update()
+    # diff triangles of new source duplicate against the last brickified one
+    tri_bounds = get_changed_tri_bounds(old_tris, get_triangle_data(source_dup)[0])
+    if len(tri_bounds) == 0:
+        safe_unlink(source_dup)
+        return set()
+    source_details = bounds(source_dup)
+    updated = update_bricksdict_from_source_edits(source_dup, source_details, bricksdict, tri_bounds, cursor_status=True)
+    safe_unlink(source_dup)
+    if updated is None:
+        return None
+    keys_to_update, stale_brick_names = updated
+    if len(keys_to_update) == 0:
+        return keys_to_update
+    # update materials and internal supports for updated keys
+    if check_if_internals_exist(cm):
+        update_internal(bricksdict, cm, keys_to_update)
+    if cm.material_type != "NONE":
+        bricksdict = update_materials(bricksdict, source_dup, keys_to_update, action="UPDATE_MODEL")
+    # remove bricks that will be redrawn
+    if cm.last_split_model:
+        delete([bpy.data.objects.get(name) for name in stale_brick_names])
+    draw_updated_bricks(cm, bricksdict, keys_to_update, action="Updating edited regions", select_created=False)
+    return keys_to_update
+
+
+def get_temporally_coherent_bricksdict(cm, source_dup, source_details, cur_frame, action):
+    """ get bricksdict for animation frame from the previous frame's bricksdict, re-voxelizing and re-merging only lattice regions affected by changes to the source
+
+    returns None if the bricksdict must be generated from scratch (including when the source bounds change, so moving sources are regenerated every frame)
+    """
+    n = cm.source_obj.name
+    prev_frame = cur_frame - cm.step_frame
+    last_frame, last_bricksdict = bricker_last_frame_cache.get(cm.id, (None, None))
+    # internal supports are calculated for the whole model (and smoke density isn't stored in the source mesh), so they can't be limited to changed regions
+    if last_frame != str(prev_frame) or check_if_internals_exist(cm) or cm.is_smoke:
+        return None
+    prev_dup = bpy.data.objects.get("Bricker_%(n)s_f_%(prev_frame)s" % locals())
+    if prev_dup is None:
+        return None
+    # diff triangles of source duplicate against the previous frame's
+    tri_bounds = get_changed_tri_bounds(get_triangle_data(prev_dup)[0], get_triangle_data(source_dup)[0])
+    bricksdict = copy_bricksdict(last_bricksdict)
+    if len(tri_bounds) == 0:
+        keys_to_update = set()
+    else:
+        updated = update_bricksdict_from_source_edits(source_dup, source_details, bricksdict, tri_bounds)
+        if updated is None:
+            return None
+        keys_to_update, _ = updated
+    # only merge bricks at changed locations (bricks carried over from the previous frame keep their size)
+    for k, brick_d in bricksdict.items():
+        brick_d["attempted_merge"] = k not in keys_to_update
+    if cm.material_type != "NONE" and len(keys_to_update) > 0:
+        bricksdict = update_materials(bricksdict, source_dup, keys_to_update, cur_frame=cur_frame, action=action)
+    if get_addon_preferences().show_debugging_tools:
+        num_reused = len(bricksdict) - len(keys_to_update)
+        print("[Bricker] reused %(num_reused)s of %(num_keys)s lattice locations from frame %(prev_frame)s" % {"num_reused": num_reused, "num_keys": len(bricksdict), "prev_frame": prev_frame})
+    return bricksdict
+
+
 def create_new_bricks(source_dup, parent, source_details, dimensions, action, split=True, cm=None, cur_frame=None, bricksdict=None, keys="ALL", clear_existing_collection=True, select_created=False, print_status=True, placeholder_meshes=False, run_pre_merge=True, force_post_merge=False, orig_source=None, redrawing=False):
     """ gets/creates bricksdict, runs make_bricks, and caches the final bricksdict """
     # initialization for getting bricksdict
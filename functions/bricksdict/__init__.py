@@ -15,8 +15,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from .adjust import *
+from .brick_graph import *
+from .chunked_grid import *
 from .connected_components import *
+from .deltas import *
+from .dense import *
+from .dirty_regions import *
 from .exposure import *
 from .generate import *
 from .modify import *
+from .pre_merge_grid import *
+from .ray_queries import *
+from .serialization import *
 from .storage import *
+from .voxelize_parallel import *
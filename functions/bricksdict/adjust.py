@@ -0,0 +1,376 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Module imports
+# NONE!
+
+# neighbor offsets in the order internal depth values are propagated
+NEIGHBOR_OFFSETS = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1))
+# number of lattice layers a change to unadjusted values can affect adjusted values across (shell marking,
+# surrounded shell check, and up to 50 layers of internal depth propagation can each reach one layer further)
+ADJUST_BFM_REACH = 53
+# number of ChunkedGrid chunks along each axis adjusted at once by 'adjust_bfm_chunked'
+ADJUST_CHUNKS_PER_BLOCK = 4
+
+
+def adjust_bfm(brick_freq_matrix, mat_shell_depth, calc_internals, face_idx_matrix=None, axes="xyz"):
+    """ adjust brick_freq_matrix values in place (float numpy array or nested lists; produces the same results as 'adjust_bfm_python') """
+    if isinstance(brick_freq_matrix, np.ndarray):
+        if brick_freq_matrix.size == 0:
+            return
+    elif len(brick_freq_matrix) == 0 or len(brick_freq_matrix[0]) == 0 or len(brick_freq_matrix[0][0]) == 0:
+        return
+    # NOTE: 'None' values (removed locations) are converted to nan
+    bfm = np.array(brick_freq_matrix, dtype=np.float64)
+    changed = np.zeros(bfm.shape, dtype=bool)
+
+    # if generating shell outside mesh with less than three axes
+    if axes != "xyz":
+        # if current location is inside (-1) and adjacent location is out of bounds or outside (0), current location is shell (1)
+        outside = pad(bfm == 0, False)
+        shell_here = np.zeros(bfm.shape, dtype=bool)
+        for axis, axis_name in enumerate("xyz"):
+            if axis_name in axes:
+                continue
+            on_boundary = np.zeros(bfm.shape, dtype=bool)
+            on_boundary[get_axis_slice(axis, 0)] = True
+            on_boundary[get_axis_slice(axis, -1)] = True
+            shell_here |= on_boundary | shift(outside, axis, 1) | shift(outside, axis, -1)
+        shell_here &= bfm == -1
+        bfm[shell_here] = 1
+        changed |= shell_here
+
+    # mark outside and unused inside brick_freq_matrix values for removal
+    trash = (bfm == 0) if calc_internals else ((bfm == 0) | (bfm == -1))
+    bfm[trash] = np.nan
+    changed |= trash
+
+    if not calc_internals:
+        write_bfm(brick_freq_matrix, bfm, changed)
+        return
+
+    # If shell location (1) does not intersect outside/trashed/nonexistent location (0, None), make it inside (-1)
+    shells = bfm == 1
+    existing = pad(~np.isnan(bfm) & (bfm != 0), False)
+    surrounded = shells.copy()
+    for axis in range(3):
+        surrounded &= shift(existing, axis, 1) & shift(existing, axis, -1)
+    bfm[surrounded] = -1
+    changed |= surrounded
+
+    # Update internals one layer at a time on flattened padded arrays (padding replaces IndexError checks)
+    padded_bfm = pad(bfm, np.nan)
+    padded_changed = pad(changed, False)
+    flat_bfm = padded_bfm.ravel()
+    flat_changed = padded_changed.ravel()
+    neighbor_offsets = np.array([np.dot(offset, padded_bfm.strides) // padded_bfm.itemsize for offset in NEIGHBOR_OFFSETS])
+    if face_idx_matrix is not None:
+        padded_faces = np.zeros(padded_bfm.shape, dtype=object)
+        padded_faces[1:-1, 1:-1, 1:-1] = get_object_array(face_idx_matrix)
+        padded_faces[1:-1, 1:-1, 1:-1][surrounded] = 0
+        padded_faces_changed = pad(surrounded, False)
+        flat_faces = padded_faces.ravel()
+        flat_faces_changed = padded_faces_changed.ravel()
+    # frontier locations are kept in the order 'adjust_bfm_python' visits them
+    frontier = np.flatnonzero(pad(shells & ~surrounded, False))
+    j = 1
+    set_nf = True
+    for i in range(50):
+        j = j - 0.01
+        if set_nf:
+            set_nf = (1 - j) * 100 < mat_shell_depth
+        # get neighbors of frontier locations in visiting order
+        candidates = (frontier[:, None] + neighbor_offsets[None, :]).ravel()
+        is_inside = flat_bfm[candidates] == -1
+        candidates = candidates[is_inside]
+        if len(candidates) == 0:
+            break
+        if set_nf and face_idx_matrix is not None:
+            # each location takes the nearest face of the first frontier location to visit it
+            new_frontier, first_visits = np.unique(candidates, return_index=True)
+            order = np.argsort(first_visits)
+            new_frontier = new_frontier[order]
+            parents = frontier[np.flatnonzero(is_inside)[first_visits[order]] // len(NEIGHBOR_OFFSETS)]
+            flat_faces[new_frontier] = flat_faces[parents]
+            flat_faces_changed[new_frontier] = True
+        else:
+            new_frontier = np.unique(candidates)
+        flat_bfm[new_frontier] = j
+        flat_changed[new_frontier] = True
+        frontier = new_frontier
+
+    write_bfm(brick_freq_matrix, padded_bfm[1:-1, 1:-1, 1:-1], padded_changed[1:-1, 1:-1, 1:-1])
+    if face_idx_matrix is not None:
+        write_rows(face_idx_matrix, padded_faces[1:-1, 1:-1, 1:-1], padded_faces_changed[1:-1, 1:-1, 1:-1])
+
+
+def adjust_bfm_chunked(grid, mat_shell_depth, calc_internals, face_grid=None, axes="xyz"):
+    """ adjust ChunkedGrid brick_freq_matrix (and ChunkedGrid face_idx_matrix) values in place (produces the same results as 'adjust_bfm')
+
+    Uniform outside chunks are removed and uniform inside chunks out of reach of the shell are kept as they are without loading their values.
+    Remaining chunks are adjusted a block of chunks at a time, loading the values within 'ADJUST_BFM_REACH' of each block
+    """
+    if axes != "xyz":
+        mark_axes_shell_chunked(grid, axes)
+    trash_vals = (0,) if calc_internals else (0, -1)
+    # chunks internal depth values are propagated from
+    seeds = np.zeros(grid.chunks_shape, dtype=bool)
+    insides = np.zeros(grid.chunks_shape, dtype=bool)
+    for c_loc in list(grid.get_chunk_locs()):
+        if not grid.is_uniform(c_loc):
+            if calc_internals:
+                seeds[c_loc] = True
+                continue
+            # mark outside and unused inside values for removal
+            chunk = grid.get_chunk(c_loc)
+            chunk[(chunk == 0) | (chunk == -1)] = np.nan
+            grid.set_block(grid.get_chunk_bounds(c_loc)[0], chunk)
+            continue
+        value = grid.get_chunk(c_loc)
+        if value in trash_vals:
+            grid.set_chunk_value(c_loc, np.nan)
+        elif value == -1:
+            insides[c_loc] = True
+        elif value == value:
+            seeds[c_loc] = True
+    if not calc_internals or not seeds.any():
+        return
+
+    # get uniform inside chunks within reach of internal depth propagation from the shell
+    reach = -(-50 // grid.chunk_size) + 1
+    in_reach = seeds.copy()
+    for axis in range(3):
+        for _ in range(reach):
+            grown = in_reach.copy()
+            grown[get_axis_slice(axis, slice(1, None))] |= in_reach[get_axis_slice(axis, slice(None, -1))]
+            grown[get_axis_slice(axis, slice(None, -1))] |= in_reach[get_axis_slice(axis, slice(1, None))]
+            in_reach = grown
+    active = seeds | (insides & in_reach)
+    # group active chunks into blocks adjusted at once (amortizes loading the values within reach around each block)
+    blocks = {}
+    for c_loc in map(tuple, np.argwhere(active).tolist()):
+        block_loc = tuple(v // ADJUST_CHUNKS_PER_BLOCK for v in c_loc)
+        if block_loc in blocks:
+            blocks[block_loc].append(c_loc)
+        else:
+            blocks[block_loc] = [c_loc]
+    adjusted = {}
+    for c_locs in blocks.values():
+        # adjust values within reach of the chunks in the block (values beyond it can't affect their adjusted values)
+        min_loc = tuple(max(min(c[i] for c in c_locs) * grid.chunk_size - ADJUST_BFM_REACH, 0) for i in range(3))
+        max_loc = tuple(min((max(c[i] for c in c_locs) + 1) * grid.chunk_size + ADJUST_BFM_REACH, grid.shape[i]) for i in range(3))
+        bfm = grid.get_block(min_loc, max_loc)
+        faces = face_grid.get_block(min_loc, max_loc) if face_grid is not None else None
+        adjust_bfm(bfm, mat_shell_depth, calc_internals, faces)
+        for c_loc in c_locs:
+            c_min, c_max = grid.get_chunk_bounds(c_loc)
+            chunk_slice = tuple(slice(v0 - m0, v1 - m0) for v0, v1, m0 in zip(c_min, c_max, min_loc))
+            adjusted[c_loc] = bfm[chunk_slice].copy(), faces[chunk_slice].copy() if faces is not None else None
+    # store adjusted chunks once all blocks are adjusted (each block is adjusted from the unadjusted values around it)
+    for c_loc, (bfm, faces) in adjusted.items():
+        c_min = grid.get_chunk_bounds(c_loc)[0]
+        grid.set_block(c_min, bfm)
+        if face_grid is not None:
+            face_grid.set_block(c_min, faces)
+
+
+def mark_axes_shell_chunked(grid, axes):
+    """ mark inside (-1) ChunkedGrid values adjacent to outside (0) or the lattice bounds along axes not in 'axes' as shell (1) """
+    for c_loc in list(grid.get_chunk_locs()):
+        if grid.is_uniform(c_loc) and grid.get_chunk(c_loc) != -1:
+            continue
+        # get chunk values with one location of padding on each side
+        c_min, c_max = grid.get_chunk_bounds(c_loc)
+        p_min = tuple(max(v - 1, 0) for v in c_min)
+        p_max = tuple(min(v + 1, s) for v, s in zip(c_max, grid.shape))
+        block = grid.get_block(p_min, p_max)
+        outside = pad(block == 0, False)
+        shell_here = np.zeros(block.shape, dtype=bool)
+        for axis, axis_name in enumerate("xyz"):
+            if axis_name in axes:
+                continue
+            on_boundary = np.zeros(block.shape, dtype=bool)
+            if p_min[axis] == 0:
+                on_boundary[get_axis_slice(axis, 0)] = True
+            if p_max[axis] == grid.shape[axis]:
+                on_boundary[get_axis_slice(axis, -1)] = True
+            shell_here |= on_boundary | shift(outside, axis, 1) | shift(outside, axis, -1)
+        shell_here &= block == -1
+        inner_slice = tuple(slice(v0 - p0, v1 - p0) for v0, v1, p0 in zip(c_min, c_max, p_min))
+        if shell_here[inner_slice].any():
+            block[shell_here] = 1
+            grid.set_block(c_min, block[inner_slice])
+
+
+def adjust_bfm_python(brick_freq_matrix, mat_shell_depth, calc_internals, face_idx_matrix=None, axes="xyz"):
+    """ adjust brick_freq_matrix values (pure python reference implementation of 'adjust_bfm') """
+    shell_vals = []
+    bfm_dim = [
+        len(brick_freq_matrix),
+        len(brick_freq_matrix[0]),
+        len(brick_freq_matrix[0][0]),
+    ]
+
+    # if generating shell outside mesh with less than three axes
+    if axes != "xyz":
+        for x in range(bfm_dim[0]):
+            for y in range(bfm_dim[1]):
+                for z in range(bfm_dim[2]):
+                    # if current location is inside (-1) and adjacent location is out of bounds, current location is shell (1)
+                    if (brick_freq_matrix[x][y][z] == -1 and
+                        (("z" not in axes and
+                          (z in (0, bfm_dim[2]-1) or
+                           brick_freq_matrix[x][y][z+1] == 0 or
+                           brick_freq_matrix[x][y][z-1] == 0)) or
+                         ("y" not in axes and
+                          (y in (0, bfm_dim[1]-1) or
+                           brick_freq_matrix[x][y+1][z] == 0 or
+                           brick_freq_matrix[x][y-1][z] == 0)) or
+                         ("x" not in axes and
+                          (x in (0, bfm_dim[0]-1) or
+                           brick_freq_matrix[x+1][y][z] == 0 or
+                           brick_freq_matrix[x-1][y][z] == 0))
+                      )):
+                        brick_freq_matrix[x][y][z] = 1
+                        # TODO: set face_idx_matrix value to nearest shell value using some sort of built in nearest poly to point function
+
+    trash_vals = [0] if calc_internals else [0, -1]
+    all_shell_vals = []
+    # iterate through all values
+    for x in range(bfm_dim[0]):
+        for y in range(bfm_dim[1]):
+            for z in range(bfm_dim[2]):
+                # mark outside and unused inside brick_freq_matrix values for removal
+                if brick_freq_matrix[x][y][z] in trash_vals:
+                    brick_freq_matrix[x][y][z] = None
+                # get shell values for next calc
+                elif calc_internals and brick_freq_matrix[x][y][z] == 1:
+                    all_shell_vals.append((x, y, z))
+
+    if not calc_internals:
+        return
+
+    # iterate through all shell values
+    for x, y, z in all_shell_vals:
+        # If shell location (1) does not intersect outside/trashed/nonexistent location (0, None), make it inside (-1)
+        if brick_freq_matrix[x][y][z] == 1:
+            try:
+                surrounded = all((
+                    brick_freq_matrix[x+1][y][z],
+                    brick_freq_matrix[x-1][y][z],
+                    brick_freq_matrix[x][y+1][z],
+                    brick_freq_matrix[x][y-1][z],
+                    brick_freq_matrix[x][y][z+1],
+                    brick_freq_matrix[x][y][z-1],
+                ))
+            except IndexError:
+                # in this case, an adjacent loc is nonexistent, therefore the current loc cannot be surrounded
+                surrounded = False
+            if surrounded:
+                brick_freq_matrix[x][y][z] = -1
+                if face_idx_matrix:
+                    face_idx_matrix[x][y][z] = 0
+            else:
+                shell_vals.append((x, y, z))
+
+
+    # Update internals
+    j = 1
+    set_nf = True
+    for i in range(50):
+        j = j - 0.01
+        got_one = False
+        new_shell_vals = []
+        if set_nf:
+            set_nf = (1 - j) * 100 < mat_shell_depth
+        for x, y, z in shell_vals:
+            idxs_to_check = (
+                (x+1, y, z),
+                (x-1, y, z),
+                (x, y+1, z),
+                (x, y-1, z),
+                (x, y, z+1),
+                (x, y, z-1))
+            for idx in idxs_to_check:
+                try:
+                    cur_val = brick_freq_matrix[idx[0]][idx[1]][idx[2]]
+                except IndexError:
+                    continue
+                if cur_val == -1:
+                    new_shell_vals.append(idx)
+                    brick_freq_matrix[idx[0]][idx[1]][idx[2]] = j
+                    if face_idx_matrix and set_nf: face_idx_matrix[idx[0]][idx[1]][idx[2]] = face_idx_matrix[x][y][z]
+                    got_one = True
+        if not got_one:
+            break
+        shell_vals = new_shell_vals
+
+
+def write_bfm(brick_freq_matrix, bfm, changed):
+    """ write changed values of numpy array 'bfm' back to brick_freq_matrix array (or nested lists) in place """
+    if isinstance(brick_freq_matrix, np.ndarray):
+        brick_freq_matrix[changed] = bfm[changed]
+        return
+    vals = bfm.astype(object)
+    vals[np.isnan(bfm)] = None
+    vals[bfm == 1] = 1
+    vals[bfm == -1] = -1
+    write_rows(brick_freq_matrix, vals, changed)
+
+
+def write_rows(matrix, arr, changed):
+    """ write rows of object array 'arr' with changed values back to nested 'matrix' lists (or object array) in place """
+    if isinstance(matrix, np.ndarray):
+        matrix[changed] = arr[changed]
+        return
+    for x, y in np.argwhere(changed.any(axis=2)).tolist():
+        matrix[x][y][:] = arr[x, y].tolist()
+
+
+def get_object_array(matrix):
+    """ get nested 3D list of python objects (dicts, ints, etc.) as numpy object array """
+    if isinstance(matrix, np.ndarray):
+        return matrix
+    arr = np.empty((len(matrix), len(matrix[0]), len(matrix[0][0])), dtype=object)
+    for x, plane in enumerate(matrix):
+        for y, row in enumerate(plane):
+            arr[x, y] = row
+    return arr
+
+
+def pad(arr, value):
+    """ pad array by one location on each side of each axis """
+    return np.pad(arr, 1, mode="constant", constant_values=value)
+
+
+def shift(padded_arr, axis, direction):
+    """ returns values of the neighbor in 'direction' along 'axis' for each location of the unpadded array """
+    slices = [slice(1, -1)] * 3
+    slices[axis] = slice(1 + direction, padded_arr.shape[axis] - 1 + direction)
+    return padded_arr[tuple(slices)]
+
+
+def get_axis_slice(axis, idx):
+    slices = [slice(None)] * 3
+    slices[axis] = idx
+    return tuple(slices)
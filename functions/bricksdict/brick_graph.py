@@ -0,0 +1,245 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Module imports
+from ..common import *
+from ..general import *
+
+
+class BrickGraph:
+    """ stud connection graph of a brick model with integer node ids and CSR adjacency arrays
+
+    Node 'i' is the brick at parent key 'keys[i]'; its connected nodes are 'indices[indptr[i]:indptr[i + 1]]'
+    Node metadata arrays: 'locs' and 'sizes' (n, 3), 'types' and 'mats' (indices into 'type_names' and 'mat_names')
+    """
+
+    def __init__(self, keys:list, locs:np.ndarray, sizes:np.ndarray, types:np.ndarray, type_names:list, mats:np.ndarray, mat_names:list, indptr:np.ndarray, indices:np.ndarray):
+        self.keys = keys
+        self.key_ids = {k: i for i, k in enumerate(keys)}
+        self.locs = locs
+        self.sizes = sizes
+        self.types = types
+        self.type_names = type_names
+        self.mats = mats
+        self.mat_names = mat_names
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_bricksdict(cls, bricksdict:dict, zstep:int, parent_keys=None, expand_to_components:bool=False):
+        """ build graph of bricks at 'parent_keys' (all drawn bricks in bricksdict if None)
+
+        If 'expand_to_components' is True, bricks connected to 'parent_keys' are added so the graph holds the full connected components containing them
+        """
+        if parent_keys is None:
+            parent_keys = (k for k, brick_d in bricksdict.items() if brick_d["parent"] == "self" and brick_d["draw"])
+        if expand_to_components:
+            keys, locs, sizes = get_component_bricks(bricksdict, zstep, parent_keys)
+        else:
+            keys = list(parent_keys)
+            locs, sizes = get_brick_locs_and_sizes(bricksdict, keys)
+        num_nodes = len(keys)
+        entries = [bricksdict[k] for k in keys]
+        type_names, types = np.unique(np.array([str(brick_d["type"]) for brick_d in entries], dtype=object), return_inverse=True) if num_nodes > 0 else ([], np.zeros(0, dtype=np.int64))
+        mat_names, mats = np.unique(np.array([brick_d["mat_name"] or "" for brick_d in entries], dtype=object), return_inverse=True) if num_nodes > 0 else ([], np.zeros(0, dtype=np.int64))
+        indptr, indices = get_brick_adjacency(locs, sizes, zstep)
+        return cls(keys, locs, sizes, types.astype(np.int32), list(type_names), mats.astype(np.int32), list(mat_names), indptr, indices)
+
+    def num_nodes(self):
+        return len(self.keys)
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def get_edges(self):
+        """ get (num_edges, 2) array of node ids connected by each edge (each edge listed once per direction) """
+        return np.column_stack((np.repeat(np.arange(self.num_nodes(), dtype=np.int32), self.degrees()), self.indices))
+
+    def get_component_labels(self):
+        """ get connected component label for each node (labels are 0 to num_components - 1) """
+        labels = np.arange(self.num_nodes())
+        edges = self.get_edges()
+        u, v = edges[:, 0], edges[:, 1]
+        while True:
+            lu = labels[u]
+            lv = labels[v]
+            unmatched = lu != lv
+            if not unmatched.any():
+                break
+            # hook larger root of each edge onto the smaller one, then compress paths to the roots
+            np.minimum.at(labels, np.maximum(lu[unmatched], lv[unmatched]), np.minimum(lu[unmatched], lv[unmatched]))
+            while True:
+                next_labels = labels[labels]
+                if np.array_equal(next_labels, labels):
+                    break
+                labels = next_labels
+        return np.unique(labels, return_inverse=True)[1].reshape(-1)
+
+    def get_weak_points(self):
+        """ get boolean array marking nodes at bridges between two non-trivial parts of a connected component (see 'get_bridges') """
+        num_nodes = self.num_nodes()
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        ids = [0] * num_nodes
+        low_links = [0] * num_nodes
+        weak_points = np.zeros(num_nodes, dtype=bool)
+        next_id = 1
+        # iterative depth first search (Tarjan's bridge finding algorithm)
+        for root in range(num_nodes):
+            if ids[root]:
+                continue
+            ids[root] = low_links[root] = next_id
+            next_id += 1
+            stack = [(root, -1, indptr[root])]
+            while stack:
+                node, parent, edge_idx = stack[-1]
+                if edge_idx < indptr[node + 1]:
+                    stack[-1] = (node, parent, edge_idx + 1)
+                    node_next = indices[edge_idx]
+                    if node_next == parent:
+                        continue
+                    if ids[node_next]:
+                        low_links[node] = min(low_links[node], ids[node_next])
+                    else:
+                        ids[node_next] = low_links[node_next] = next_id
+                        next_id += 1
+                        stack.append((node_next, node, indptr[node_next]))
+                    continue
+                stack.pop()
+                if parent != -1:
+                    low_links[parent] = min(low_links[parent], low_links[node])
+                    if ids[parent] < low_links[node] and indptr[node + 1] - indptr[node] > 1:
+                        weak_points[node] = True
+        return weak_points
+
+    def to_dict(self, nodes=None):
+        """ get dict of parent keys and their connected parent keys for 'nodes' (all nodes if None) """
+        keys = self.keys
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        nodes = range(self.num_nodes()) if nodes is None else nodes
+        return {keys[node]: set(keys[i] for i in indices[indptr[node]:indptr[node + 1]]) for node in nodes}
+
+    def to_conn_comps(self, labels:np.ndarray=None):
+        """ get connected components as list of dicts of parent keys and their connected parent keys (see 'get_connected_components') """
+        labels = self.get_component_labels() if labels is None else labels
+        graph = self.to_dict()
+        conn_comps = [dict() for _ in range(int(labels.max()) + 1 if len(labels) > 0 else 0)]
+        for key, label in zip(self.keys, labels.tolist()):
+            conn_comps[label][key] = graph[key]
+        return conn_comps
+
+
+def get_connectivity_from_brick_graph(bricksdict:dict, zstep:int, parent_keys):
+    """ get connected components containing 'parent_keys' and their weak points using BrickGraph arrays """
+    brick_graph = BrickGraph.from_bricksdict(bricksdict, zstep, parent_keys, expand_to_components=True)
+    if brick_graph.num_nodes() == 0:
+        return [], set()
+    conn_comps = brick_graph.to_conn_comps()
+    weak_points = brick_graph.get_weak_points()
+    return conn_comps, set(brick_graph.keys[i] for i in np.flatnonzero(weak_points).tolist())
+
+
+def get_brick_locs_and_sizes(bricksdict:dict, keys:list):
+    """ get (n, 3) int arrays of locations and sizes of bricks at parent 'keys' """
+    num_nodes = len(keys)
+    locs = np.array([get_dict_loc(bricksdict, k) for k in keys], dtype=np.int32).reshape(num_nodes, 3)
+    sizes = np.array([bricksdict[k]["size"] for k in keys], dtype=np.int32).reshape(num_nodes, 3)
+    return locs, sizes
+
+
+def get_component_bricks(bricksdict:dict, zstep:int, parent_keys):
+    """ get parent keys, locations, and sizes of bricks in the connected components containing bricks at 'parent_keys'
+
+    Only locations directly above and below bricks that aren't covered by other bricks at 'parent_keys' are read from the bricksdict
+    """
+    keys = list(dict.fromkeys(parent_keys))
+    key_set = set(keys)
+    locs, sizes = get_brick_locs_and_sizes(bricksdict, keys)
+    # find footprint cells directly above and below bricks not covered by other bricks at 'parent_keys'
+    _, bottom_cells, top_cells = get_brick_boundary_cells(locs, sizes, zstep)
+    open_above = top_cells[match_cells(top_cells, bottom_cells) == -1]
+    open_below = bottom_cells[match_cells(bottom_cells, top_cells) == -1]
+    open_below[:, 2] -= 1
+    next_locs = np.concatenate((open_above, open_below)).tolist()
+    # add bricks drawn at those cells, and the bricks connected to them
+    new_keys = []
+    while len(next_locs) > 0:
+        parent_key = get_parent_key(bricksdict, list_to_str(next_locs.pop()))
+        if parent_key is None or parent_key in key_set or not bricksdict[parent_key]["draw"]:
+            continue
+        key_set.add(parent_key)
+        new_keys.append(parent_key)
+        x0, y0, z0 = get_dict_loc(bricksdict, parent_key)
+        size = bricksdict[parent_key]["size"]
+        next_locs += [(x0 + x, y0 + y, z) for x in range(size[0]) for y in range(size[1]) for z in (z0 - 1, z0 + size[2] // zstep)]
+    if len(new_keys) > 0:
+        new_locs, new_sizes = get_brick_locs_and_sizes(bricksdict, new_keys)
+        locs = np.concatenate((locs, new_locs))
+        sizes = np.concatenate((sizes, new_sizes))
+    return keys + new_keys, locs, sizes
+
+
+def get_brick_boundary_cells(locs:np.ndarray, sizes:np.ndarray, zstep:int):
+    """ get node ids of footprint cells of each brick, with the locations of each cell in the lowest layer of the brick and directly above the brick """
+    # number of lattice layers covered by each brick
+    heights = -(-sizes[:, 2] // zstep)
+    areas = sizes[:, 0] * sizes[:, 1]
+    nodes = np.repeat(np.arange(len(locs)), areas)
+    cell_idxs = np.arange(areas.sum()) - np.repeat(np.cumsum(areas) - areas, areas)
+    depths = sizes[nodes, 1]
+    bottom_cells = np.column_stack((locs[nodes, 0] + cell_idxs // depths, locs[nodes, 1] + cell_idxs % depths, locs[nodes, 2]))
+    top_cells = bottom_cells.copy()
+    top_cells[:, 2] += heights[nodes]
+    return nodes, bottom_cells, top_cells
+
+
+def match_cells(cells:np.ndarray, targets:np.ndarray):
+    """ get index of the row of 'targets' equal to each row of 'cells' (-1 if there is none) by sorting integer cell codes """
+    if len(cells) == 0 or len(targets) == 0:
+        return np.full(len(cells), -1, dtype=np.int64)
+    offset = np.minimum(cells.min(axis=0), targets.min(axis=0))
+    dims = tuple((np.maximum(cells.max(axis=0), targets.max(axis=0)) - offset + 1).tolist())
+    target_codes = np.ravel_multi_index(tuple((targets - offset).T), dims)
+    order = np.argsort(target_codes, kind="stable")
+    sorted_codes = target_codes[order]
+    codes = np.ravel_multi_index(tuple((cells - offset).T), dims)
+    idxs = np.minimum(np.searchsorted(sorted_codes, codes), len(sorted_codes) - 1)
+    return np.where(sorted_codes[idxs] == codes, order[idxs], -1)
+
+
+def get_brick_adjacency(locs:np.ndarray, sizes:np.ndarray, zstep:int):
+    """ get CSR adjacency arrays (indptr, indices) connecting bricks whose footprints touch vertically (see 'get_connected_keys') """
+    num_nodes = len(locs)
+    if num_nodes == 0:
+        return np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32)
+    # connect bricks to the bricks with lowest footprint cells directly above them
+    nodes, bottom_cells, top_cells = get_brick_boundary_cells(locs, sizes, zstep)
+    matches = match_cells(top_cells, bottom_cells)
+    connected = matches != -1
+    pairs = np.unique(np.column_stack((nodes[connected], nodes[matches[connected]])), axis=0).reshape(-1, 2)
+    pairs = np.concatenate((pairs, pairs[:, ::-1]))
+    order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+    pairs = pairs[order]
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(pairs[:, 0], minlength=num_nodes))))
+    return indptr, pairs[:, 1].astype(np.int32)
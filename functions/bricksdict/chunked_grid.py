@@ -0,0 +1,260 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import itertools
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Module imports
+# NONE!
+
+# number of lattice locations along each axis of a ChunkedGrid chunk
+VOXEL_CHUNK_SIZE = 16
+
+
+class ChunkedGrid:
+    """ sparse 3D grid of lattice values stored in cubic chunks
+
+    Chunks where every location holds the same value are stored as that single value ('uniform' chunks),
+    so memory is only allocated for chunks with mixed values (e.g. near the surface of the source). Values
+    are accessed by lattice location ('grid[x, y, z]') or with the nested indexing used for dense lattice
+    matrices ('grid[x][y][z]').
+    """
+
+    def __init__(self, shape, dtype=np.float32, fill_value=0, chunk_size=VOXEL_CHUNK_SIZE):
+        self.shape = tuple(int(v) for v in shape)
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.chunks_shape = tuple(-(-v // chunk_size) for v in self.shape)
+        # chunks with mixed values
+        self.chunks = {}
+        # values of uniform chunks (chunks in neither dict hold 'fill_value')
+        self.uniform = {}
+        self.fill_value = fill_value
+
+    ###################################################
+    # class methods
+
+    @classmethod
+    def from_array(cls, arr, fill_value=0, chunk_size=VOXEL_CHUNK_SIZE):
+        """ create ChunkedGrid from dense numpy array """
+        grid = cls(arr.shape, dtype=arr.dtype, fill_value=fill_value, chunk_size=chunk_size)
+        grid.set_block((0, 0, 0), arr)
+        return grid
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if type(key) == tuple:
+            return self.get(key)
+        return _GridPlane(self, key)
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def get(self, loc):
+        x, y, z = self._check_loc(loc)
+        cs = self.chunk_size
+        c_loc = (x // cs, y // cs, z // cs)
+        chunk = self.chunks.get(c_loc)
+        if chunk is None:
+            return self.uniform.get(c_loc, self.fill_value)
+        return chunk[x % cs, y % cs, z % cs]
+
+    def set(self, loc, value):
+        x, y, z = self._check_loc(loc)
+        cs = self.chunk_size
+        c_loc = (x // cs, y // cs, z // cs)
+        chunk = self.chunks.get(c_loc)
+        if chunk is None:
+            cur_value = self.uniform.get(c_loc, self.fill_value)
+            if _values_match(cur_value, value, self.dtype):
+                return
+            chunk = self._allocate_chunk(c_loc, cur_value)
+        chunk[x % cs, y % cs, z % cs] = value
+
+    def get_chunk_locs(self):
+        """ iterate over locations of all chunks in the grid """
+        return itertools.product(*(range(v) for v in self.chunks_shape))
+
+    def get_chunk_bounds(self, c_loc):
+        """ returns min (inclusive) and max (exclusive) lattice locs of chunk at 'c_loc' """
+        min_loc = tuple(v * self.chunk_size for v in c_loc)
+        max_loc = tuple(min(v + self.chunk_size, s) for v, s in zip(min_loc, self.shape))
+        return min_loc, max_loc
+
+    def get_chunk(self, c_loc):
+        """ returns array of chunk at 'c_loc' if chunk has mixed values, else its single value """
+        chunk = self.chunks.get(c_loc)
+        if chunk is None:
+            return self.uniform.get(c_loc, self.fill_value)
+        return chunk
+
+    def set_chunk_value(self, c_loc, value):
+        """ set all locations in chunk at 'c_loc' to 'value' """
+        self.chunks.pop(c_loc, None)
+        self.uniform[c_loc] = value
+
+    def is_uniform(self, c_loc):
+        return c_loc not in self.chunks
+
+    def get_block(self, min_loc, max_loc):
+        """ returns dense array of values from 'min_loc' (inclusive) to 'max_loc' (exclusive) """
+        block = np.empty(tuple(v1 - v0 for v0, v1 in zip(min_loc, max_loc)), dtype=self.dtype)
+        for c_loc, c_min, c_max in self._get_overlapping_chunks(min_loc, max_loc):
+            block_slice = tuple(slice(v0 - b0, v1 - b0) for v0, v1, b0 in zip(c_min, c_max, min_loc))
+            chunk = self.chunks.get(c_loc)
+            if chunk is None:
+                block[block_slice] = self.uniform.get(c_loc, self.fill_value)
+            else:
+                block[block_slice] = chunk[self._get_chunk_slice(c_loc, c_min, c_max)]
+        return block
+
+    def set_block(self, min_loc, block):
+        """ write dense array 'block' to grid starting at 'min_loc' (chunks left with a single value are stored as that value) """
+        max_loc = tuple(v + s for v, s in zip(min_loc, block.shape))
+        for c_loc, c_min, c_max in self._get_overlapping_chunks(min_loc, max_loc):
+            block_slice = tuple(slice(v0 - b0, v1 - b0) for v0, v1, b0 in zip(c_min, c_max, min_loc))
+            chunk = self.chunks.get(c_loc)
+            if chunk is None:
+                chunk_min, chunk_max = self.get_chunk_bounds(c_loc)
+                if c_min == chunk_min and c_max == chunk_max:
+                    # block covers the entire chunk
+                    chunk = block[block_slice]
+                    is_uniform, value = _get_uniform_value(chunk)
+                    if is_uniform:
+                        self.set_chunk_value(c_loc, value)
+                    else:
+                        self.chunks[c_loc] = chunk.astype(self.dtype)
+                        self.uniform.pop(c_loc, None)
+                    continue
+                chunk = self._allocate_chunk(c_loc, self.uniform.get(c_loc, self.fill_value))
+            chunk[self._get_chunk_slice(c_loc, c_min, c_max)] = block[block_slice]
+            is_uniform, value = _get_uniform_value(chunk)
+            if is_uniform:
+                self.set_chunk_value(c_loc, value)
+
+    def to_array(self):
+        """ returns values of entire grid as dense numpy array """
+        return self.get_block((0, 0, 0), self.shape)
+
+    def argwhere(self, test):
+        """ returns (n, 3) array of lattice locs where 'test' (function mapping an array of values to a bool array) is True """
+        locs = []
+        for c_loc in self.get_chunk_locs():
+            c_min, c_max = self.get_chunk_bounds(c_loc)
+            chunk = self.chunks.get(c_loc)
+            if chunk is None:
+                value = self.uniform.get(c_loc, self.fill_value)
+                if test(np.array([value], dtype=self.dtype))[0]:
+                    locs.append(np.moveaxis(np.indices(tuple(v1 - v0 for v0, v1 in zip(c_min, c_max))), 0, -1).reshape(-1, 3) + c_min)
+            else:
+                locs.append(np.argwhere(test(chunk)) + c_min)
+        if len(locs) == 0:
+            return np.zeros((0, 3), dtype=np.int64)
+        locs = np.concatenate(locs)
+        # sort locations in lattice order (as returned by 'np.argwhere' for dense arrays)
+        return locs[np.lexsort((locs[:, 2], locs[:, 1], locs[:, 0]))]
+
+    @property
+    def nbytes(self):
+        return sum(chunk.nbytes for chunk in self.chunks.values())
+
+    #############################################
+    # internal methods
+
+    def _check_loc(self, loc):
+        x, y, z = loc
+        if not (0 <= x < self.shape[0] and 0 <= y < self.shape[1] and 0 <= z < self.shape[2]):
+            raise IndexError("lattice location %(loc)s out of range for grid of shape %(shape)s" % {"loc": loc, "shape": self.shape})
+        return x, y, z
+
+    def _allocate_chunk(self, c_loc, value):
+        c_min, c_max = self.get_chunk_bounds(c_loc)
+        chunk = np.empty(tuple(v1 - v0 for v0, v1 in zip(c_min, c_max)), dtype=self.dtype)
+        chunk[...] = value
+        self.chunks[c_loc] = chunk
+        self.uniform.pop(c_loc, None)
+        return chunk
+
+    def _get_chunk_slice(self, c_loc, min_loc, max_loc):
+        """ returns slice of chunk at 'c_loc' from lattice loc 'min_loc' (inclusive) to 'max_loc' (exclusive) """
+        return tuple(slice(v0 - c * self.chunk_size, v1 - c * self.chunk_size) for v0, v1, c in zip(min_loc, max_loc, c_loc))
+
+    def _get_overlapping_chunks(self, min_loc, max_loc):
+        """ iterate over chunks overlapping region from 'min_loc' (inclusive) to 'max_loc' (exclusive) with the bounds of the overlap """
+        cs = self.chunk_size
+        c_ranges = (range(v0 // cs, -(-v1 // cs)) for v0, v1 in zip(min_loc, max_loc))
+        for c_loc in itertools.product(*c_ranges):
+            chunk_min, chunk_max = self.get_chunk_bounds(c_loc)
+            c_min = tuple(max(v, b) for v, b in zip(chunk_min, min_loc))
+            c_max = tuple(min(v, b) for v, b in zip(chunk_max, max_loc))
+            yield c_loc, c_min, c_max
+
+
+class _GridPlane:
+    """ nested indexing view of a ChunkedGrid at lattice location 'x' """
+    __slots__ = ("_grid", "_x")
+
+    def __init__(self, grid, x):
+        self._grid = grid
+        self._x = x
+
+    def __len__(self):
+        return self._grid.shape[1]
+
+    def __getitem__(self, y):
+        return _GridRow(self._grid, self._x, y)
+
+
+class _GridRow:
+    """ nested indexing view of a ChunkedGrid at lattice location 'x', 'y' """
+    __slots__ = ("_grid", "_x", "_y")
+
+    def __init__(self, grid, x, y):
+        self._grid = grid
+        self._x = x
+        self._y = y
+
+    def __len__(self):
+        return self._grid.shape[2]
+
+    def __getitem__(self, z):
+        return self._grid.get((self._x, self._y, z))
+
+    def __setitem__(self, z, value):
+        self._grid.set((self._x, self._y, z), value)
+
+
+def _values_match(value1, value2, dtype):
+    if dtype == object:
+        return value1 is value2
+    return value1 == value2 or (value1 != value1 and value2 != value2)
+
+
+def _get_uniform_value(arr):
+    """ returns whether all values in 'arr' match and the matching value """
+    first = arr.flat[0]
+    if arr.dtype == object:
+        return all(v is first for v in arr.flat), first
+    if first != first:
+        return bool(np.isnan(arr).all()), first
+    return bool((arr == first).all()), first
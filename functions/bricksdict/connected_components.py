@@ -25,6 +25,10 @@ import bpy
 from ..common import *
 from ..general import *
 from ..brick import *
+from .brick_graph import *
+
+# number of connections searched from changed bricks to check that their block stays 2-edge-connected
+BLOCK_SEARCH_RADIUS = 3
 
 # For reference on this implementation, see 2.2 of: https://lgg.epfl.ch/publications/2013/lego/lego.pdf
 # For additional reference, see the following article: https://dl.acm.org/doi/pdf/10.1145/2739480.2754667
@@ -238,21 +242,21 @@ def depth_first_search(conn_comp:dict, weak_points:set, node_infos:dict, cur_idx
     return cur_idx, node_infos[cur_node]["low_link"]
 
 
-def get_weak_point_neighbors(bricksdict:dict, weak_points:set, parent_keys:list, zstep:int):
-    """ get verts neighboring weak points """
+def get_weak_point_neighbors(bricksdict:dict, weak_points:set, parent_keys, zstep:int):
+    """ get verts neighboring weak points ('parent_keys' should be a set or dict keys view) """
     weak_point_neighbors = set()
     for k in weak_points:
         # get all bricks (parent keys) neighboring current brick (starting at parent key 'k')
         neighboring_bricks = get_neighboring_bricks(bricksdict, bricksdict[k]["size"], zstep, get_dict_loc(bricksdict, k), check_vertically=False)
         # add neighboring bricks (parent keys) to weak point neighbors
         weak_point_neighbors |= set(neighboring_bricks)
-    weak_point_neighbors &= set(parent_keys)
+    weak_point_neighbors = set(k for k in weak_point_neighbors if k in parent_keys)
     weak_point_neighbors.difference_update(weak_points)
     return weak_point_neighbors
 
 
-def get_component_interfaces(bricksdict:dict, conn_comps:list, parent_keys:list, zstep:int):
-    """ get parent keys of neighboring bricks between two connected components """
+def get_component_interfaces(bricksdict:dict, conn_comps:list, parent_keys, zstep:int):
+    """ get parent keys of neighboring bricks between two connected components ('parent_keys' should be a set or dict keys view) """
     # initialize empty set of component interfaces
     component_interfaces = set()
     if len(conn_comps) == 0:
@@ -278,7 +282,7 @@ def get_component_interfaces(bricksdict:dict, conn_comps:list, parent_keys:list,
                         component_interfaces.add(k1)
 
     # ensure all interfaces are in parent_keys
-    component_interfaces &= set(parent_keys)
+    component_interfaces = set(k for k in component_interfaces if k in parent_keys)
 
     return component_interfaces
 
@@ -313,3 +317,319 @@ def draw_connected_components(bricksdict:dict, cm, conn_comps:list, weak_points:
     # link object to scene
     cm.collection.objects.link(obj)
     return obj
+
+
+class ConnectivityGraph:
+    """ persistent graph of bricks (parent key -> connected parent keys) updated incrementally as bricks are split, merged, or removed
+
+    If 'track_components' is True, connected components and weak points are also kept up to date. The 2-edge-connected blocks of each
+    component are stored with the bridge connecting them to the block containing the component root, so only blocks containing changed
+    bricks (and the blocks on the bridge paths between them) are searched for bridges again. Components are only rebuilt from scratch
+    when changed bricks split or join them.
+    """
+
+    def __init__(self, bricksdict:dict, zstep:int, parent_keys, track_components:bool=True):
+        self.bricksdict = bricksdict
+        self.zstep = zstep
+        self.track_components = track_components
+        self.neighbors = dict()
+        self.component_ids = dict()
+        self.components = dict()
+        self.weak_points = dict()
+        self.next_component_id = 0
+        self.block_ids = dict()
+        self.blocks = dict()
+        self.block_entries = dict()
+        self.next_block_id = 0
+        # build initial graph from the compact BrickGraph arrays (only components containing 'parent_keys')
+        brick_graph = BrickGraph.from_bricksdict(bricksdict, zstep, parent_keys, expand_to_components=True)
+        if brick_graph.num_nodes() == 0:
+            return
+        self.neighbors = brick_graph.to_dict()
+        if not track_components:
+            return
+        self._add_components(self.neighbors.keys())
+
+    def update_bricks(self, keys):
+        """ update graph for bricks that were split, merged, added or removed at lattice locations in 'keys' """
+        bricksdict = self.bricksdict
+        # remove nodes for bricks that previously started at changed locations
+        removed_nodes = set()
+        changed_nodes = set()
+        for k in [k for k in keys if k in self.neighbors]:
+            for k1 in self.neighbors.pop(k):
+                if k1 in self.neighbors:
+                    self.neighbors[k1].discard(k)
+                changed_nodes.add(k1)
+            removed_nodes.add(k)
+        # add nodes for bricks now covering changed locations
+        parent_keys = set()
+        for k in keys:
+            parent_key = get_parent_key(bricksdict, k)
+            if parent_key is not None and parent_key not in self.neighbors and bricksdict[parent_key]["parent"] == "self" and bricksdict[parent_key]["draw"]:
+                parent_keys.add(parent_key)
+        new_nodes = self._add_nodes(parent_keys)
+        if not self.track_components:
+            return
+        for k in new_nodes:
+            changed_nodes |= self.neighbors[k]
+        # get blocks containing bricks whose connections changed
+        touched_blocks = dict()
+        for k in (changed_nodes | removed_nodes) & self.block_ids.keys():
+            touched_blocks.setdefault(self.component_ids[k], set()).add(self.block_ids[k])
+        if not self._update_block(touched_blocks, changed_nodes, removed_nodes, new_nodes):
+            self._update_regions(touched_blocks, removed_nodes, new_nodes)
+        for k in removed_nodes - self.neighbors.keys():
+            self.component_ids.pop(k)
+            self.block_ids.pop(k)
+
+    def get_conn_comps(self):
+        """ get list of connected components (dicts of parent keys and their connected parent keys) """
+        return list(self.components.values())
+
+    def get_weak_points(self):
+        """ get parent keys of bricks at bridges between two non-trivial parts of a connected component """
+        return set().union(*self.weak_points.values())
+
+    def get_subgraph(self, key:str, bounds):
+        """ get bricks connected to 'key' through bricks within 'bounds' (as dict of parent keys and their connected parent keys within bounds) """
+        subgraph = dict()
+        next_keys = {key}
+        while len(next_keys) > 0:
+            k0 = next_keys.pop()
+            subgraph[k0] = set(k1 for k1 in self.neighbors[k0] if key_in_bounds(self.bricksdict, k1, bounds))
+            next_keys |= subgraph[k0] - subgraph.keys()
+        return subgraph
+
+    def _add_nodes(self, parent_keys):
+        """ add bricks at 'parent_keys' (and bricks connected to them missing from the graph) and return keys of added nodes """
+        bricksdict = self.bricksdict
+        new_nodes = set()
+        next_keys = set(k for k in parent_keys if k not in self.neighbors)
+        while len(next_keys) > 0:
+            k0 = next_keys.pop()
+            self.neighbors[k0] = get_connected_keys(bricksdict, k0, self.zstep)
+            new_nodes.add(k0)
+            for k1 in self.neighbors[k0]:
+                if k1 in self.neighbors:
+                    self.neighbors[k1].add(k0)
+                elif k1 not in next_keys:
+                    next_keys.add(k1)
+        return new_nodes
+
+    def _update_block(self, touched_blocks:dict, changed_nodes:set, removed_nodes:set, new_nodes:set):
+        """ update the only block touched by changed bricks without searching it for bridges, if the bricks around the change stay 2-edge-connected (returns False otherwise)
+
+        Any cycle through removed bricks can be rerouted through the bricks around the change, so the block stays 2-edge-connected
+        """
+        if len(touched_blocks) != 1:
+            return False
+        component_id, block_ids = next(iter(touched_blocks.items()))
+        if len(block_ids) != 1:
+            return False
+        block_id = next(iter(block_ids))
+        block = self.blocks[block_id]
+        nodes = (changed_nodes & self.neighbors.keys()) | new_nodes
+        if len(nodes) == 0:
+            return False
+        # get bricks of the block (and new bricks) near the changed bricks
+        near_nodes = set(nodes)
+        next_keys = set(nodes)
+        for _ in range(BLOCK_SEARCH_RADIUS):
+            next_keys = set(k1 for k0 in next_keys for k1 in self.neighbors[k0] if k1 not in near_nodes and (k1 in block or k1 in new_nodes))
+            near_nodes |= next_keys
+        # check that changed bricks are 2-edge-connected through the bricks near them
+        if not nodes <= get_bridge_tree(self.neighbors, near_nodes, next(iter(nodes)))[-1][0]:
+            return False
+        conn_comp = self.components[component_id]
+        for k in block & removed_nodes:
+            block.discard(k)
+            conn_comp.pop(k)
+        for k in new_nodes:
+            block.add(k)
+            conn_comp[k] = self.neighbors[k]
+            self.component_ids[k] = component_id
+            self.block_ids[k] = block_id
+        # the bridge into the block stays the same, but the brick at its end may have lost or gained connections
+        entry = self.block_entries[block_id]
+        if entry is not None:
+            self.weak_points[component_id].discard(entry[1])
+            if len(self.neighbors[entry[1]]) > 1:
+                self.weak_points[component_id].add(entry[1])
+        return True
+
+    def _update_regions(self, touched_blocks:dict, removed_nodes:set, new_nodes:set):
+        """ recalculate bridges in the blocks touched by changed bricks and the blocks on the bridge paths between them, and rebuild components that were split or joined """
+        region_blocks = dict()
+        region_nodes = dict()
+        for component_id, blocks in touched_blocks.items():
+            region_blocks[component_id] = self._get_region_blocks(blocks)
+            for block_id in region_blocks[component_id]:
+                for k in self.blocks[block_id]:
+                    if k in self.neighbors:
+                        region_nodes[k] = component_id
+        # the rest of each component hangs from its region by unchanged bridges, so split and joined components show in the region
+        parts = split_connected_components(self.neighbors, region_nodes.keys() | new_nodes, bounded=True)
+        part_component_ids = [set(region_nodes[k] for k in part if k in region_nodes) for part in parts]
+        part_counts = dict()
+        for component_ids in part_component_ids:
+            for component_id in component_ids:
+                part_counts[component_id] = part_counts.get(component_id, 0) + 1
+        rebuilt_ids = set(component_id for component_id in touched_blocks if part_counts.get(component_id) != 1)
+        for component_ids in part_component_ids:
+            if len(component_ids) > 1:
+                rebuilt_ids |= component_ids
+        # recalculate bridges within the region of unchanged components, and rebuild the rest from scratch
+        nodes = set()
+        for part, component_ids in zip(parts, part_component_ids):
+            if len(component_ids) == 0:
+                self._add_components(part.keys())
+            elif component_ids & rebuilt_ids:
+                nodes |= part.keys()
+            else:
+                component_id = component_ids.pop()
+                self._update_component(component_id, region_blocks[component_id], part, removed_nodes)
+        for component_id in rebuilt_ids:
+            nodes |= self._remove_component(component_id)
+        self._add_components(nodes)
+
+    def _add_components(self, nodes):
+        """ group 'nodes' into connected components and get their blocks and weak points """
+        for conn_comp in split_connected_components(self.neighbors, nodes):
+            component_id = self.next_component_id
+            self.next_component_id += 1
+            for k in conn_comp:
+                self.component_ids[k] = component_id
+            self.components[component_id] = conn_comp
+            self.weak_points[component_id] = set()
+            for block, entry in get_bridge_tree(self.neighbors, conn_comp, next(iter(conn_comp))):
+                self._add_block(component_id, block, entry)
+
+    def _add_block(self, component_id:int, block:set, entry:tuple):
+        """ store 2-edge-connected 'block' of component and the bridge 'entry' (parent key, child key) it is reached through from the component root """
+        block_id = self.next_block_id
+        self.next_block_id += 1
+        for k in block:
+            self.block_ids[k] = block_id
+        self.blocks[block_id] = block
+        self.block_entries[block_id] = entry
+        if entry is not None and len(self.neighbors[entry[1]]) > 1:
+            self.weak_points[component_id].add(entry[1])
+
+    def _remove_block(self, component_id:int, block_id:int):
+        """ remove block and the weak point at the bridge it is reached through """
+        entry = self.block_entries.pop(block_id)
+        if entry is not None:
+            self.weak_points[component_id].discard(entry[1])
+        return self.blocks.pop(block_id)
+
+    def _remove_component(self, component_id:int):
+        """ remove component with its blocks and return keys of its bricks remaining in the graph """
+        conn_comp = self.components.pop(component_id)
+        for block_id in set(self.block_ids[k] for k in conn_comp):
+            self._remove_block(component_id, block_id)
+        self.weak_points.pop(component_id)
+        return set(k for k in conn_comp if k in self.neighbors)
+
+    def _get_region_blocks(self, blocks:set):
+        """ get 'blocks' of a component and the blocks on the bridge paths between them, walking toward the component root from each block in turn """
+        heads = list(blocks)
+        paths = [[block_id] for block_id in heads]
+        visited = {block_id: i for i, block_id in enumerate(heads)}
+        groups = list(range(len(heads)))
+        active = set(range(len(heads)))
+        junctions = set()
+        while len(set(groups)) > 1:
+            for i in list(active):
+                entry = self.block_entries[heads[i]]
+                if entry is None:
+                    continue
+                block_id = self.block_ids[entry[0]]
+                if block_id in visited:
+                    # walk reached the path of another walk, so join their groups
+                    active.discard(i)
+                    junctions.add(block_id)
+                    old_group, new_group = groups[i], groups[visited[block_id]]
+                    groups = [new_group if group == old_group else group for group in groups]
+                else:
+                    visited[block_id] = i
+                    heads[i] = block_id
+                    paths[i].append(block_id)
+        # drop blocks past the last junction on the remaining walk
+        path = paths[active.pop()]
+        while path[-1] not in junctions and path[-1] not in blocks:
+            del visited[path.pop()]
+        return set(visited)
+
+    def _update_component(self, component_id:int, region_blocks:set, part:dict, removed_nodes:set):
+        """ recalculate blocks and weak points of component within 'region_blocks', given the bricks now in the region as 'part' """
+        conn_comp = self.components[component_id]
+        top_entry = None
+        for block_id in region_blocks:
+            entry = self.block_entries[block_id]
+            if entry is not None and self.block_ids[entry[0]] not in region_blocks:
+                top_entry = entry
+        for block_id in region_blocks:
+            for k in self._remove_block(component_id, block_id) & removed_nodes:
+                conn_comp.pop(k)
+        for k in part:
+            conn_comp[k] = self.neighbors[k]
+            self.component_ids[k] = component_id
+        # search the region from the brick at the bridge to the rest of the component (so the bridges around it keep their direction)
+        root = next(iter(part)) if top_entry is None else top_entry[1]
+        for block, entry in get_bridge_tree(self.neighbors, part, root):
+            self._add_block(component_id, block, top_entry if entry is None else entry)
+
+
+def split_connected_components(graph:dict, nodes, bounded:bool=False):
+    """ get connected components of 'nodes' in 'graph' (dict of keys and their connected keys), only through 'nodes' if 'bounded' """
+    conn_comps = list()
+    nodes = set(nodes)
+    while len(nodes) > 0:
+        conn_comp = dict()
+        next_keys = {nodes.pop()}
+        while len(next_keys) > 0:
+            k0 = next_keys.pop()
+            conn_comp[k0] = graph[k0]
+            next_keys |= set(k1 for k1 in graph[k0] if k1 not in conn_comp and (not bounded or k1 in nodes))
+        nodes.difference_update(conn_comp.keys())
+        conn_comps.append(conn_comp)
+    return conn_comps
+
+
+def get_bridge_tree(graph:dict, nodes, root:str):
+    """ get 2-edge-connected blocks of 'graph' (dict of keys and their connected keys) connected to 'root' through 'nodes', with the bridge (parent key, child key) each block is reached through from 'root' (None for the block containing 'root') """
+    ids = {root: 1}
+    low_links = {root: 1}
+    next_id = 2
+    block_stack = [root]
+    block_stack_idxs = {root: 0}
+    blocks = list()
+    # iterative depth first search (Tarjan's bridge finding algorithm)
+    stack = [(root, None, iter(graph[root]))]
+    while stack:
+        node, parent, neighbors = stack[-1]
+        node_next = next(neighbors, None)
+        if node_next is not None:
+            if node_next == parent or node_next not in nodes:
+                continue
+            if node_next in ids:
+                low_links[node] = min(low_links[node], ids[node_next])
+            else:
+                ids[node_next] = low_links[node_next] = next_id
+                next_id += 1
+                block_stack_idxs[node_next] = len(block_stack)
+                block_stack.append(node_next)
+                stack.append((node_next, node, iter(graph[node_next])))
+            continue
+        stack.pop()
+        if parent is None:
+            continue
+        low_links[parent] = min(low_links[parent], low_links[node])
+        if ids[parent] < low_links[node]:
+            # found the bridge, so bricks searched since 'node' form a block
+            idx = block_stack_idxs[node]
+            blocks.append((set(block_stack[idx:]), (parent, node)))
+            del block_stack[idx:]
+    blocks.append((set(block_stack), None))
+    return blocks
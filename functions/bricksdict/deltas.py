@@ -0,0 +1,85 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+# NONE!
+
+# Blender imports
+# NONE!
+
+# Module imports
+from .dense import *
+from ..common import *
+
+# maximum number of consecutive animation frames stored as deltas before storing a full bricksdict
+ANIM_KEYFRAME_INTERVAL = 10
+# maximum fraction of bricksdict entries that may change for a frame to be stored as a delta
+MAX_DELTA_FRACTION = 0.5
+
+
+def is_bricksdict_delta(bricksdict):
+    """ check if animation frame cache entry stores changes to the bricksdict of a previous frame """
+    return isinstance(bricksdict, dict) and "base_frame" in bricksdict and "changed" in bricksdict
+
+
+def get_bricksdict_delta(old_bricksdict, new_bricksdict, base_frame):
+    """ get entries of 'new_bricksdict' that differ from 'old_bricksdict' (and keys removed from it) as a delta of frame 'base_frame' """
+    changed = {k: dict(brick_d) for k, brick_d in new_bricksdict.items() if old_bricksdict.get(k) != brick_d}
+    removed = [k for k in old_bricksdict.keys() if k not in new_bricksdict]
+    return {"base_frame": base_frame, "changed": deepcopy(changed), "removed": removed}
+
+
+def apply_bricksdict_delta(bricksdict, delta):
+    """ apply changes stored in 'delta' to 'bricksdict' in place """
+    for k in delta["removed"]:
+        bricksdict.pop(k, None)
+    for k, brick_d in deepcopy(delta["changed"]).items():
+        bricksdict[k] = brick_d
+
+
+def get_delta_chain_length(anim_bfm_cache, frame):
+    """ get number of deltas that must be applied to get the bricksdict for 'frame' """
+    num_deltas = 0
+    while is_bricksdict_delta(anim_bfm_cache[frame]):
+        frame = anim_bfm_cache[frame]["base_frame"]
+        num_deltas += 1
+    return num_deltas
+
+
+def get_anim_frame_bricksdict(anim_bfm_cache, frame):
+    """ get bricksdict for 'frame' from animation cache, applying stored deltas to the bricksdict of the nearest fully stored frame """
+    bricksdict = anim_bfm_cache[frame]
+    deltas = []
+    while is_bricksdict_delta(bricksdict):
+        deltas.append(bricksdict)
+        bricksdict = anim_bfm_cache[bricksdict["base_frame"]]
+    if len(deltas) == 0:
+        return bricksdict
+    bricksdict = copy_bricksdict(bricksdict)
+    for delta in reversed(deltas):
+        apply_bricksdict_delta(bricksdict, delta)
+    return bricksdict
+
+
+def store_anim_frame_bricksdict(anim_bfm_cache, frame, bricksdict, prev_frame=None, prev_bricksdict=None):
+    """ store bricksdict for 'frame' to animation cache (as a delta of 'prev_frame' if few entries changed since 'prev_bricksdict') """
+    if prev_bricksdict is not None and prev_frame in anim_bfm_cache and get_delta_chain_length(anim_bfm_cache, prev_frame) < ANIM_KEYFRAME_INTERVAL - 1:
+        delta = get_bricksdict_delta(prev_bricksdict, bricksdict, prev_frame)
+        if len(delta["changed"]) + len(delta["removed"]) <= len(bricksdict) * MAX_DELTA_FRACTION:
+            anim_bfm_cache[frame] = delta
+            return
+    anim_bfm_cache[frame] = bricksdict
@@ -0,0 +1,397 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+from collections.abc import MutableMapping
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Module imports
+from ..common import *
+from ..general import list_to_str, str_to_list
+
+# ordered keys of every bricksdict entry (see 'create_bricksdict_entry')
+BRICKSDICT_FIELDS = (
+    "name",
+    "loc",
+    "val",
+    "draw",
+    "co",
+    "near_face",
+    "near_intersection",
+    "near_normal",
+    "rgba",
+    "mat_name",
+    "custom_mat_name",
+    "parent",
+    "size",
+    "attempted_merge",
+    "available_for_merge",
+    "top_exposed",
+    "bot_exposed",
+    "obscures",
+    "type",
+    "flipped",
+    "rotated",
+    "created_from",
+)
+
+# bool fields stored directly in bool columns
+_BOOL_FIELDS = ("draw", "custom_mat_name", "attempted_merge", "available_for_merge", "flipped", "rotated")
+# optional bool fields stored as -1 (None), 0 (False), or 1 (True)
+_TRISTATE_FIELDS = ("top_exposed", "bot_exposed")
+# string fields stored as indices into the interned string table
+_STRING_FIELDS = ("near_normal", "mat_name", "type", "created_from")
+# parent states
+_PARENT_NONE, _PARENT_SELF, _PARENT_KEY = 0, 1, 2
+
+
+class BrickEntry(MutableMapping):
+    """ mapping view of a single location in a DenseBricksdict
+
+    NOTE: list values (e.g. 'size', 'obscures') are returned as new lists; assign modified lists back to store them
+    (e.g. 'size = brick_d["size"]; size[2] = 1; brick_d["size"] = size', never 'brick_d["size"][2] = 1')
+    """
+    __slots__ = ("_bricksdict", "_idx")
+
+    def __init__(self, bricksdict, idx):
+        self._bricksdict = bricksdict
+        self._idx = idx
+
+    def __getitem__(self, field):
+        return self._bricksdict._get_field(self._idx, field)
+
+    def __setitem__(self, field, value):
+        self._bricksdict._set_field(self._idx, field, value)
+
+    def __delitem__(self, field):
+        raise TypeError("Cannot remove fields from bricksdict entries")
+
+    def __iter__(self):
+        return iter(BRICKSDICT_FIELDS)
+
+    def __len__(self):
+        return len(BRICKSDICT_FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def copy(self):
+        return dict(self)
+
+
+class DenseBricksdict(MutableMapping):
+    """ structure-of-arrays bricksdict with a mapping-compatible interface
+
+    Entries are stored in 3D numpy columns indexed by lattice location, and behave like the
+    'x,y,z'-keyed dictionaries created by 'make_bricksdict'. Hot paths can skip key parsing by
+    indexing with integer coordinates (see 'entry_at', 'exists_at', and 'column'). Keys outside
+    the lattice (e.g. bricks drawn by the 'Draw Adjacent' tool) are stored in a plain overflow dict.
+    """
+
+    def __init__(self, shape, model_name=""):
+        self.shape = tuple(int(v) for v in shape)
+        self.model_name = model_name
+        self._strings = [None, ""]
+        self._string_ids = {None: 0, "": 1}
+        self._names = {}
+        self._overflow = {}
+        shape = self.shape
+        self._columns = {
+            "exists": np.zeros(shape, dtype=bool),
+            "val": np.zeros(shape, dtype=np.float64),
+            "co": np.zeros(shape + (3,), dtype=np.float64),
+            "near_face": np.full(shape, -1, dtype=np.int32),
+            "near_intersection": np.full(shape + (3,), np.nan, dtype=np.float64),
+            "rgba": np.full(shape + (4,), np.nan, dtype=np.float64),
+            "parent_state": np.zeros(shape, dtype=np.int8),
+            "parent": np.zeros(shape + (3,), dtype=np.int32),
+            "size": np.zeros(shape + (3,), dtype=np.int16),
+            "obscures": np.zeros(shape + (6,), dtype=bool),
+        }
+        for field in _BOOL_FIELDS:
+            self._columns[field] = np.zeros(shape, dtype=bool)
+        for field in _TRISTATE_FIELDS:
+            self._columns[field] = np.full(shape, -1, dtype=np.int8)
+        for field in _STRING_FIELDS:
+            self._columns[field] = np.zeros(shape, dtype=np.int32)
+
+    ###################################################
+    # class methods
+
+    @classmethod
+    def from_dict(cls, bricksdict, model_name=""):
+        """ create DenseBricksdict from standard bricksdict """
+        locs = [brick_d["loc"] for brick_d in bricksdict.values()]
+        shape = np.max(locs, axis=0) + 1 if len(locs) > 0 else (0, 0, 0)
+        dense_bricksdict = cls(np.maximum(shape, 0), model_name=model_name)
+        for key, brick_d in bricksdict.items():
+            dense_bricksdict[key] = brick_d
+        return dense_bricksdict
+
+    ###################################################
+    # integer coordinate access
+
+    def column(self, name):
+        """ get underlying numpy column (e.g. 'val', 'draw', 'exists') """
+        return self._columns[name]
+
+    def in_bounds(self, x, y, z):
+        return 0 <= x < self.shape[0] and 0 <= y < self.shape[1] and 0 <= z < self.shape[2]
+
+    def exists_at(self, x, y, z):
+        """ check if entry exists at lattice location without building its key """
+        x, y, z = int(x), int(y), int(z)
+        if self.in_bounds(x, y, z):
+            return bool(self._columns["exists"][x, y, z])
+        return list_to_str((x, y, z)) in self._overflow
+
+    def entry_at(self, x, y, z):
+        """ get entry at lattice location (None if nonexistent) """
+        x, y, z = int(x), int(y), int(z)
+        if self.in_bounds(x, y, z):
+            return BrickEntry(self, (x, y, z)) if self._columns["exists"][x, y, z] else None
+        return self._overflow.get(list_to_str((x, y, z)))
+
+    def get_field_at(self, x, y, z, field):
+        """ get single field at lattice location (assumes entry exists within lattice bounds) """
+        return self._get_field((x, y, z), field)
+
+    def parent_loc_at(self, x, y, z):
+        """ get lattice location of parent brick of entry at lattice location (assumes entry exists within lattice bounds) """
+        if self._columns["parent_state"][x, y, z] == _PARENT_KEY:
+            return tuple(self._columns["parent"][x, y, z].tolist())
+        return (x, y, z)
+
+    def get_parent_key(self, key):
+        """ get key of parent brick of entry at 'key' from the parent columns (None if nonexistent; see 'get_parent_key') """
+        idx = self._get_idx(key)
+        if idx is None:
+            brick_d = self._overflow.get(key)
+            return None if brick_d is None else (key if brick_d["parent"] in ("self", None) else brick_d["parent"])
+        if not self._columns["exists"][idx]:
+            return None
+        parent_loc = self.parent_loc_at(*idx)
+        return key if parent_loc == idx else list_to_str(parent_loc)
+
+    def merge_brick_at(self, loc, size, zstep, merged_type=None):
+        """ store brick of 'size' at lattice location 'loc' with column slices (see 'update_merged_keys_in_bricksdict')
+
+        Returns False without changes if any location in the brick is outside the lattice or has no entry
+        """
+        x0, y0, z0 = loc
+        x1, y1, z1 = x0 + size[0], y0 + size[1], z0 + -(-size[2] // zstep)
+        if not (self.in_bounds(x0, y0, z0) and self.in_bounds(x1 - 1, y1 - 1, z1 - 1)):
+            return False
+        brick_slice = (slice(x0, x1), slice(y0, y1), slice(z0, z1))
+        cols = self._columns
+        if not cols["exists"][brick_slice].all():
+            return False
+        cols["attempted_merge"][brick_slice] = True
+        cols["parent_state"][brick_slice] = _PARENT_KEY
+        cols["parent"][brick_slice] = loc
+        cols["size"][brick_slice] = 0
+        if merged_type is not None:
+            cols["type"][brick_slice] = self._intern(merged_type)
+        cols["parent_state"][x0, y0, z0] = _PARENT_SELF
+        cols["size"][x0, y0, z0] = size
+        return True
+
+    def strings(self):
+        """ get interned string table (indexed by values of string columns) """
+        return self._strings
+
+    ###################################################
+    # mapping interface
+
+    def __getitem__(self, key):
+        idx = self._get_idx(key)
+        if idx is None:
+            return self._overflow[key]
+        if not self._columns["exists"][idx]:
+            raise KeyError(key)
+        return BrickEntry(self, idx)
+
+    def __setitem__(self, key, brick_d):
+        idx = self._get_idx(key)
+        if idx is None:
+            self._overflow[key] = brick_d
+            return
+        self._columns["exists"][idx] = True
+        for field in BRICKSDICT_FIELDS:
+            self._set_field(idx, field, brick_d[field])
+
+    def __delitem__(self, key):
+        idx = self._get_idx(key)
+        if idx is None:
+            del self._overflow[key]
+            return
+        if not self._columns["exists"][idx]:
+            raise KeyError(key)
+        self._columns["exists"][idx] = False
+        self._names.pop(idx, None)
+
+    def __contains__(self, key):
+        try:
+            idx = self._get_idx(key)
+        except KeyError:
+            return False
+        if idx is None:
+            return key in self._overflow
+        return bool(self._columns["exists"][idx])
+
+    def __iter__(self):
+        for loc in np.argwhere(self._columns["exists"]).tolist():
+            yield list_to_str(loc)
+        yield from list(self._overflow)
+
+    def __len__(self):
+        return int(np.count_nonzero(self._columns["exists"])) + len(self._overflow)
+
+    def clear(self):
+        self._columns["exists"][...] = False
+        self._names.clear()
+        self._overflow.clear()
+
+    def copy(self):
+        """ return deep copy of this bricksdict """
+        new_bricksdict = DenseBricksdict(self.shape, model_name=self.model_name)
+        new_bricksdict._strings = list(self._strings)
+        new_bricksdict._string_ids = dict(self._string_ids)
+        new_bricksdict._names = dict(self._names)
+        new_bricksdict._overflow = deepcopy(self._overflow)
+        new_bricksdict._columns = {name: col.copy() for name, col in self._columns.items()}
+        return new_bricksdict
+
+    def to_dict(self):
+        """ convert to standard bricksdict (e.g. for marshalling) """
+        return {key: dict(brick_d) for key, brick_d in self.items()}
+
+    def nbytes(self):
+        """ get number of bytes used by numpy columns """
+        return sum(col.nbytes for col in self._columns.values())
+
+    ###################################################
+    # internal methods
+
+    def _get_idx(self, key):
+        """ get lattice index from key (None if outside lattice bounds) """
+        try:
+            x, y, z = str_to_list(key)
+        except (ValueError, AttributeError):
+            raise KeyError(key)
+        return (x, y, z) if self.in_bounds(x, y, z) else None
+
+    def _intern(self, string):
+        try:
+            return self._string_ids[string]
+        except KeyError:
+            self._string_ids[string] = len(self._strings)
+            self._strings.append(string)
+            return self._string_ids[string]
+
+    def _get_field(self, idx, field):
+        cols = self._columns
+        if field in _BOOL_FIELDS:
+            return bool(cols[field][idx])
+        elif field in _STRING_FIELDS:
+            return self._strings[cols[field][idx]]
+        elif field == "val":
+            return float(cols["val"][idx])
+        elif field == "loc":
+            return list(idx)
+        elif field == "name":
+            return self._names.get(idx) or "Bricker_%s__%s" % (self.model_name, list_to_str(idx))
+        elif field == "parent":
+            state = cols["parent_state"][idx]
+            if state == _PARENT_NONE:
+                return None
+            return "self" if state == _PARENT_SELF else list_to_str(cols["parent"][idx].tolist())
+        elif field == "size":
+            size = cols["size"][idx]
+            return None if size[0] == 0 else size.tolist()
+        elif field in _TRISTATE_FIELDS:
+            val = cols[field][idx]
+            return None if val == -1 else bool(val)
+        elif field == "near_face":
+            val = cols["near_face"][idx]
+            return None if val == -1 else int(val)
+        elif field == "co":
+            return tuple(cols["co"][idx].tolist())
+        elif field == "near_intersection":
+            val = cols["near_intersection"][idx]
+            return None if np.isnan(val[0]) else tuple(val.tolist())
+        elif field == "rgba":
+            val = cols["rgba"][idx]
+            return None if np.isnan(val[0]) else val.tolist()
+        elif field == "obscures":
+            return cols["obscures"][idx].tolist()
+        raise KeyError(field)
+
+    def _set_field(self, idx, field, value):
+        cols = self._columns
+        if field in _BOOL_FIELDS:
+            cols[field][idx] = value
+        elif field in _STRING_FIELDS:
+            cols[field][idx] = self._intern(value)
+        elif field == "val":
+            cols["val"][idx] = value
+        elif field == "loc":
+            assert tuple(value) == idx, "Cannot move bricksdict entry to a new location"
+        elif field == "name":
+            if value == "Bricker_%s__%s" % (self.model_name, list_to_str(idx)):
+                self._names.pop(idx, None)
+            else:
+                self._names[idx] = value
+        elif field == "parent":
+            if value is None:
+                cols["parent_state"][idx] = _PARENT_NONE
+            elif value == "self":
+                cols["parent_state"][idx] = _PARENT_SELF
+            else:
+                cols["parent_state"][idx] = _PARENT_KEY
+                cols["parent"][idx] = str_to_list(value)
+        elif field == "size":
+            cols["size"][idx] = (0, 0, 0) if value is None else value
+        elif field in _TRISTATE_FIELDS:
+            cols[field][idx] = -1 if value is None else int(value)
+        elif field == "near_face":
+            cols["near_face"][idx] = -1 if value is None else value
+        elif field == "near_intersection":
+            cols["near_intersection"][idx] = np.nan if value is None else value
+        elif field == "rgba":
+            cols["rgba"][idx] = np.nan if value is None else value
+        elif field in ("co", "obscures"):
+            cols[field][idx] = value
+        else:
+            raise KeyError(field)
+
+
+def bricksdict_to_dict(bricksdict):
+    """ get standard (marshallable) bricksdict from standard or dense bricksdict (or dict of animation frame bricksdicts) """
+    if isinstance(bricksdict, DenseBricksdict):
+        return bricksdict.to_dict()
+    elif isinstance(bricksdict, dict) and any(isinstance(v, DenseBricksdict) for v in bricksdict.values()):
+        return {k: bricksdict_to_dict(v) for k, v in bricksdict.items()}
+    return bricksdict
+
+
+def copy_bricksdict(bricksdict):
+    """ get deep copy of standard or dense bricksdict """
+    return bricksdict.copy() if isinstance(bricksdict, DenseBricksdict) else deepcopy(bricksdict)
@@ -0,0 +1,114 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Module imports
+from .adjust import *
+from .chunked_grid import *
+from ..common import *
+from ..general import *
+from ...lib.caches import bricker_source_snapshot_cache
+
+# number of extra lattice locations around edited faces to re-voxelize
+DIRTY_REGION_MARGIN = 2
+
+
+def get_source_snapshot(cm, source_details, lattice_args, brick_freq_matrix, face_idx_matrix):
+    """ returns snapshot of unadjusted voxelization for updating regions affected by future source edits
+
+    Keyword arguments:
+    cm                -- cmlist item the snapshot is created for
+    source_details    -- bounds of source duplicate the lattice was voxelized from
+    lattice_args      -- arguments passed to 'generate_lattice' as (vert_dist, scale, offset)
+    brick_freq_matrix -- brick_freq_matrix before running 'adjust_bfm'
+    face_idx_matrix   -- face_idx_matrix before running 'adjust_bfm'
+    """
+    raw_bfm = np.array(brick_freq_matrix, dtype=np.int8)
+    # nearest face data is only stored at shell locations (in a sparse grid, so regions can be read and replaced in place)
+    faces = ChunkedGrid(raw_bfm.shape, dtype=object)
+    for x, y, z in np.argwhere(raw_bfm == 1).tolist():
+        face_d = face_idx_matrix[x][y][z]
+        if type(face_d) == dict:
+            faces[x, y, z] = face_d
+    return {
+        "settings": get_matrix_settings_str(cm),
+        "bounds": get_snapshot_bounds(source_details),
+        "lattice_args": tuple(tuple(vec) for vec in lattice_args),
+        "raw_bfm": raw_bfm,
+        "faces": faces,
+        "vals": None,
+    }
+
+
+def store_source_snapshot(cm, snapshot, brick_freq_matrix):
+    """ store snapshot with final (adjusted) brick_freq_matrix values to the source snapshot cache """
+    # NOTE: 'None' values (removed locations) are converted to nan
+    snapshot["vals"] = np.array(brick_freq_matrix, dtype=np.float32)
+    bricker_source_snapshot_cache[cm.id] = snapshot
+
+
+def get_snapshot_bounds(source_details):
+    """ get rounded source bounds used to determine whether lattice for edited source is unchanged """
+    return (vec_round(source_details.min, 6, outer_type=tuple), vec_round(source_details.max, 6, outer_type=tuple))
+
+
+def get_changed_tri_bounds(old_tris, new_tris):
+    """ returns (num_changed, 2, 3) array of min/max bounds of triangles that were added, removed, or moved """
+    if len(old_tris) == len(new_tris):
+        # topology unchanged, so compare triangles in place
+        changed = np.any(old_tris != new_tris, axis=(1, 2))
+        changed_tris = np.concatenate((old_tris[changed], new_tris[changed]))
+    else:
+        # topology changed, so compare sets of triangles
+        old_rows = {tri.tobytes(): i for i, tri in enumerate(old_tris)}
+        new_rows = {tri.tobytes(): i for i, tri in enumerate(new_tris)}
+        removed = [i for row, i in old_rows.items() if row not in new_rows]
+        added = [i for row, i in new_rows.items() if row not in old_rows]
+        changed_tris = np.concatenate((old_tris[removed], new_tris[added]))
+    return np.stack((changed_tris.min(axis=1), changed_tris.max(axis=1)), axis=1)
+
+
+def get_adjust_region(region, shape, calc_internals):
+    """ returns bounds of lattice locations whose adjusted values may change with unadjusted values in 'region', and bounds of the
+    locations needed to adjust them (see 'adjust_bfm'); bounds are min (inclusive) and max (exclusive) lattice locs """
+    # values without internals only depend on their direct neighbors
+    reach = ADJUST_BFM_REACH if calc_internals else 1
+    adjust_min = tuple(max(v - reach, 0) for v in region[0])
+    adjust_max = tuple(min(v + reach, s) for v, s in zip(region[1], shape))
+    window_min = tuple(max(v - reach, 0) for v in adjust_min)
+    window_max = tuple(min(v + reach, s) for v, s in zip(adjust_max, shape))
+    return (adjust_min, adjust_max), (window_min, window_max)
+
+
+def get_dirty_region(tri_bounds, lattice_min, step, shape, margin=DIRTY_REGION_MARGIN):
+    """ returns min (inclusive) and max (exclusive) lattice locs of region containing all 'tri_bounds' (or None if empty) """
+    if len(tri_bounds) == 0:
+        return None
+    lattice_min = np.asarray(lattice_min)
+    step = np.asarray(step)
+    min_loc = np.floor((tri_bounds[:, 0].min(axis=0) - lattice_min) / step).astype(int) - margin
+    max_loc = np.ceil((tri_bounds[:, 1].max(axis=0) - lattice_min) / step).astype(int) + margin + 1
+    min_loc = np.clip(min_loc, 0, shape)
+    max_loc = np.clip(max_loc, 0, shape)
+    if np.any(max_loc <= min_loc):
+        return None
+    return tuple(min_loc.tolist()), tuple(max_loc.tolist())
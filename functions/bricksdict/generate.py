@@ -25,9 +25,17 @@ import numpy as np
 import bpy
 from bpy.types import Object
 from mathutils import Matrix, Vector
+from mathutils.bvhtree import BVHTree
 
 # Module imports
-from .generate_lattice import generate_lattice
+from .adjust import *
+from .chunked_grid import *
+from .dense import *
+from .dirty_regions import *
+from .generate_lattice import generate_lattice, Lattice
+from .ray_queries import *
+from .voxelize import *
+from .voxelize_parallel import *
 from ..common import *
 from ..general import *
 from ..colors import *
@@ -38,14 +46,15 @@ from ..brick import *
 accs = [0, 0, 0, 0, 0]
 
 
-def cast_rays(obj_eval:Object, point:Vector, direction:Vector, mini_dist:float, round_type:str="CEILING", edge_len:int=0):
+def cast_rays(bvh:BVHTree, point:Vector, direction:Vector, mini_dist:float, round_type:str="CEILING", edge_len:int=0, first_hit:tuple=None):
     """
-    obj_eval   -- source object to test intersections for
+    bvh        -- BVH tree of source object to test intersections for
     point      -- starting point for ray casting
     direction  -- cast ray in this direction
     mini_dist  -- Vector with miniscule amount to add after intersection
     round_type -- round final intersection location Vector with this type
     edge_len   -- distance to test for intersections
+    first_hit  -- result of first ray cast from 'point' in 'direction' (if already computed)
     """
     # initialize variables
     first_direction = False
@@ -58,7 +67,11 @@ def cast_rays(obj_eval:Object, point:Vector, direction:Vector, mini_dist:float,
     intersections = 0
     # cast rays until no more rays to cast
     while True:
-        _,location,normal,index = obj_eval.ray_cast(starting_point, direction)#distance=edge_len*1.00000000001)
+        if first_hit is not None:
+            _,location,normal,index = first_hit
+            first_hit = None
+        else:
+            _,location,normal,index = ray_cast(bvh, starting_point, direction)#distance=edge_len*1.00000000001)
         if index == -1: break
         if intersections == 0:
             first_direction = direction.dot(normal)
@@ -84,7 +97,7 @@ def cast_rays(obj_eval:Object, point:Vector, direction:Vector, mini_dist:float,
         return intersections, first_direction
 
 
-def ray_obj_intersections(scn, point, direction, mini_dist:Vector, edge_len, obj, use_normals, insideness_ray_cast_dir, brick_shell):
+def ray_obj_intersections(scn, point, direction, mini_dist:Vector, edge_len, bvh, use_normals, insideness_ray_cast_dir, brick_shell, first_hit=None):
     """
     cast ray(s) from point in direction to determine insideness and whether edge intersects obj within edge_len
 
@@ -101,15 +114,10 @@ def ray_obj_intersections(scn, point, direction, mini_dist:Vector, edge_len, obj
     # initialize variables
     intersections = 0
     outside_L = []
-    if b280():
-        depsgraph = bpy.context.view_layer.depsgraph
-        obj_eval = obj.evaluated_get(depsgraph)
-    else:
-        obj_eval = obj
     # set axis of direction
     axes = "XYZ" if direction[0] > 0 else ("YZX" if direction[1] > 0 else "ZXY")
     # run initial intersection check
-    intersections, first_direction, first_intersection, next_intersection_loc, last_intersection, edge_intersects = cast_rays(obj_eval, point, direction, mini_dist, edge_len=edge_len)
+    intersections, first_direction, first_intersection, next_intersection_loc, last_intersection, edge_intersects = cast_rays(bvh, point, direction, mini_dist, edge_len=edge_len, first_hit=first_hit)
 
     if brick_shell == "CONSISTENT" and edge_intersects:
         # skip insideness checks if brick shell doesn't take insideness into account
@@ -123,7 +131,7 @@ def ray_obj_intersections(scn, point, direction, mini_dist:Vector, edge_len, obj
             else:
                 # double check vert is inside mesh
                 # NOTE: no longer optional because this is almost always necessary
-                count, first_direction = cast_rays(obj_eval, point, -direction, -mini_dist, round_type="FLOOR")
+                count, first_direction = cast_rays(bvh, point, -direction, -mini_dist, round_type="FLOOR")
                 if count%2 == 0 and not (use_normals and first_direction > 0):
                     outside_L[0] = 1
 
@@ -139,13 +147,13 @@ def ray_obj_intersections(scn, point, direction, mini_dist:Vector, edge_len, obj
                     outside_L.append(0)
                     direction = dirs[i][0]
                     mini_dist = dirs[i][1]
-                    count, first_direction = cast_rays(obj_eval, point, direction, mini_dist)
+                    count, first_direction = cast_rays(bvh, point, direction, mini_dist)
                     if count%2 == 0 and not (use_normals and first_direction > 0):
                         outside_L[len(outside_L) - 1] = 1
                     else:
                         # double check vert is inside mesh
                         # NOTE: no longer optional because this is almost always necessary
-                        count, first_direction = cast_rays(obj_eval, point, -direction, -mini_dist, round_type="FLOOR")
+                        count, first_direction = cast_rays(bvh, point, -direction, -mini_dist, round_type="FLOOR")
                         if count%2 == 0 and not (use_normals and first_direction > 0):
                             outside_L[len(outside_L) - 1] = 1
 
@@ -155,7 +163,7 @@ def ray_obj_intersections(scn, point, direction, mini_dist:Vector, edge_len, obj
     # return helpful information
     return not outside, edge_intersects, intersections, next_intersection_loc, first_intersection, last_intersection
 
-def update_bf_matrix(scn, x0, y0, z0, coord_matrix, ray, edge_len, face_idx_matrix, brick_freq_matrix, brick_shell, source, x1, y1, z1, mini_dist, use_normals, insideness_ray_cast_dir):
+def update_bf_matrix(scn, x0, y0, z0, lattice, ray, edge_len, face_idx_matrix, brick_freq_matrix, brick_shell, bvh, x1, y1, z1, mini_dist, use_normals, insideness_ray_cast_dir, first_hit=None):
     """ update brick_freq_matrix[x0][y0][z0] based on results from ray_obj_intersections
 
     Returns:
@@ -164,8 +172,8 @@ def update_bf_matrix(scn, x0, y0, z0, coord_matrix, ray, edge_len, face_idx_matr
         edge_intersects       - Whether or not the ray cast from the current loc to the next loc intersected the source mesh
         target_val            - The value this iteration of update_bf_matrix would set `brick_freq_matrix[x0][y0][z0]` to (ignoring whatever the value started at based on previous iterations)
     """
-    point = coord_matrix[x0][y0][z0]
-    point_inside, edge_intersects, intersections, next_intersection_loc, first_intersection, last_intersection = ray_obj_intersections(scn, point, ray, mini_dist, edge_len, source, use_normals, insideness_ray_cast_dir, brick_shell)
+    point = lattice.co((x0, y0, z0))
+    point_inside, edge_intersects, intersections, next_intersection_loc, first_intersection, last_intersection = ray_obj_intersections(scn, point, ray, mini_dist, edge_len, bvh, use_normals, insideness_ray_cast_dir, brick_shell, first_hit=first_hit)
 
     target_val = 0
     if point_inside and brick_freq_matrix[x0][y0][z0] == 0:
@@ -255,54 +263,69 @@ def update_internal(bricksdict, cm, keys, clear_existing=False):
     elif cm.internal_supports == "LATTICE":
         add_lattice_supports(bricksdict, keys, cm.lattice_step, cm.lattice_height, cm.alternate_xy)
 
-def get_brick_matrix(source, face_idx_matrix, coord_matrix, brick_shell, axes="xyz", print_status=True, cursor_status=False):
-    """ returns new brick_freq_matrix """
+def get_brick_matrix(source, face_idx_matrix, lattice, brick_shell, axes="xyz", print_status=True, cursor_status=False, adjust=True):
+    """ returns new brick_freq_matrix (skips running 'adjust_bfm' if 'adjust' is False) """
     scn, cm, _ = get_active_context_info()
-    brick_freq_matrix = deepcopy(face_idx_matrix)
     axes = axes.lower()
-    dist = coord_matrix[1][1][1] - coord_matrix[0][0][0]
+    # compute insideness and shell for entire scanlines at once
+    if cm.voxelize_method == "SCANLINE":
+        brick_freq_matrix = get_brick_freq_matrix_scanline(source, face_idx_matrix, lattice, brick_shell, cm.insideness_ray_cast_dir, cm.use_normals, axes=axes, print_status=print_status, cursor_status=cursor_status)
+        if adjust:
+            adjust_bfm(brick_freq_matrix, cm.mat_shell_depth, cm.calc_internals, face_idx_matrix, axes=axes)
+        update_progress_bars(1, 0, "Shell", print_status, cursor_status, end=True)
+        return brick_freq_matrix
+    brick_freq_matrix = np.zeros(lattice.shape, dtype=int).tolist()
+    # build (or reuse) acceleration structure for ray casting against the source
+    bvh = get_source_bvh(source)
+    reset_ray_query_stats()
+    dist = Vector(lattice.step)
     casts_in_multiple_dirs = cm.insideness_ray_cast_dir in ("HIGH_EFFICIENCY", "XYZ")
     negative_inf = Vector((-inf, -inf, -inf))
     # runs update functions only once
     use_normals = cm.use_normals
     insideness_ray_cast_dir = cm.insideness_ray_cast_dir
     # initialize Matrix sizes
-    bfm_dim = [
-        len(brick_freq_matrix),
-        len(brick_freq_matrix[0]),
-        len(brick_freq_matrix[0][0]),
-    ]
+    bfm_dim = list(lattice.shape)
 
     # initialize values used for printing status
-    denom = (len(brick_freq_matrix[0][0]) + len(brick_freq_matrix[0]) + len(brick_freq_matrix))/100
+    denom = sum(bfm_dim)/100
     if cursor_status:
         wm = bpy.context.window_manager
         wm.progress_begin(0, 100)
 
     def print_cur_status(percentStart, num0, denom0, lastPercent):
         # print status to terminal
-        percent = percentStart + (len(brick_freq_matrix) / denom * (num0 / (denom0 - 1))) / 100
+        percent = percentStart + (bfm_dim[0] / denom * (num0 / (denom0 - 1))) / 100
         update_progress_bars(percent, 0, "Shell", print_status, cursor_status)
         return percent
 
     percent0 = 0
     if "x" in axes:
-        x_ray = coord_matrix[1][0][0] - coord_matrix[0][0][0]
+        x_ray = Vector((lattice.step[0], 0, 0))
+        x_cos = [lattice.co((j, 0, 0)).x for j in range(bfm_dim[0])]
         x_edge_len = x_ray.length
         x_mini_dist = Vector((0.00015, 0.0, 0.0))
+        # rows that don't intersect the source are outside if insideness is only checked along this axis
+        skip_empty_rows = insideness_ray_cast_dir in ("HIGH_EFFICIENCY", "X")
         for z in range(bfm_dim[2]):
             # print status to terminal
             percent0 = print_cur_status(0, z, bfm_dim[2], percent0)
+            # cast first ray of every row before walking the rows
+            row_hits = ray_cast_rows(bvh, [lattice.co((0, y, z)) for y in range(bfm_dim[1])], x_ray)
             for y in range(bfm_dim[1]):
+                if skip_empty_rows and row_hits[y][3] == -1:
+                    continue
+                first_hit = row_hits[y]
                 next_intersection_loc = negative_inf
                 i = 1
                 for x in range(bfm_dim[0]):
                     # skip current loc if casting ray is unnecessary (sets outside vals to last found val)
-                    if i >= 2 and casts_in_multiple_dirs and coord_matrix[x][y][z].x + dist.x + x_mini_dist.x < next_intersection_loc.x:
+                    if i >= 2 and casts_in_multiple_dirs and x_cos[x] + dist.x + x_mini_dist.x < next_intersection_loc.x:
                         brick_freq_matrix[x][y][z] = val
                         continue
                     # cast rays and update brick_freq_matrix
-                    intersections, next_intersection_loc, edge_intersects, target_val = update_bf_matrix(scn, x, y, z, coord_matrix, x_ray, x_edge_len, face_idx_matrix, brick_freq_matrix, brick_shell, source, x+1, y, z, x_mini_dist, use_normals, insideness_ray_cast_dir)
+                    intersections, next_intersection_loc, edge_intersects, target_val = update_bf_matrix(scn, x, y, z, lattice, x_ray, x_edge_len, face_idx_matrix, brick_freq_matrix, brick_shell, bvh, x+1, y, z, x_mini_dist, use_normals, insideness_ray_cast_dir, first_hit=first_hit)
+                    first_hit = None
                     i = 0 if edge_intersects else (i + 1)
                     val = target_val
                     if intersections == 0:
@@ -310,24 +333,31 @@ def get_brick_matrix(source, face_idx_matrix, coord_matrix, brick_shell, axes="x
 
     percent1 = percent0
     if "y" in axes:
-        y_ray = coord_matrix[0][1][0] - coord_matrix[0][0][0]
+        y_ray = Vector((0, lattice.step[1], 0))
+        y_cos = [lattice.co((0, j, 0)).y for j in range(bfm_dim[1])]
         y_edge_len = y_ray.length
         y_mini_dist = Vector((0.0, 0.00015, 0.0))
+        skip_empty_rows = insideness_ray_cast_dir in ("HIGH_EFFICIENCY", "Y")
         for z in range(bfm_dim[2]):
             # print status to terminal
             percent1 = print_cur_status(percent0, z, bfm_dim[2], percent1)
+            row_hits = ray_cast_rows(bvh, [lattice.co((x, 0, z)) for x in range(bfm_dim[0])], y_ray)
             for x in range(bfm_dim[0]):
+                if skip_empty_rows and row_hits[x][3] == -1:
+                    continue
+                first_hit = row_hits[x]
                 next_intersection_loc = negative_inf
                 i = 1
                 for y in range(bfm_dim[1]):
                     # skip current loc if casting ray is unnecessary (sets outside vals to last found val)
-                    if i >= 2 and casts_in_multiple_dirs and coord_matrix[x][y][z].y + dist.y + y_mini_dist.y < next_intersection_loc.y:
+                    if i >= 2 and casts_in_multiple_dirs and y_cos[y] + dist.y + y_mini_dist.y < next_intersection_loc.y:
                         if brick_freq_matrix[x][y][z] == 0:
                             brick_freq_matrix[x][y][z] = val
                         if brick_freq_matrix[x][y][z] == val:
                             continue
                     # cast rays and update brick_freq_matrix
-                    intersections, next_intersection_loc, edge_intersects, target_val = update_bf_matrix(scn, x, y, z, coord_matrix, y_ray, y_edge_len, face_idx_matrix, brick_freq_matrix, brick_shell, source, x, y+1, z, y_mini_dist, use_normals, insideness_ray_cast_dir)
+                    intersections, next_intersection_loc, edge_intersects, target_val = update_bf_matrix(scn, x, y, z, lattice, y_ray, y_edge_len, face_idx_matrix, brick_freq_matrix, brick_shell, bvh, x, y+1, z, y_mini_dist, use_normals, insideness_ray_cast_dir, first_hit=first_hit)
+                    first_hit = None
                     i = 0 if edge_intersects else (i + 1)
                     val = target_val
                     if intersections == 0:
@@ -335,31 +365,43 @@ def get_brick_matrix(source, face_idx_matrix, coord_matrix, brick_shell, axes="x
 
     percent2 = percent1
     if "z" in axes:
-        z_ray = coord_matrix[0][0][1] - coord_matrix[0][0][0]
+        z_ray = Vector((0, 0, lattice.step[2]))
+        z_cos = [lattice.co((0, 0, j)).z for j in range(bfm_dim[2])]
         z_edge_len = z_ray.length
         z_mini_dist = Vector((0.0, 0.0, 0.00015))
+        skip_empty_rows = insideness_ray_cast_dir in ("HIGH_EFFICIENCY", "Z")
         for x in range(bfm_dim[0]):
             # print status to terminal
             percent2 = print_cur_status(percent1, x, bfm_dim[0], percent2)
+            row_hits = ray_cast_rows(bvh, [lattice.co((x, y, 0)) for y in range(bfm_dim[1])], z_ray)
             for y in range(bfm_dim[1]):
+                if skip_empty_rows and row_hits[y][3] == -1:
+                    continue
+                first_hit = row_hits[y]
                 next_intersection_loc = negative_inf
                 i = 1
                 for z in range(bfm_dim[2]):
                     # skip current loc if casting ray is unnecessary (sets outside vals to last found val)
-                    if i >= 2 and casts_in_multiple_dirs and coord_matrix[x][y][z].z + dist.z + z_mini_dist.z < next_intersection_loc.z:
+                    if i >= 2 and casts_in_multiple_dirs and z_cos[z] + dist.z + z_mini_dist.z < next_intersection_loc.z:
                         if brick_freq_matrix[x][y][z] == 0:
                             brick_freq_matrix[x][y][z] = val
                         if brick_freq_matrix[x][y][z] == val:
                             continue
                     # cast rays and update brick_freq_matrix
-                    intersections, next_intersection_loc, edge_intersects, target_val = update_bf_matrix(scn, x, y, z, coord_matrix, z_ray, z_edge_len, face_idx_matrix, brick_freq_matrix, brick_shell, source, x, y, z+1, z_mini_dist, use_normals, insideness_ray_cast_dir)
+                    intersections, next_intersection_loc, edge_intersects, target_val = update_bf_matrix(scn, x, y, z, lattice, z_ray, z_edge_len, face_idx_matrix, brick_freq_matrix, brick_shell, bvh, x, y, z+1, z_mini_dist, use_normals, insideness_ray_cast_dir, first_hit=first_hit)
+                    first_hit = None
                     i = 0 if edge_intersects else (i + 1)
                     val = target_val
                     if intersections == 0:
                         break
 
+    if print_status:
+        report_ray_query_stats()
+    brick_freq_matrix = np.array(brick_freq_matrix, dtype=np.float32)
+
     # mark inside freqs as internal (-1) and outside next to outsides for removal
-    adjust_bfm(brick_freq_matrix, cm.mat_shell_depth, cm.calc_internals, face_idx_matrix, axes=axes)
+    if adjust:
+        adjust_bfm(brick_freq_matrix, cm.mat_shell_depth, cm.calc_internals, face_idx_matrix, axes=axes)
 
     # print status to terminal
     update_progress_bars(1, 0, "Shell", print_status, cursor_status, end=True)
@@ -367,20 +409,52 @@ def get_brick_matrix(source, face_idx_matrix, coord_matrix, brick_shell, axes="x
     return brick_freq_matrix
 
 
+def get_brick_matrix_chunked(source, face_idx_matrix, lattice, brick_shell, axes="xyz", cursor_status=False):
+    """ returns unadjusted ChunkedGrid brick_freq_matrix, voxelized into ChunkedGrid 'face_idx_matrix' one layer of chunks at a time """
+    brick_freq_matrix = ChunkedGrid(lattice.shape)
+    for z0, slab_bfm, slab_faces in voxelize_z_slabs(source, lattice, brick_shell, axes, face_idx_matrix.chunk_size, cursor_status=cursor_status):
+        brick_freq_matrix.set_block((0, 0, z0), slab_bfm)
+        face_idx_matrix.set_block((0, 0, z0), slab_faces)
+    return brick_freq_matrix
+
+
+def get_z_slabs(num_layers, slab_size, padding=0):
+    """ returns Z bounds, min (inclusive) and max (exclusive), of each slab of 'slab_size' layers, with and without 'padding' layers on either side """
+    slabs = []
+    for z0 in range(0, num_layers, slab_size):
+        z1 = min(z0 + slab_size, num_layers)
+        slabs.append(((z0, z1), (max(z0 - padding, 0), min(z1 + padding, num_layers))))
+    return slabs
+
+
+def voxelize_z_slabs(source, lattice, brick_shell, axes, slab_size, cursor_status=False):
+    """ voxelize lattice one Z slab at a time, yielding min Z, unadjusted brick_freq_matrix, and face_idx_matrix array of each slab """
+    nx, ny, nz = lattice.shape
+    # voxelize each slab with one extra layer on either side (for shell calculations along slab boundaries)
+    slabs = get_z_slabs(nz, slab_size, padding=1)
+    old_percent = 0
+    for i, ((z0, z1), (pz0, pz1)) in enumerate(slabs):
+        old_percent = update_progress_bars(i / len(slabs), old_percent, "Shell", True, cursor_status)
+        slab_faces = ChunkedGrid((nx, ny, pz1 - pz0), dtype=object)
+        slab_bfm = get_brick_matrix(source, slab_faces, lattice.get_region(((0, 0, pz0), (nx, ny, pz1))), brick_shell, axes=axes, print_status=False, adjust=False)
+        yield z0, slab_bfm[:, :, z0 - pz0:z1 - pz0], slab_faces.get_block((0, 0, z0 - pz0), (nx, ny, z1 - pz0))
+    update_progress_bars(1, 0, "Shell", True, cursor_status, end=True)
+
+
 def get_brick_matrix_smoke(cm, source, face_idx_matrix, brick_shell, source_details, print_status=True, cursor_status=False):
     ct = time.time()
     # source = cm.source_obj
     density_grid, flame_grid, color_grid, domain_res, max_res, adapt, adapt_min, adapt_max = get_smoke_info(source)
     ct = stopwatch(1, ct)
-    brick_freq_matrix = deepcopy(face_idx_matrix)
-    color_matrix = deepcopy(face_idx_matrix)
+    shape = (len(face_idx_matrix), len(face_idx_matrix[0]), len(face_idx_matrix[0][0]))
+    brick_freq_matrix = np.zeros(shape, dtype=np.float32)
+    color_matrix = np.zeros(shape, dtype=int).tolist()
     ct = stopwatch(2, ct)
-    old_percent = 0
-    brightness = Vector([(cm.smoke_brightness - 1) / 5]*3)
-    sat_mat = get_saturation_matrix(cm.smoke_saturation)
+    brightness = (cm.smoke_brightness - 1) / 5
+    sat_mat = np.array(get_saturation_matrix(cm.smoke_saturation))
     quality = cm.smoke_quality
     flame_intensity = cm.flame_intensity
-    flame_color = cm.flame_color
+    flame_color = np.array(cm.flame_color)
     smoke_density = cm.smoke_density
     ct = stopwatch(3, ct)
 
@@ -405,84 +479,50 @@ def get_brick_matrix_smoke(cm, source, face_idx_matrix, brick_shell, source_deta
     if 0 in d:
         return brick_freq_matrix, color_matrix
 
-    # get x/y/z distances
-    xn0 = domain_res[0] / d.x
-    yn0 = domain_res[1] / d.y
-    zn0 = domain_res[2] / d.z
-    denom = d.x
+    # get density grid voxels sampled for each lattice location along x, y, z
+    weights = [get_smoke_sample_weights(s_idx[i], e_idx[i], domain_res[i] / d[i], domain_res[i], shape[i], quality) for i in range(3)]
+    (x0, x1), (y0, y1), (z0, z1) = ((int(max(0, s_idx[i])), int(min(shape[i], e_idx[i]))) for i in range(3))
+    weights = [w[lo:hi] for w, (lo, hi) in zip(weights, ((x0, x1), (y0, y1), (z0, z1)))]
 
     # set up brick_freq_matrix values
     ct = stopwatch(4, ct)
 
-    # iterate over x
-    for x in range(int(s_idx[0]), int(e_idx[0])):
-        # get x range
-        x0 = x - s_idx[0]
-        xn = [int(xn0 * x0), int(xn0 * (x0 + 1))]
-        xn[1] += 1 if xn[1] == xn[0] else 0
-        step_x = math.ceil((xn[1] - xn[0]) / quality)
-        # print status to terminal
-        old_percent = update_progress_bars(x / denom, old_percent, "Shell", print_status, cursor_status)
-
-        # iterate over y
-        for y in range(int(s_idx[1]), int(e_idx[1])):
-            # get y range
-            y0 = y - s_idx[1]
-            yn = [int(yn0 * y0), int(yn0 * (y0 + 1))]
-            yn[1] += 1 if yn[1] == yn[0] else 0
-            step_y = math.ceil((yn[1] - yn[0]) / quality)
-
-            # iterate over z
-            for z in range(int(s_idx[2]), int(e_idx[2])):
-                # get z range
-                z0 = z - s_idx[2]
-                zn = [int(zn0 * z0), int(zn0 * (z0 + 1))]
-                zn[1] += 1 if zn[1] == zn[0] else 0
-                step_z = math.ceil((zn[1] - zn[0]) / quality)
-
-                # initialize accumulators
-                d_acc = 0
-                f_acc = 0
-                cs_acc = Vector((0, 0, 0))
-                cf_acc = 0
-                ave_denom = 0
-
-                # iterate through chunk of density grid near current brick locations
-                for x1 in range(xn[0], xn[1], step_x):
-                    for y1 in range(yn[0], yn[1], step_y):
-                        for z1 in range(zn[0], zn[1], step_z):
-                            cur_idx = (z1 * domain_res[1] + y1) * domain_res[0] + x1
-                            _d = density_grid[cur_idx]
-                            f = flame_grid[cur_idx]
-                            d_acc += _d
-                            f_acc += f
-                            cur_idx_ext = cur_idx * 4
-                            cs_acc += _d * Vector((color_grid[cur_idx_ext], color_grid[cur_idx_ext + 1], color_grid[cur_idx_ext + 2]))
-                            cf_acc += f ** 2
-                            ave_denom += 1
-
-                # multiply by flame properties
-                cf_acc *= flame_intensity * Vector(flame_color)
-
-                # get acc averages
-                d_ave = d_acc / ave_denom
-                f_ave = f_acc / ave_denom
-                cs_ave = cs_acc / (ave_denom * (d_ave if d_ave != 0 else 1))
-                cf_ave = cf_acc / (ave_denom * (f_ave if f_ave != 0 else 1))
-
-                # get final color values
-                c_ave = (cs_ave + cf_ave)
-                alpha = d_ave + f_ave
-
-                # add brightness
-                c_ave += brightness
-
-                # add saturation
-                c_ave = mathutils_mult(c_ave, sat_mat)
-
-                # store to matrices
-                brick_freq_matrix[x][y][z] = 0 if alpha < (1 - smoke_density) else 1
-                color_matrix[x][y][z] = list(c_ave) + [alpha]
+    # sum sampled voxel values for each lattice location
+    ave_denom = np.maximum(np.einsum("a,b,c->abc", *(w.sum(axis=1) for w in weights)), 1)
+    grids = [density_grid, flame_grid, flame_grid ** 2] + [density_grid * color_grid[..., i] for i in range(3)]
+    acc = []
+    old_percent = 0
+    for i, grid in enumerate(grids):
+        old_percent = update_progress_bars(i / len(grids), old_percent, "Shell", print_status, cursor_status)
+        acc.append(sum_smoke_samples(grid, weights))
+    d_acc, f_acc, cf_acc = acc[:3]
+    cs_acc = np.stack(acc[3:], axis=-1)
+
+    # multiply by flame properties
+    cf_acc = cf_acc[..., None] * (flame_intensity * flame_color)
+
+    # get acc averages
+    d_ave = d_acc / ave_denom
+    f_ave = f_acc / ave_denom
+    cs_ave = cs_acc / (ave_denom * np.where(d_ave != 0, d_ave, 1))[..., None]
+    cf_ave = cf_acc / (ave_denom * np.where(f_ave != 0, f_ave, 1))[..., None]
+
+    # get final color values
+    c_ave = cs_ave + cf_ave
+    alpha = d_ave + f_ave
+
+    # add brightness
+    c_ave += brightness
+
+    # add saturation
+    c_ave = c_ave @ sat_mat
+
+    # store to matrices
+    brick_freq_matrix[x0:x1, y0:y1, z0:z1] = np.where(alpha < (1 - smoke_density), 0, 1)
+    colors = np.concatenate((c_ave, alpha[..., None]), axis=-1).tolist()
+    for x in range(x0, x1):
+        for y in range(y0, y1):
+            color_matrix[x][y][z0:z1] = colors[x - x0][y - y0]
 
     ct = stopwatch(5, ct)
 
@@ -496,122 +536,23 @@ def get_brick_matrix_smoke(cm, source, face_idx_matrix, brick_shell, source_deta
     return brick_freq_matrix, color_matrix
 
 
-def adjust_bfm(brick_freq_matrix, mat_shell_depth, calc_internals, face_idx_matrix=None, axes="xyz"):
-    """ adjust brick_freq_matrix values """
-    shell_vals = []
-    bfm_dim = [
-        len(brick_freq_matrix),
-        len(brick_freq_matrix[0]),
-        len(brick_freq_matrix[0][0]),
-    ]
+def get_smoke_sample_weights(s_idx:float, e_idx:float, res_per_loc:float, res:int, num_locs:int, quality:float):
+    """ get (num_locs, res) matrix marking the density grid voxels sampled along one axis for each lattice location from 's_idx' to 'e_idx' """
+    weights = np.zeros((num_locs, res))
+    for loc in range(int(s_idx), int(e_idx)):
+        if not 0 <= loc < num_locs:
+            continue
+        loc0 = loc - s_idx
+        rn = [max(0, int(res_per_loc * loc0)), int(res_per_loc * (loc0 + 1))]
+        rn[1] += 1 if rn[1] == rn[0] else 0
+        step = math.ceil((rn[1] - rn[0]) / quality)
+        weights[loc, rn[0]:rn[1]:step] = 1
+    return weights
 
-    # if generating shell outside mesh with less than three axes
-    if axes != "xyz":
-        for x in range(bfm_dim[0]):
-            for y in range(bfm_dim[1]):
-                for z in range(bfm_dim[2]):
-                    # if current location is inside (-1) and adjacent location is out of bounds, current location is shell (1)
-                    if (brick_freq_matrix[x][y][z] == -1 and
-                        (("z" not in axes and
-                          (z in (0, bfm_dim[2]-1) or
-                           brick_freq_matrix[x][y][z+1] == 0 or
-                           brick_freq_matrix[x][y][z-1] == 0)) or
-                         ("y" not in axes and
-                          (y in (0, bfm_dim[1]-1) or
-                           brick_freq_matrix[x][y+1][z] == 0 or
-                           brick_freq_matrix[x][y-1][z] == 0)) or
-                         ("x" not in axes and
-                          (x in (0, bfm_dim[0]-1) or
-                           brick_freq_matrix[x+1][y][z] == 0 or
-                           brick_freq_matrix[x-1][y][z] == 0))
-                      )):
-                        brick_freq_matrix[x][y][z] = 1
-                        # TODO: set face_idx_matrix value to nearest shell value using some sort of built in nearest poly to point function
-
-    # # iterate through all values except boundaries
-    # for x in range(1, bfm_dim[0] - 1):
-    #     for y in range(1, bfm_dim[1] - 1):
-    #         for z in range(1, bfm_dim[2] - 1):
-    #             # If inside location (-1) intersects outside location (0), make it ouside (0)
-    #             if (brick_freq_matrix[x][y][z] == -1 and
-    #                 (brick_freq_matrix[x+1][y][z] == 0 or
-    #                  brick_freq_matrix[x-1][y][z] == 0 or
-    #                  brick_freq_matrix[x][y+1][z] == 0 or
-    #                  brick_freq_matrix[x][y-1][z] == 0 or
-    #                  brick_freq_matrix[x][y][z+1] == 0 or
-    #                  brick_freq_matrix[x][y][z-1] == 0)):
-    #                 brick_freq_matrix[x][y][z] = 0
-
-    trash_vals = [0] if calc_internals else [0, -1]
-    all_shell_vals = []
-    # iterate through all values
-    for x in range(bfm_dim[0]):
-        for y in range(bfm_dim[1]):
-            for z in range(bfm_dim[2]):
-                # mark outside and unused inside brick_freq_matrix values for removal
-                if brick_freq_matrix[x][y][z] in trash_vals:
-                    brick_freq_matrix[x][y][z] = None
-                # get shell values for next calc
-                elif calc_internals and brick_freq_matrix[x][y][z] == 1:
-                    all_shell_vals.append((x, y, z))
-
-    if not calc_internals:
-        return
-
-    # iterate through all shell values
-    for x, y, z in all_shell_vals:
-        # If shell location (1) does not intersect outside/trashed/nonexistent location (0, None), make it inside (-1)
-        if brick_freq_matrix[x][y][z] == 1:
-            try:
-                surrounded = all((
-                    brick_freq_matrix[x+1][y][z],
-                    brick_freq_matrix[x-1][y][z],
-                    brick_freq_matrix[x][y+1][z],
-                    brick_freq_matrix[x][y-1][z],
-                    brick_freq_matrix[x][y][z+1],
-                    brick_freq_matrix[x][y][z-1],
-                ))
-            except IndexError:
-                # in this case, an adjacent loc is nonexistent, therefore the current loc cannot be surrounded
-                surrounded = False
-            if surrounded:
-                brick_freq_matrix[x][y][z] = -1
-                if face_idx_matrix:
-                    face_idx_matrix[x][y][z] = 0
-            else:
-                shell_vals.append((x, y, z))
-
-
-    # Update internals
-    j = 1
-    set_nf = True
-    for i in range(50):
-        j = j - 0.01
-        got_one = False
-        new_shell_vals = []
-        if set_nf:
-            set_nf = (1 - j) * 100 < mat_shell_depth
-        for x, y, z in shell_vals:
-            idxs_to_check = (
-                (x+1, y, z),
-                (x-1, y, z),
-                (x, y+1, z),
-                (x, y-1, z),
-                (x, y, z+1),
-                (x, y, z-1))
-            for idx in idxs_to_check:
-                try:
-                    cur_val = brick_freq_matrix[idx[0]][idx[1]][idx[2]]
-                except IndexError:
-                    continue
-                if cur_val == -1:
-                    new_shell_vals.append(idx)
-                    brick_freq_matrix[idx[0]][idx[1]][idx[2]] = j
-                    if face_idx_matrix and set_nf: face_idx_matrix[idx[0]][idx[1]][idx[2]] = face_idx_matrix[x][y][z]
-                    got_one = True
-        if not got_one:
-            break
-        shell_vals = new_shell_vals
+
+def sum_smoke_samples(grid:np.ndarray, weights:list):
+    """ sum values of smoke 'grid' (indexed by z, y, x) at the voxels marked by the x, y, z sample 'weights' for each lattice location """
+    return np.einsum("ax,by,cz,zyx->abc", weights[0], weights[1], weights[2], grid, optimize=True)
 
 
 def get_threshold(cm):
@@ -694,24 +635,51 @@ def make_bricksdict(source, source_details, brick_scale, grid_offset=0, cursor_s
         offset -= source.parent.location
         # shift offset to ensure lattice surrounds object
         offset -= vec_remainder(offset, brick_scale)
-    # get coordinate list from intersections of edges with faces
-    coord_matrix = generate_lattice(brick_scale, l_scale, offset, extra_res=1)
-    if len(coord_matrix) == 0:
-        coord_matrix.append(source_details.mid)
+    # get lattice surrounding the source
+    lattice = generate_lattice(brick_scale, l_scale, offset, extra_res=1)
+    if lattice.size == 0:
+        lattice = Lattice(source_details.mid, brick_scale, (1, 1, 1))
     # set calculation_axes
     calculation_axes = cm.calculation_axes if cm.brick_shell == "OUTSIDE" else "XYZ"
     # set up face_idx_matrix and brick_freq_matrix
-    face_idx_matrix = np.zeros((len(coord_matrix), len(coord_matrix[0]), len(coord_matrix[0][0])), dtype=int).tolist()
+    prefs = get_addon_preferences()
+    use_sparse_voxels = prefs.use_sparse_voxels and not cm.is_smoke
+    if use_sparse_voxels:
+        face_idx_matrix = ChunkedGrid(lattice.shape, dtype=object)
+    else:
+        face_idx_matrix = np.zeros(lattice.shape, dtype=int).tolist()
+    snapshot = None
     if cm.is_smoke:
         brick_freq_matrix, smoke_colors = get_brick_matrix_smoke(cm, source, face_idx_matrix, cm.brick_shell, source_details, cursor_status=cursor_status)
     else:
-        brick_freq_matrix = get_brick_matrix(source, face_idx_matrix, coord_matrix, cm.brick_shell, axes=calculation_axes, cursor_status=cursor_status)
+        shape = lattice.shape
+        brick_freq_matrix = None
+        if can_voxelize_in_parallel(cm, shape):
+            brick_freq_matrix = get_brick_matrix_parallel(cm, source, face_idx_matrix, (brick_scale, l_scale, offset), shape, axes=calculation_axes, cursor_status=cursor_status)
+        # fall back to voxelizing in the active Blender instance
+        if brick_freq_matrix is None and use_sparse_voxels:
+            brick_freq_matrix = get_brick_matrix_chunked(source, face_idx_matrix, lattice, cm.brick_shell, axes=calculation_axes, cursor_status=cursor_status)
+        elif brick_freq_matrix is None:
+            brick_freq_matrix = get_brick_matrix(source, face_idx_matrix, lattice, cm.brick_shell, axes=calculation_axes, cursor_status=cursor_status, adjust=False)
+        if use_sparse_voxels:
+            # NOTE: updating regions affected by source edits requires dense matrices, so models are fully regenerated instead
+            bricker_source_snapshot_cache.pop(cm.id, None)
+            adjust_bfm_chunked(brick_freq_matrix, cm.mat_shell_depth, cm.calc_internals, face_idx_matrix, axes=calculation_axes.lower())
+        else:
+            # store unadjusted matrix so edits to the source can be applied to the affected lattice regions only
+            if (cm.temporal_coherence and cm.use_animation) or (cm.incremental_updates and not cm.use_animation):
+                snapshot = get_source_snapshot(cm, source_details, (brick_scale, l_scale, offset), brick_freq_matrix, face_idx_matrix)
+            adjust_bfm(brick_freq_matrix, cm.mat_shell_depth, cm.calc_internals, face_idx_matrix, axes=calculation_axes.lower())
         smoke_colors = None
     # initialize active keys
     cm.active_key = (-1, -1, -1)
 
     # create bricks dictionary with brick_freq_matrix values
-    bricksdict = {}
+    # NOTE: sparse voxel storage keeps the bricksdict sparse too (dense bricksdicts allocate every lattice location)
+    if prefs.use_dense_bricksdict and not use_sparse_voxels:
+        bricksdict = DenseBricksdict(lattice.shape, model_name=n)
+    else:
+        bricksdict = {}
     threshold = get_threshold(cm)
     brick_type = cm.brick_type  # prevents cm.brick_type update function from running over and over in for loop
     uv_image = cm.uv_image
@@ -719,52 +687,203 @@ def make_bricksdict(source, source_details, brick_scale, grid_offset=0, cursor_s
     drawn_keys = []
     source_mats = cm.material_type == "SOURCE"
     noOffset = vec_round(offset, precision=5) == Vector((0, 0, 0))
-    for x in range(len(coord_matrix)):
-        for y in range(len(coord_matrix[0])):
-            for z in range(len(coord_matrix[0][0])):
-                # skip brick_freq_matrix values set to None
-                if brick_freq_matrix[x][y][z] is None:
-                    continue
+    # get lattice locations not set for removal (nan) and their coordinates
+    if use_sparse_voxels:
+        loc_arr = brick_freq_matrix.argwhere(lambda vals: ~np.isnan(vals))
+    else:
+        loc_arr = np.argwhere(~np.isnan(brick_freq_matrix))
+    cos = lattice.coords(loc_arr) if noOffset else lattice.coords(loc_arr) - np.array(source_details.mid)
+    locs = [tuple(loc) for loc in loc_arr.tolist()]
+    # sample UV image colors for all locations at once
+    if source_mats and not smoke_colors:
+        uv_colors = get_uv_colors_at_locs(source, face_idx_matrix, locs, uv_image)
+    else:
+        uv_colors = None
+    for loc, co in zip(locs, map(tuple, cos.tolist())):
+        # initialize variables
+        b_key = list_to_str(loc)
 
-                # initialize variables
-                b_key = list_to_str((x, y, z))
-
-                co = coord_matrix[x][y][z].to_tuple() if noOffset else (coord_matrix[x][y][z] - source_details.mid).to_tuple()
-
-                # get material from nearest face intersection point
-                nf = face_idx_matrix[x][y][z]["idx"] if type(face_idx_matrix[x][y][z]) == dict else None
-                ni = face_idx_matrix[x][y][z]["loc"].to_tuple() if type(face_idx_matrix[x][y][z]) == dict else None
-                nn = face_idx_matrix[x][y][z]["normal"] if type(face_idx_matrix[x][y][z]) == dict else None
-                val = round(brick_freq_matrix[x][y][z], 2)
-                draw = val >= threshold
-                norm_dir = get_normal_direction(nn, slopes=True)
-                b_type = get_brick_type(brick_type)
-                flipped, rotated = get_flip_rot("" if norm_dir is None else norm_dir[1:])
-                if smoke_colors:
-                    rgba = smoke_colors[x][y][z]
-                elif source_mats:
-                    rgba = get_uv_pixel_color(source, nf, ni if ni is None else Vector(ni), uv_image)
-                else:
-                    rgba = (0, 0, 0, 1)
-                # create bricksdict entry for current brick
-                bricksdict[b_key] = create_bricksdict_entry(
-                    name= "Bricker_%(n)s__%(b_key)s" % locals(),
-                    loc= [x, y, z],
-                    val= val,
-                    draw= draw,
-                    co= co,
-                    near_face= nf,
-                    near_intersection= ni,
-                    near_normal= norm_dir,
-                    rgba= rgba,
-                    # mat_name= "",  # defined in 'update_materials' function
-                    # obscures= [brick_freq_matrix[x][y][z] != 0]*6,
-                    b_type= b_type,
-                    flipped= flipped,
-                    rotated= rotated,
-                )
-                if build_is_dirty and draw:
-                    drawn_keys.append(b_key)
+        # create bricksdict entry for current brick
+        bricksdict[b_key] = get_bricksdict_entry_at(n, b_key, loc, co, brick_freq_matrix, face_idx_matrix, threshold, brick_type, source, source_mats, uv_image, smoke_colors, uv_colors)
+        if build_is_dirty and bricksdict[b_key]["draw"]:
+            drawn_keys.append(b_key)
+
+    # store snapshot for updating regions affected by source edits
+    if snapshot is not None:
+        store_source_snapshot(cm, snapshot, brick_freq_matrix)
 
     # return list of created Brick objects
     return bricksdict
+
+
+def get_bricksdict_entry_at(n, b_key, loc, co, brick_freq_matrix, face_idx_matrix, threshold, brick_type, source, source_mats, uv_image, smoke_colors=None, uv_colors=None):
+    """ create bricksdict entry for lattice location 'loc' from brick_freq_matrix and face_idx_matrix values (with UV image colors from 'uv_colors' if sampled in advance) """
+    x, y, z = loc
+    # get material from nearest face intersection point
+    face_d = face_idx_matrix[x][y][z]
+    nf = face_d["idx"] if type(face_d) == dict else None
+    ni = face_d["loc"].to_tuple() if type(face_d) == dict else None
+    nn = face_d["normal"] if type(face_d) == dict else None
+    val = round(float(brick_freq_matrix[x, y, z]), 2)
+    draw = val >= threshold
+    norm_dir = get_normal_direction(nn, slopes=True)
+    b_type = get_brick_type(brick_type)
+    flipped, rotated = get_flip_rot("" if norm_dir is None else norm_dir[1:])
+    if smoke_colors:
+        rgba = smoke_colors[x][y][z]
+    elif source_mats and uv_colors is not None:
+        rgba = uv_colors.get(loc)
+    elif source_mats:
+        rgba = get_uv_pixel_color(source, nf, ni if ni is None else Vector(ni), uv_image)
+    else:
+        rgba = (0, 0, 0, 1)
+    return create_bricksdict_entry(
+        name= "Bricker_%(n)s__%(b_key)s" % locals(),
+        loc= [x, y, z],
+        val= val,
+        draw= draw,
+        co= co,
+        near_face= nf,
+        near_intersection= ni,
+        near_normal= norm_dir,
+        rgba= rgba,
+        # mat_name= "",  # defined in 'update_materials' function
+        # obscures= [brick_freq_matrix[x][y][z] != 0]*6,
+        b_type= b_type,
+        flipped= flipped,
+        rotated= rotated,
+    )
+
+
+def get_uv_colors_at_locs(source, face_idx_matrix, locs, uv_image):
+    """ returns dictionary of RGBA values in source UV image at nearest face intersections of lattice 'locs' """
+    face_ds = [face_idx_matrix[x][y][z] for x, y, z in locs]
+    sampled = [(loc, face_d) for loc, face_d in zip(locs, face_ds) if type(face_d) == dict]
+    rgbas = get_uv_pixel_colors(source, [face_d["idx"] for _, face_d in sampled], [face_d["loc"] for _, face_d in sampled], uv_image)
+    return {loc: rgba for (loc, _), rgba in zip(sampled, rgbas)}
+
+
+def update_bricksdict_from_source_edits(source, source_details, bricksdict, tri_bounds, cursor_status=False):
+    """ re-voxelize lattice regions affected by edits to the source and update bricksdict entries accordingly
+
+    source         -- source duplicate with edits applied
+    source_details -- bounds of 'source'
+    bricksdict     -- bricksdict created from the source before it was edited
+    tri_bounds     -- (num_changed, 2, 3) array of bounds of source triangles that were edited
+    cursor_status  -- update mouse cursor with status of matrix creation
+
+    returns keys of bricksdict entries to redraw and names of stale brick objects (or None if the full bricksdict must be regenerated)
+    """
+    scn, cm, n = get_active_context_info()
+    snapshot = bricker_source_snapshot_cache.get(cm.id)
+    # lattice can only be reused if the matrix settings and source bounds are unchanged
+    if snapshot is None or snapshot["vals"] is None or cm.is_smoke:
+        return None
+    if snapshot["settings"] != get_matrix_settings_str(cm) or snapshot["bounds"] != get_snapshot_bounds(source_details):
+        return None
+    brick_scale, l_scale, offset = (Vector(vec) for vec in snapshot["lattice_args"])
+    raw_bfm = snapshot["raw_bfm"]
+    shape = raw_bfm.shape
+    if min(shape) < 2:
+        return None
+    # get region of lattice affected by the edits
+    lattice = generate_lattice(brick_scale, l_scale, offset, extra_res=1)
+    region = get_dirty_region(tri_bounds, lattice.origin, lattice.step, shape)
+    if region is None:
+        return set(), set()
+    min_loc, max_loc = region
+    # re-voxelize region with one extra location on each side (for shell calculations along region boundary)
+    pad_min = tuple(max(v - 1, 0) for v in min_loc)
+    pad_max = tuple(min(v + 1, s) for v, s in zip(max_loc, shape))
+    if any(v1 - v0 < 2 for v0, v1 in zip(pad_min, pad_max)):
+        return None
+    print("\nupdating blueprint for edited regions...")
+    region_lattice = lattice.get_region((pad_min, pad_max))
+    calculation_axes = cm.calculation_axes if cm.brick_shell == "OUTSIDE" else "XYZ"
+    region_face_idx_matrix = np.zeros(region_lattice.shape, dtype=int).tolist()
+    region_bfm = get_brick_matrix(source, region_face_idx_matrix, region_lattice, cm.brick_shell, axes=calculation_axes, cursor_status=cursor_status, adjust=False)
+
+    # patch unadjusted matrix and nearest faces within region
+    region_slice = tuple(slice(v0, v1) for v0, v1 in zip(min_loc, max_loc))
+    inner_slice = tuple(slice(v0 - p0, v1 - p0) for v0, v1, p0 in zip(min_loc, max_loc, pad_min))
+    raw_bfm[region_slice] = region_bfm[inner_slice]
+    region_faces = np.zeros(tuple(v1 - v0 for v0, v1 in zip(min_loc, max_loc)), dtype=object)
+    for x, y, z in np.argwhere(raw_bfm[region_slice] == 1).tolist():
+        face_d = region_face_idx_matrix[x + inner_slice[0].start][y + inner_slice[1].start][z + inner_slice[2].start]
+        if type(face_d) == dict:
+            region_faces[x, y, z] = face_d
+    faces = snapshot["faces"]
+    faces.set_block(min_loc, region_faces)
+
+    # adjust locations within reach of the region (internal values depend on distance from the shell)
+    (adjust_min, adjust_max), (window_min, window_max) = get_adjust_region(region, shape, cm.calc_internals)
+    window_slice = tuple(slice(v0, v1) for v0, v1 in zip(window_min, window_max))
+    adjust_slice = tuple(slice(v0, v1) for v0, v1 in zip(adjust_min, adjust_max))
+    adjust_inner_slice = tuple(slice(v0 - w0, v1 - w0) for v0, v1, w0 in zip(adjust_min, adjust_max, window_min))
+    window_bfm = raw_bfm[window_slice].astype(np.float32)
+    window_faces = faces.get_block(window_min, window_max)
+    adjust_bfm(window_bfm, cm.mat_shell_depth, cm.calc_internals, window_faces, axes=calculation_axes.lower())
+    # NOTE: adjusted values are only read within the adjusted region, so they are stored sparsely
+    brick_freq_matrix = ChunkedGrid(shape, dtype=np.float32, fill_value=np.nan)
+    brick_freq_matrix.set_block(adjust_min, window_bfm[adjust_inner_slice])
+    face_idx_matrix = ChunkedGrid(shape, dtype=object)
+    face_idx_matrix.set_block(adjust_min, window_faces[adjust_inner_slice])
+    # get locations within the region or with changed values (ignoring locations outside the model before and after)
+    vals = window_bfm[adjust_inner_slice]
+    old_vals = snapshot["vals"][adjust_slice]
+    in_region = np.zeros(vals.shape, dtype=bool)
+    in_region[tuple(slice(v0 - a0, v1 - a0) for v0, v1, a0 in zip(min_loc, max_loc, adjust_min))] = True
+    changed = (in_region | (old_vals != vals)) & ~(np.isnan(old_vals) & np.isnan(vals))
+    changed_locs = (np.argwhere(changed) + adjust_min).tolist()
+    changed_keys = [list_to_str(loc) for loc in changed_locs]
+    snapshot["vals"][adjust_slice] = vals
+
+    # split bricks at and adjacent to changed locations so they can be redrawn
+    keys_to_update = set()
+    split_parent_keys = set()
+    stale_brick_names = set()
+    for x, y, z in changed_locs:
+        for loc in ((x, y, z), (x+1, y, z), (x-1, y, z), (x, y+1, z), (x, y-1, z), (x, y, z+1), (x, y, z-1)):
+            k = list_to_str(loc)
+            if k not in bricksdict:
+                continue
+            parent_key = k if bricksdict[k]["parent"] == "self" else bricksdict[k]["parent"]
+            if parent_key is None or parent_key in split_parent_keys:
+                continue
+            split_parent_keys.add(parent_key)
+            stale_brick_names.add(bricksdict[parent_key]["name"])
+            keys_to_update |= split_brick(bricksdict, parent_key, cm.zstep, cm.brick_type)
+            keys_to_update.add(k)
+
+    # create new bricksdict entries at changed locations
+    threshold = get_threshold(cm)
+    source_mats = cm.material_type == "SOURCE"
+    no_offset = vec_round(offset, precision=5) == Vector((0, 0, 0))
+    uv_colors = get_uv_colors_at_locs(source, face_idx_matrix, [tuple(loc) for loc in changed_locs if not np.isnan(brick_freq_matrix[tuple(loc)])], cm.uv_image) if source_mats else None
+    for (x, y, z), b_key in zip(changed_locs, changed_keys):
+        old_brick_d = bricksdict.get(b_key)
+        if np.isnan(brick_freq_matrix[x, y, z]):
+            if old_brick_d is not None:
+                bricksdict.pop(b_key)
+                keys_to_update.discard(b_key)
+            continue
+        co = lattice.co((x, y, z))
+        co = co.to_tuple() if no_offset else (co - source_details.mid).to_tuple()
+        brick_d = get_bricksdict_entry_at(n, b_key, (x, y, z), co, brick_freq_matrix, face_idx_matrix, threshold, cm.brick_type, source, source_mats, cm.uv_image, uv_colors=uv_colors)
+        # preserve custom materials
+        if old_brick_d is not None and old_brick_d["custom_mat_name"]:
+            brick_d["mat_name"] = old_brick_d["mat_name"]
+            brick_d["custom_mat_name"] = True
+        bricksdict[b_key] = brick_d
+        keys_to_update.add(b_key)
+
+    # reset merge info so updated keys are merged again when drawn
+    for k in keys_to_update:
+        brick_d = bricksdict[k]
+        brick_d["size"] = None
+        brick_d["parent"] = None
+        brick_d["top_exposed"] = None
+        brick_d["bot_exposed"] = None
+        brick_d["attempted_merge"] = False
+
+    return keys_to_update, stale_brick_names
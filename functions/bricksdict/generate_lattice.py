@@ -28,8 +28,43 @@ from mathutils import Vector
 from ..common import *
 
 
-def generate_lattice(vert_dist:Vector, scale:Vector, offset:Vector=Vector((0, 0, 0)), extra_res:int=0, visualize:bool=False):
-    """ return lattice coordinate matrix surrounding object of size 'scale'
+class Lattice:
+    """ regular lattice of coordinates described by the coordinate of its first location, the distance between locations, and its shape
+
+    Coordinates are computed on access rather than stored ('co' for a single location, 'coords' for all locations as a numpy array)
+    """
+
+    def __init__(self, origin, step, shape):
+        self.origin = np.array(origin, dtype=np.float64)
+        self.step = np.array(step, dtype=np.float64)
+        self.shape = tuple(int(v) for v in shape)
+        # python floats for fast access to single coordinates
+        self._origin = tuple(self.origin.tolist())
+        self._step = tuple(self.step.tolist())
+
+    @property
+    def size(self):
+        return self.shape[0] * self.shape[1] * self.shape[2]
+
+    def co(self, loc):
+        """ get coordinate of lattice location 'loc' """
+        (ox, oy, oz), (sx, sy, sz), (x, y, z) = self._origin, self._step, loc
+        return Vector((ox + sx * x, oy + sy * y, oz + sz * z))
+
+    def coords(self, locs=None):
+        """ get coordinates of lattice locations 'locs' ((n, 3) array) as (n, 3) array (or of all locations as (nx, ny, nz, 3) array if None) """
+        if locs is None:
+            locs = np.moveaxis(np.indices(self.shape), 0, -1)
+        return self.origin + np.asarray(locs) * self.step
+
+    def get_region(self, region):
+        """ get lattice of locations from min (inclusive) to max (exclusive) lattice loc, passed as (min_loc, max_loc) """
+        (x0, y0, z0), (x1, y1, z1) = region
+        return Lattice(self.origin + np.array((x0, y0, z0)) * self.step, self.step, (max(x1 - x0, 0), max(y1 - y0, 0), max(z1 - z0, 0)))
+
+
+def generate_lattice(vert_dist:Vector, scale:Vector, offset:Vector=Vector((0, 0, 0)), extra_res:int=0, visualize:bool=False, region:tuple=None):
+    """ return lattice surrounding object of size 'scale'
 
     Keyword arguments:
     vert_dist  -- distance between lattice verts in 3D space
@@ -37,6 +72,7 @@ def generate_lattice(vert_dist:Vector, scale:Vector, offset:Vector=Vector((0, 0,
     offset    -- offset lattice center from origin
     extra_res -- additional resolution to add to ends of lattice
     visualize -- draw lattice coordinates in 3D space
+    region    -- only return coordinates from min (inclusive) to max (exclusive) lattice loc, passed as (min_loc, max_loc)
 
     """
 
@@ -47,20 +83,22 @@ def generate_lattice(vert_dist:Vector, scale:Vector, offset:Vector=Vector((0, 0,
     # round up lattice res
     res = Vector(round_up(round(val), 2) for val in res)
     h_res = res / 2
-    # populate coord matrix
+    # describe lattice by its first coordinate, spacing and shape
     nx, ny, nz = round(res.x) - 1 + extra_res, round(res.y) - 1 + extra_res, round(res.z) - 1 + extra_res
-    create_coord = lambda v: vec_mult(v - h_res, vert_dist) + offset
-    coord_matrix = [[[create_coord(Vector((x, y, z))) for z in range(nz)] for y in range(ny)] for x in range(nx)]
+    origin = vec_mult(-h_res, vert_dist) + offset
+    lattice = Lattice(origin, vert_dist, (max(nx, 0), max(ny, 0), max(nz, 0)))
+    if region is not None:
+        lattice = lattice.get_region(region)
 
     if visualize:
         # create bmesh
         bme = bmesh.new()
-        vert_matrix = np.zeros((nx, ny, nz)).tolist()
+        vert_matrix = np.zeros(lattice.shape).tolist()
         # add vertex for each coordinate
-        for x in range(len(coord_matrix)):
-            for y in range(len(coord_matrix[0])):
-                for z in range(len(coord_matrix[0][0])):
-                    vert_matrix[x][y][z] = bme.verts.new(coord_matrix[x][y][z])
+        for x in range(lattice.shape[0]):
+            for y in range(lattice.shape[1]):
+                for z in range(lattice.shape[2]):
+                    vert_matrix[x][y][z] = bme.verts.new(lattice.co((x, y, z)))
                     # create new edges from vert
                     if x != 0: bme.edges.new((vert_matrix[x][y][z], vert_matrix[x-1][y][z]))
                     if y != 0: bme.edges.new((vert_matrix[x][y][z], vert_matrix[x][y-1][z]))
@@ -68,4 +106,4 @@ def generate_lattice(vert_dist:Vector, scale:Vector, offset:Vector=Vector((0, 0,
         # draw bmesh verts in 3D space
         draw_bmesh(bme)
 
-    return coord_matrix
+    return lattice
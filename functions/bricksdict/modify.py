@@ -23,6 +23,7 @@ import bpy
 
 # Module imports
 from .connected_components import *
+from .dense import DenseBricksdict
 from .exposure import *
 from ..mat_utils import *
 from ..matlist_utils import *
@@ -53,20 +54,29 @@ def update_materials(bricksdict, source_dup, keys, cur_frame=None, action="CREAT
     use_abs_template = cm.use_abs_template and brick_materials_installed()
     last_use_abs_template = cm.last_use_abs_template and brick_materials_installed()
     rgba_vals = []
+    # skip irrelevant bricks
+    keys = [key for key in keys if bricksdict[key]["draw"] and (bricksdict[key]["near_face"] is not None or is_smoke) and not (bricksdict[key]["custom_mat_name"] and bricksdict[key]["val"] == 1)]
+    # get RGBA values at nearest face intersections for all bricks at once
+    if not is_smoke and material_type != "CUSTOM":
+        face_idxs = [bricksdict[key]["near_face"] for key in keys]
+        points = [bricksdict[key]["near_intersection"] for key in keys]
+        brick_rgbas, brick_mat_names = get_brick_rgbas(source_dup, face_idxs, points, uv_image, color_depth=color_depth, blur_radius=blur_radius)
+    # snap RGBA values to nearest ABS plastic materials for all bricks at once
+    if material_type == "SOURCE" and color_snap == "ABS" and len(keys) > 0:
+        mat_obj = get_mat_obj(cm, typ="ABS")
+        assert len(mat_obj.data.materials) > 0
+        snapped_mat_names = find_nearest_brick_color_names([bricksdict[key]["rgba"] for key in keys] if is_smoke else brick_rgbas, trans_weight, mat_obj)
+    # create materials for the unique RGBA values of all bricks at once
+    elif material_type == "SOURCE" and (color_snap == "RGB" or is_smoke) and len(keys) > 0:
+        new_mat_names = create_new_materials(n, [bricksdict[key]["rgba"] for key in keys] if is_smoke else brick_rgbas, sss, sat_mat, specular, roughness, ior, transmission, displacement, use_abs_template, last_use_abs_template, include_transparency, cur_frame, max_materials=cm.max_rgb_materials)
     # get original mat_names, and populate rgba_vals
-    for key in keys:
+    for i, key in enumerate(keys):
         brick_d = bricksdict[key]
-        # skip irrelevant bricks
-        nf = brick_d["near_face"]
-        if not brick_d["draw"] or (nf is None and not is_smoke) or (brick_d["custom_mat_name"] and brick_d["val"] == 1):
-            continue
-        # get RGBA value at nearest face intersection
         if is_smoke:
             rgba = brick_d["rgba"]
             mat_name = ""
-        else:
-            ni = Vector(brick_d["near_intersection"])
-            rgba, mat_name = get_brick_rgba(source_dup, nf, ni, uv_image, color_depth=color_depth, blur_radius=blur_radius)
+        elif material_type != "CUSTOM":
+            rgba, mat_name = brick_rgbas[i], brick_mat_names[i]
 
         if material_type == "SOURCE":
             # get material with snapped RGBA value
@@ -78,11 +88,9 @@ def update_materials(bricksdict, source_dup, keys, cur_frame=None, action="CREAT
                     pass
                 # otherwise, find nearest ABS plastic material to rgba value
                 else:
-                    mat_obj = get_mat_obj(cm, typ="ABS")
-                    assert len(mat_obj.data.materials) > 0
-                    mat_name = find_nearest_brick_color_name(rgba, trans_weight, mat_obj)
+                    mat_name = snapped_mat_names[i]
             elif color_snap == "RGB" or is_smoke:# or use_uv_map:
-                mat_name = create_new_material(n, rgba, rgba_vals, sss, sat_mat, specular, roughness, ior, transmission, displacement, use_abs_template, last_use_abs_template, include_transparency, cur_frame)
+                mat_name = new_mat_names[i]
             if rgba is not None:
                 rgba_vals.append(rgba)
         elif material_type == "CUSTOM":
@@ -108,6 +116,8 @@ def update_brick_sizes(bricksdict, key, loc, brick_sizes, zstep, max_L, height_3
     break_outer1 = False
     break_outer2 = False
     brick_mat_name = bricksdict[key]["mat_name"]
+    # check dense bricksdict availability by lattice location instead of by key
+    dense = isinstance(bricksdict, DenseBricksdict)
     # iterate in x direction
     for i in range(max_L[0]):
         # iterate in y direction
@@ -115,8 +125,11 @@ def update_brick_sizes(bricksdict, key, loc, brick_sizes, zstep, max_L, height_3
             # break case 1
             if j >= new_max1: break
             # break case 2
-            key1 = list_to_str((loc[0] + (i * mult[0]), loc[1] + (j * mult[1]), loc[2]))
-            brick_available, brick_mat_name = brick_avail(bricksdict, key1, brick_mat_name, merge_internals_h, material_type, merge_inconsistent_mats)
+            loc1 = (loc[0] + (i * mult[0]), loc[1] + (j * mult[1]), loc[2])
+            if dense:
+                brick_available, brick_mat_name = brick_avail_at(bricksdict, loc1, brick_mat_name, merge_internals_h, material_type, merge_inconsistent_mats)
+            else:
+                brick_available, brick_mat_name = brick_avail(bricksdict, list_to_str(loc1), brick_mat_name, merge_internals_h, material_type, merge_inconsistent_mats)
             if not brick_available:
                 if j == 0: break_outer2 = True
                 else:      new_max1 = j
@@ -126,8 +139,11 @@ def update_brick_sizes(bricksdict, key, loc, brick_sizes, zstep, max_L, height_3
                 # break case 1
                 if k >= new_max2: break
                 # break case 2
-                key2 = list_to_str((loc[0] + (i * mult[0]), loc[1] + (j * mult[1]), loc[2] + (k * mult[2])))
-                brick_available, brick_mat_name = brick_avail(bricksdict, key2, brick_mat_name, merge_internals_v, material_type, merge_inconsistent_mats)
+                loc2 = (loc1[0], loc1[1], loc[2] + (k * mult[2]))
+                if dense:
+                    brick_available, brick_mat_name = brick_avail_at(bricksdict, loc2, brick_mat_name, merge_internals_v, material_type, merge_inconsistent_mats)
+                else:
+                    brick_available, brick_mat_name = brick_avail(bricksdict, list_to_str(loc2), brick_mat_name, merge_internals_v, material_type, merge_inconsistent_mats)
                 if not brick_available:
                     if k == 0: break_outer1 = True
                     else:      new_max2 = k
@@ -146,7 +162,7 @@ def update_brick_sizes(bricksdict, key, loc, brick_sizes, zstep, max_L, height_3
         if break_outer2: break
 
 
-def attempt_pre_merge(bricksdict, key, default_size, zstep, brick_type, max_width, max_depth, legal_bricks_only, merge_internals_h, merge_internals_v, material_type, loc=None, axis_sort_order=(2, 0, 1), merge_inconsistent_mats=False, prefer_largest=False, direction_mult=(1, 1, 1), merge_vertical=True, target_type=None, height_3_only=False):
+def attempt_pre_merge(bricksdict, key, default_size, zstep, brick_type, max_width, max_depth, legal_bricks_only, merge_internals_h, merge_internals_v, material_type, loc=None, axis_sort_order=(2, 0, 1), merge_inconsistent_mats=False, prefer_largest=False, direction_mult=(1, 1, 1), merge_vertical=True, target_type=None, height_3_only=False, merge_grid=None):
     """ attempt to merge bricksdict[key] with adjacent bricks (assuming available keys are all 1x1s) """
     # get loc from key
     loc = loc or get_dict_loc(bricksdict, key)
@@ -159,17 +175,25 @@ def attempt_pre_merge(bricksdict, key, default_size, zstep, brick_type, max_widt
         # check width-depth and depth-width
         for i in (1, -1) if max_width != max_depth else [1]:
             # iterate through adjacent locs to find available brick sizes
-            update_brick_sizes(bricksdict, key, loc, brick_sizes, zstep, [max_width, max_depth][::i] + [3], height_3_only, merge_internals_h, merge_internals_v, material_type, merge_inconsistent_mats, merge_vertical=merge_vertical, mult=direction_mult)
-        # get largest (legal, if checked) brick size found
-        brick_sizes.sort(key=lambda v: -abs(v[0] * v[1] * v[2]) if prefer_largest else (-abs(v[axis_sort_order[0]]), -abs(v[axis_sort_order[1]]), -abs(v[axis_sort_order[2]])))
-        target_brick_size = next((sz for sz in brick_sizes if not (legal_bricks_only and not is_legal_brick_size(size=[abs(v) for v in sz], type=tall_type if abs(sz[2]) == 3 else short_type))), None)
+            if merge_grid is None:
+                update_brick_sizes(bricksdict, key, loc, brick_sizes, zstep, [max_width, max_depth][::i] + [3], height_3_only, merge_internals_h, merge_internals_v, material_type, merge_inconsistent_mats, merge_vertical=merge_vertical, mult=direction_mult)
+            else:
+                merge_grid.update_brick_sizes(bricksdict, key, loc, brick_sizes, zstep, [max_width, max_depth][::i] + [3], height_3_only, merge_internals_h, merge_internals_v, merge_inconsistent_mats, merge_vertical=merge_vertical, mult=direction_mult)
+        # get largest (legal, if checked) brick size found (first of equally sorted sizes, as with a stable sort)
+        sort_key = lambda v: -abs(v[0] * v[1] * v[2]) if prefer_largest else (-abs(v[axis_sort_order[0]]), -abs(v[axis_sort_order[1]]), -abs(v[axis_sort_order[2]]))
+        target_brick_size = min((sz for sz in brick_sizes if not (legal_bricks_only and not is_legal_brick_size(size=[abs(v) for v in sz], type=tall_type if abs(sz[2]) == 3 else short_type))), key=sort_key, default=None)
         assert target_brick_size is not None
         # get new brick_size, loc, and key for largest brick size
         key, loc, brick_size = get_new_parent_key_loc_and_size_flipped(target_brick_size, loc, zstep)
 
     # update bricksdict for keys merged together
     keys_in_brick = get_keys_in_brick(bricksdict, brick_size, zstep, loc=loc)
-    update_merged_keys_in_bricksdict(bricksdict, key, keys_in_brick, brick_size, brick_type, short_type, tall_type, set_attempted_merge=True)
+    merged_type = (short_type if brick_size[2] == 1 else tall_type) if flat_brick_type(brick_type) else None
+    # dense bricksdicts store the merged brick with column slices (slopes still need per-key flip and rotation)
+    if not (isinstance(bricksdict, DenseBricksdict) and (merged_type or bricksdict[key]["type"]) != "SLOPE" and bricksdict.merge_brick_at(loc, brick_size, zstep, merged_type=merged_type)):
+        update_merged_keys_in_bricksdict(bricksdict, key, keys_in_brick, brick_size, brick_type, short_type, tall_type, set_attempted_merge=True)
+    if merge_grid is not None:
+        merge_grid.mark_merged(loc, brick_size, zstep)
 
     return brick_size, key, keys_in_brick
 
@@ -337,6 +361,9 @@ def set_brick_val(bricksdict, loc=None, key=None, action="ADD"):
 def get_adj_keys(bricksdict, loc=None, key=None):
     assert loc or key
     x, y, z = loc or get_dict_loc(bricksdict, key)
+    if isinstance(bricksdict, DenseBricksdict):
+        adj_locs = ((x+1, y, z), (x-1, y, z), (x, y+1, z), (x, y-1, z), (x, y, z+1), (x, y, z-1))
+        return set(list_to_str(adj_loc) for adj_loc in adj_locs if bricksdict.exists_at(*adj_loc))
     adj_keys = set((
         list_to_str((x+1, y, z)),
         list_to_str((x-1, y, z)),
@@ -485,6 +512,29 @@ def brick_avail(bricksdict, target_key, brick_mat_name, merge_with_internals, ma
     return True, brick_mat_name
 
 
+def brick_avail_at(bricksdict, loc, brick_mat_name, merge_with_internals, material_type, merge_inconsistent_mats):
+    """ check brick at lattice location of dense bricksdict is available to merge (see 'brick_avail') """
+    x, y, z = loc
+    if not bricksdict.in_bounds(x, y, z):
+        return brick_avail(bricksdict, list_to_str(loc), brick_mat_name, merge_with_internals, material_type, merge_inconsistent_mats)
+    # ensure brick exists and should be drawn
+    if not (bricksdict.column("exists")[x, y, z] and bricksdict.column("draw")[x, y, z]):
+        return False, brick_mat_name
+    # ensure brick hasn't already been merged and is available for merging
+    if bricksdict.column("attempted_merge")[x, y, z] or not bricksdict.column("available_for_merge")[x, y, z]:
+        return False, brick_mat_name
+    # ensure brick materials can be merged (same material or one of the mats is "" (internal)
+    strings = bricksdict.strings()
+    mat_name = strings[bricksdict.column("mat_name")[x, y, z]]
+    if not (brick_mat_name == mat_name or (merge_with_internals and "" in (brick_mat_name, mat_name)) or merge_inconsistent_mats):
+        return False, brick_mat_name
+    # set brick material name if it wasn't already set
+    elif brick_mat_name == "":
+        brick_mat_name = mat_name
+    # ensure brick type is mergable
+    return mergable_brick_type(strings[bricksdict.column("type")[x, y, z]], up=False), brick_mat_name
+
+
 def mats_are_mergable(brick_d, brick_mat_name, merge_with_internals, merge_inconsistent_mats=False):
     return brick_mat_name == brick_d["mat_name"] or (merge_with_internals and "" in (brick_mat_name, brick_d["mat_name"])) or merge_inconsistent_mats
 
@@ -0,0 +1,233 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+# NONE!
+
+# Blender imports
+# NONE!
+
+# Module imports
+from ..common import *
+from ..general import *
+from ..brick import *
+
+
+class PreMergeGrid:
+    """ per Z layer integer grids of merge availability used to find pre-merge brick sizes without per-key lookups
+
+    Each lattice location in a layer is stored as a code: -1 if the brick is unavailable for merging (see 'brick_avail'),
+    else '2 * mat_id + type_mergable' (mat_id 0 is the internal material ""). For each layer, 'runs_pos' and 'runs_neg'
+    store the number of consecutive locations (capped at 'cap') in the +y and -y directions holding the same code as
+    a mergable brick type, so runs of mergable bricks are skipped one material segment at a time. Grids span the drawn
+    target keys in 'keys_dict' (padded by 'cap' if other bricksdict keys may be merged with), and layers are read from
+    the bricksdict on first access; call 'mark_merged' whenever bricks are merged to keep the grids up to date.
+    """
+
+    def __init__(self, bricksdict:dict, cap:int, keys_dict:dict, target_keys:set):
+        self.bricksdict = bricksdict
+        self.cap = max(1, cap)
+        self.keys_dict = keys_dict
+        locs = [str_to_list(key)[:2] for keys in keys_dict.values() for key in keys]
+        # bricks merged from the target keys may extend into other bricksdict keys, so look up locations around them by key
+        self.lookup_keys = len(target_keys) < len(bricksdict)
+        pad = self.cap - 1 if self.lookup_keys else 0
+        self.min_x = min((loc[0] for loc in locs), default=0) - pad
+        self.min_y = min((loc[1] for loc in locs), default=0) - pad
+        self.size_x = max((loc[0] for loc in locs), default=-1) - self.min_x + 1 + pad
+        self.size_y = max((loc[1] for loc in locs), default=-1) - self.min_y + 1 + pad
+        self.mat_ids = {"": 0}
+        self.type_mergable = {}
+        self.layers = {}
+
+    def get_mat_id(self, mat_name):
+        try:
+            return self.mat_ids[mat_name]
+        except KeyError:
+            self.mat_ids[mat_name] = len(self.mat_ids)
+            return self.mat_ids[mat_name]
+
+    def get_layer(self, z:int):
+        """ get (codes, runs_pos, runs_neg) lists indexed [x][y] for layer 'z' (None if no bricks exist at 'z') """
+        try:
+            return self.layers[z]
+        except KeyError:
+            pass
+        if self.lookup_keys:
+            layer_keys = self._get_layer_keys_in_bounds(z)
+        elif z in self.keys_dict:
+            layer_keys = ((*str_to_list(key)[:2], key) for key in self.keys_dict[z])
+        else:
+            return None
+        codes = [[-1] * self.size_y for _ in range(self.size_x)]
+        for x, y, key in layer_keys:
+            brick_d = self.bricksdict[key]
+            if not brick_d["draw"] or brick_d["attempted_merge"] or not brick_d["available_for_merge"]:
+                continue
+            typ = brick_d["type"]
+            if typ not in self.type_mergable:
+                self.type_mergable[typ] = mergable_brick_type(typ, up=False)
+            codes[x - self.min_x][y - self.min_y] = self.get_mat_id(brick_d["mat_name"]) * 2 + self.type_mergable[typ]
+        runs_pos = [self._get_runs(row) for row in codes]
+        runs_neg = [self._get_runs(row[::-1])[::-1] for row in codes]
+        self.layers[z] = codes, runs_pos, runs_neg
+        return self.layers[z]
+
+    def check_brick(self, x:int, y:int, z:int, brick_mat_id:int, merge_with_internals:bool, merge_inconsistent_mats:bool):
+        """ check brick at grid location is available to merge (see 'brick_avail') """
+        layer = self.get_layer(z)
+        if layer is None or not (0 <= x < self.size_x and 0 <= y < self.size_y):
+            return False, brick_mat_id
+        code = layer[0][x][y]
+        if code == -1:
+            return False, brick_mat_id
+        mat_id = code >> 1
+        if not (mat_id == brick_mat_id or (merge_with_internals and 0 in (brick_mat_id, mat_id)) or merge_inconsistent_mats):
+            return False, brick_mat_id
+        elif brick_mat_id == 0:
+            brick_mat_id = mat_id
+        return code & 1 == 1, brick_mat_id
+
+    def get_run(self, x:int, y:int, z:int, step:int, brick_mat_id:int, merge_with_internals:bool, merge_inconsistent_mats:bool, limit:int):
+        """ get number of consecutive available bricks from grid location in y direction 'step' (assumes 'brick_mat_id' is fixed) """
+        layer = self.get_layer(z)
+        if layer is None or not 0 <= x < self.size_x:
+            return 0
+        codes = layer[0][x]
+        runs = layer[1 if step > 0 else 2][x]
+        n = 0
+        while n < limit:
+            y1 = y + n * step
+            if not 0 <= y1 < self.size_y or runs[y1] == 0:
+                break
+            mat_id = codes[y1] >> 1
+            if not (mat_id == brick_mat_id or (merge_with_internals and mat_id == 0) or merge_inconsistent_mats):
+                break
+            n += runs[y1]
+        return min(n, limit)
+
+    def update_brick_sizes(self, bricksdict:dict, key:str, loc:list, brick_sizes:list, zstep:int, max_L:list, height_3_only:bool, merge_internals_h:bool, merge_internals_v:bool, merge_inconsistent_mats:bool=False, merge_vertical:bool=False, mult:tuple=(1, 1, 1)):
+        """ update 'brick_sizes' with available brick sizes surrounding bricksdict[key] (same results as 'update_brick_sizes') """
+        if not merge_vertical:
+            max_L[2] = 1
+        new_max1 = max_L[1]
+        new_max2 = max_L[2]
+        found_sizes = set(tuple(sz) for sz in brick_sizes)
+        brick_mat_id = self.get_mat_id(bricksdict[key]["mat_name"])
+        x0, y0, z0 = loc[0] - self.min_x, loc[1] - self.min_y, loc[2]
+        # vertical checks beyond the current layer only occur for multi-layer bricks
+        vertical_layers = len(range(0, max_L[2], zstep)) > 1
+        for i in range(max_L[0]):
+            x = x0 + i * mult[0]
+            # material of brick can't change, so available bricks in this row are known from the run lengths
+            mat_fixed = brick_mat_id != 0 or merge_inconsistent_mats or not (merge_internals_h or merge_internals_v)
+            run = self.get_run(x, y0, z0, mult[1], brick_mat_id, merge_internals_h, merge_inconsistent_mats, new_max1) if mat_fixed else None
+            # vertical check of the current layer matches the horizontal check, so sizes can be added directly
+            if mat_fixed and not vertical_layers and (merge_internals_v or not merge_internals_h or merge_inconsistent_mats):
+                for j in range(run):
+                    new_size = ((i + 1) * mult[0], (j + 1) * mult[1], zstep * mult[2])
+                    if new_size not in found_sizes and not (abs(new_size[2]) == 1 and height_3_only):
+                        found_sizes.add(new_size)
+                        brick_sizes.append(list(new_size))
+                if run == 0:
+                    break
+                new_max1 = run
+                continue
+            break_row = False
+            for j in range(new_max1):
+                y = y0 + j * mult[1]
+                if run is None:
+                    brick_available, brick_mat_id = self.check_brick(x, y, z0, brick_mat_id, merge_internals_h, merge_inconsistent_mats)
+                else:
+                    brick_available = j < run
+                if not brick_available:
+                    if j == 0:
+                        return
+                    new_max1 = j
+                    break
+                # check vertically
+                for k in range(0, max_L[2], zstep):
+                    if k >= new_max2:
+                        break
+                    brick_available, brick_mat_id = self.check_brick(x, y, z0 + (k * mult[2]), brick_mat_id, merge_internals_v, merge_inconsistent_mats)
+                    if not brick_available:
+                        if k == 0: break_row = True
+                        else:      new_max2 = k
+                        break
+                    # bricks with 2/3 height can't exist
+                    elif k == 1:
+                        continue
+                    new_size = ((i + 1) * mult[0], (j + 1) * mult[1], (k + zstep) * mult[2])
+                    if new_size not in found_sizes and not (abs(new_size[2]) == 1 and height_3_only):
+                        found_sizes.add(new_size)
+                        brick_sizes.append(list(new_size))
+                if break_row:
+                    break
+
+    def mark_merged(self, loc:list, size:list, zstep:int):
+        """ mark bricks in brick of 'size' at 'loc' as unavailable for merge """
+        y_start = loc[1] - self.min_y
+        y_end = y_start + size[1]
+        for z in range(loc[2], loc[2] + -(-size[2] // zstep)):
+            # layers not yet read from the bricksdict will get merged bricks from 'attempted_merge'
+            layer = self.layers.get(z)
+            if layer is None:
+                continue
+            for x in range(loc[0] - self.min_x, loc[0] - self.min_x + size[0]):
+                codes, runs_pos, runs_neg = layer[0][x], layer[1][x], layer[2][x]
+                for y in range(y_start, y_end):
+                    codes[y] = -1
+                    runs_pos[y] = 0
+                    runs_neg[y] = 0
+                # truncate runs reaching into the merged bricks
+                y = y_start - 1
+                while y >= 0 and runs_pos[y] > y_start - y:
+                    runs_pos[y] = y_start - y
+                    y -= 1
+                y = y_end
+                while y < self.size_y and runs_neg[y] > y - y_end + 1:
+                    runs_neg[y] = y - y_end + 1
+                    y += 1
+
+    #############################################
+    # internal methods
+
+    def _get_layer_keys_in_bounds(self, z:int):
+        """ get (x, y, key) for bricksdict keys within grid bounds at layer 'z' """
+        bricksdict = self.bricksdict
+        for x in range(self.min_x, self.min_x + self.size_x):
+            for y in range(self.min_y, self.min_y + self.size_y):
+                key = list_to_str((x, y, z))
+                if key in bricksdict:
+                    yield x, y, key
+
+    def _get_runs(self, codes:list):
+        """ get number of consecutive mergable locations with the same code starting at each location of 'codes' """
+        runs = [0] * len(codes)
+        run = 0
+        next_code = -1
+        for y in range(len(codes) - 1, -1, -1):
+            code = codes[y]
+            if code == -1 or code & 1 == 0:
+                run = 0
+            elif code == next_code:
+                run = min(run + 1, self.cap)
+            else:
+                run = 1
+            runs[y] = run
+            next_code = code
+        return runs
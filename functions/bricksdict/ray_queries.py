@@ -0,0 +1,110 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import time
+import numpy as np
+
+# Blender imports
+import bpy
+from mathutils.bvhtree import BVHTree
+
+# Module imports
+from ..common import *
+from ..hash_object import hash_object
+from ...lib.caches import bricker_bvh_cache
+
+# number of rays cast since 'reset_ray_query_stats' was last called
+ray_query_stats = {"rays": 0, "start_time": time.time()}
+
+
+def get_source_bvh(obj):
+    """ returns BVH tree for evaluated mesh of 'obj' (in local space), rebuilding it only if the object has changed """
+    key = get_bvh_key(obj)
+    cached = bricker_bvh_cache.get(obj.name)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    bvh = build_source_bvh(obj)
+    bricker_bvh_cache[obj.name] = (key, bvh)
+    return bvh
+
+
+def get_bvh_key(obj):
+    """ get hashable evaluation state of 'obj' (BVH tree must be rebuilt if this changes) """
+    # modifiers (and their inputs, like other objects or animated settings) can change the evaluated mesh without changing 'obj'
+    return (hash_object(obj), get_evaluated_mesh_checksum(obj))
+
+
+def get_evaluated_mesh_checksum(obj):
+    """ get vertex count, polygon count, and checksum of vertex coordinates and polygon vertices of the evaluated mesh of 'obj' """
+    if b280():
+        obj_eval = obj.evaluated_get(bpy.context.view_layer.depsgraph)
+        mesh = obj_eval.to_mesh()
+    else:
+        mesh = obj.to_mesh(bpy.context.scene, True, "PREVIEW")
+    vert_cos = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", vert_cos)
+    loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    checksum = (len(mesh.vertices), len(mesh.polygons), hash((vert_cos.tobytes(), loop_verts.tobytes())))
+    if b280():
+        obj_eval.to_mesh_clear()
+    else:
+        bpy.data.meshes.remove(mesh)
+    return checksum
+
+
+@timed_call(label="BVH Build Time")
+def build_source_bvh(obj):
+    """ build BVH tree from evaluated mesh of 'obj' """
+    if b280():
+        depsgraph = bpy.context.view_layer.depsgraph
+        return BVHTree.FromObject(obj, depsgraph)
+    else:
+        return BVHTree.FromObject(obj, bpy.context.scene)
+
+
+def ray_cast(bvh, origin, direction):
+    """ cast ray against BVH tree (returns the same values as 'Object.ray_cast') """
+    ray_query_stats["rays"] += 1
+    location, normal, index, _ = bvh.ray_cast(origin, direction)
+    if index is None:
+        return False, None, None, -1
+    return True, location, normal, index
+
+
+def ray_cast_rows(bvh, origins, direction):
+    """ cast one ray from each of 'origins' in a single direction against BVH tree (BVHTree has no batched query, so rays are cast one at a time) """
+    bvh_ray_cast = bvh.ray_cast
+    hits = [None] * len(origins)
+    for i, origin in enumerate(origins):
+        location, normal, index, _ = bvh_ray_cast(origin, direction)
+        hits[i] = (False, None, None, -1) if index is None else (True, location, normal, index)
+    ray_query_stats["rays"] += len(origins)
+    return hits
+
+
+def reset_ray_query_stats():
+    ray_query_stats["rays"] = 0
+    ray_query_stats["start_time"] = time.time()
+
+
+def report_ray_query_stats(precision=2):
+    """ report number of rays cast and throughput with the time elapsed since stats were last reset (see 'stopwatch') """
+    elapsed = time.time() - ray_query_stats["start_time"]
+    rays_per_second = ray_query_stats["rays"] / elapsed if elapsed > 0 else 0
+    stopwatch("Ray Queries (%(rays)s rays, %(rps)s rays/sec)" % {"rays": ray_query_stats["rays"], "rps": round(rays_per_second)}, ray_query_stats["start_time"], precision=precision)
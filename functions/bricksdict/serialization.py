@@ -0,0 +1,368 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Binary format for bricksdict caches ('cm.bfm_cache')
+
+Layout:
+    magic ("BFMC"), version (uint8), codec (uint8), followed by a (compressed) stream of records
+Each record:
+    header length (uint32), JSON header, data length (uint64), data
+Record types (header 'type' values):
+    "cache"      -- first record; 'anim' is True if cache contains a bricksdict per frame
+    "bricksdict" -- start of a bricksdict ('frame', 'num_entries', 'keys' if keys aren't derived from 'loc',
+                    'base_frame' and 'removed' if the entries are changes to the bricksdict of another frame)
+    "column"     -- one bricksdict field for all entries of the current bricksdict, packed into numpy arrays
+    "end"        -- end of stream
+"""
+
+# System imports
+import base64
+import io
+import itertools
+import json
+import lzma
+import marshal
+import numbers
+import struct
+import zlib
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Module imports
+from .deltas import *
+from .dense import *
+from ..general import list_to_str
+
+BFM_CACHE_MAGIC = b"BFMC"
+BFM_CACHE_VERSION = 2
+# prefix for text-encoded caches (legacy marshal+hex caches never contain ':')
+BFM_CACHE_STR_PREFIX = "BFMC%(BFM_CACHE_VERSION)s:" % locals()
+BFM_CACHE_CODECS = ("NONE", "ZLIB", "LZMA")
+# size of chunks read from compressed streams
+STREAM_CHUNK_SIZE = 1 << 20
+
+
+class BfmCacheWriter:
+    """ streaming encoder writing compressed bfm_cache records to a binary file-like object """
+
+    def __init__(self, stream, codec="ZLIB", level=6):
+        assert codec in BFM_CACHE_CODECS
+        self.stream = stream
+        stream.write(BFM_CACHE_MAGIC + struct.pack("<BB", BFM_CACHE_VERSION, BFM_CACHE_CODECS.index(codec)))
+        if codec == "ZLIB":
+            self.compressor = zlib.compressobj(level)
+        elif codec == "LZMA":
+            self.compressor = lzma.LZMACompressor(preset=level)
+        else:
+            self.compressor = None
+
+    def _write(self, data):
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        if data:
+            self.stream.write(data)
+
+    def write_record(self, header, arrays=()):
+        """ write record with JSON 'header' followed by the raw bytes of numpy 'arrays' """
+        arrays = [np.ascontiguousarray(arr) for arr in arrays]
+        header["arrays"] = [{"dtype": arr.dtype.str, "shape": arr.shape} for arr in arrays]
+        header_bytes = json.dumps(header).encode("utf-8")
+        self._write(struct.pack("<I", len(header_bytes)) + header_bytes)
+        self._write(struct.pack("<Q", sum(arr.nbytes for arr in arrays)))
+        for arr in arrays:
+            self._write(arr.tobytes())
+
+    def close(self):
+        self.write_record({"type": "end"})
+        if self.compressor is not None:
+            self.stream.write(self.compressor.flush())
+
+
+class BfmCacheArrayWriter:
+    """ encoder collecting bfm_cache records as JSON-compatible headers and named numpy arrays (uncompressed, for passing between Blender instances) """
+
+    def __init__(self):
+        self.records = []
+        self.arrays = {}
+
+    def write_record(self, header, arrays=()):
+        header["array_names"] = []
+        for arr in arrays:
+            name = "bfm_%(i)s" % {"i": len(self.arrays)}
+            self.arrays[name] = np.ascontiguousarray(arr)
+            header["array_names"].append(name)
+        self.records.append(header)
+
+    def close(self):
+        self.write_record({"type": "end"})
+
+
+def iter_bfm_cache_records(stream):
+    """ streaming decoder yielding (header, arrays) for each record in binary file-like object """
+    magic = stream.read(len(BFM_CACHE_MAGIC))
+    if magic != BFM_CACHE_MAGIC:
+        raise ValueError("Not a bricksdict cache")
+    version, codec_idx = struct.unpack("<BB", stream.read(2))
+    if version > BFM_CACHE_VERSION:
+        raise ValueError("Bricksdict cache was written by a newer version of Bricker (format version %(version)s)" % locals())
+    codec = BFM_CACHE_CODECS[codec_idx]
+    decompressor = zlib.decompressobj() if codec == "ZLIB" else (lzma.LZMADecompressor() if codec == "LZMA" else None)
+    buffer = bytearray()
+
+    def read(num_bytes):
+        while len(buffer) < num_bytes:
+            chunk = stream.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                raise ValueError("Unexpected end of bricksdict cache")
+            buffer.extend(decompressor.decompress(chunk) if decompressor is not None else chunk)
+        data = bytes(buffer[:num_bytes])
+        del buffer[:num_bytes]
+        return data
+
+    while True:
+        header = json.loads(read(struct.unpack("<I", read(4))[0]).decode("utf-8"))
+        data = memoryview(read(struct.unpack("<Q", read(8))[0]))
+        arrays = []
+        offset = 0
+        for info in header["arrays"]:
+            dtype = np.dtype(info["dtype"])
+            count = int(np.prod(info["shape"], dtype=np.int64))
+            arrays.append(np.frombuffer(data, dtype=dtype, count=count, offset=offset).reshape(info["shape"]))
+            offset += count * dtype.itemsize
+        if header["type"] == "end":
+            return
+        yield header, arrays
+
+
+_VALUE_KINDS = {bool: "bool", np.bool_: "bool", int: "int", float: "float", str: "str", list: "seq", tuple: "seq"}
+
+
+def _get_value_kinds(values):
+    """ get set of value kinds ('bool', 'int', 'float', 'str', 'seq', or None) in iterable of values """
+    kinds = set()
+    for typ in set(map(type, values)):
+        if typ in _VALUE_KINDS:
+            kinds.add(_VALUE_KINDS[typ])
+        elif issubclass(typ, numbers.Integral):
+            kinds.add("int")
+        elif issubclass(typ, numbers.Real):
+            kinds.add("float")
+        else:
+            kinds.add(None)
+    return kinds
+
+
+def _get_numeric_kind(kinds):
+    """ get single numeric kind for set of value kinds (None if not numeric) """
+    if kinds == {"bool"}:
+        return "bool"
+    elif kinds == {"int"}:
+        return "int"
+    elif kinds <= {"int", "float"}:
+        return "float"
+    return None
+
+
+_NUMERIC_DTYPES = {"bool": np.bool_, "int": np.int64, "float": np.float64}
+
+
+def pack_column(values):
+    """ pack list of bricksdict values for a single field into (header, arrays) """
+    mask = np.array([v is None for v in values], dtype=bool)
+    present = [v for v in values if v is not None]
+    kinds = _get_value_kinds(present)
+    header = {"type": "column", "has_none": bool(mask.any())}
+    arrays = [np.packbits(mask)] if header["has_none"] else []
+    numeric_kind = _get_numeric_kind(kinds)
+    if len(present) == 0:
+        header["kind"] = "none"
+        return header, arrays
+    elif numeric_kind is not None:
+        header["kind"] = numeric_kind
+        arr = np.array(present, dtype=_NUMERIC_DTYPES[numeric_kind])
+        if numeric_kind == "int" and arr.min() >= np.iinfo(np.int32).min and arr.max() <= np.iinfo(np.int32).max:
+            arr = arr.astype(np.int32)
+        arrays.append(np.packbits(arr) if numeric_kind == "bool" else arr)
+        return header, arrays
+    elif kinds == {"str"}:
+        table = list(dict.fromkeys(present))
+        table_ids = {s: i for i, s in enumerate(table)}
+        header["kind"] = "str"
+        header["table"] = table
+        arrays.append(np.array([table_ids[v] for v in present], dtype=np.int32))
+        return header, arrays
+    elif kinds == {"seq"}:
+        seq_types = set(type(v) for v in present)
+        lengths = set(len(v) for v in present)
+        elem_kind = _get_numeric_kind(_get_value_kinds(itertools.chain.from_iterable(present)))
+        if len(seq_types) == 1 and len(lengths) == 1 and elem_kind is not None:
+            header["kind"] = "seq"
+            header["seq_type"] = "tuple" if tuple in seq_types else "list"
+            header["elem_kind"] = elem_kind
+            arrays.append(np.array(present, dtype=_NUMERIC_DTYPES[elem_kind]).reshape(len(present), lengths.pop()))
+            return header, arrays
+    # fall back to marshalling values that don't fit into arrays
+    header["kind"] = "marshal"
+    header["has_none"] = False
+    return header, [np.frombuffer(marshal.dumps(values), dtype=np.uint8)]
+
+
+def unpack_column(header, arrays, num_entries):
+    """ unpack (header, arrays) created by 'pack_column' into list of values """
+    kind = header["kind"]
+    if kind == "marshal":
+        return marshal.loads(arrays[0].tobytes())
+    if header["has_none"]:
+        mask = np.unpackbits(arrays[0], count=num_entries).astype(bool)
+        arrays = arrays[1:]
+    else:
+        mask = np.zeros(num_entries, dtype=bool)
+    num_present = num_entries - int(mask.sum())
+    if kind == "none":
+        present = []
+    elif kind == "bool":
+        present = np.unpackbits(arrays[0], count=num_present).astype(bool).tolist()
+    elif kind in ("int", "float"):
+        present = arrays[0].tolist()
+    elif kind == "str":
+        table = header["table"]
+        present = [table[i] for i in arrays[0].tolist()]
+    elif kind == "seq":
+        present = arrays[0].tolist()
+        if header["seq_type"] == "tuple":
+            present = [tuple(v) for v in present]
+    else:
+        raise ValueError("Unknown column kind '%(kind)s'" % locals())
+    if num_present == num_entries:
+        return present
+    values = [None] * num_entries
+    for i, v in zip(np.nonzero(~mask)[0].tolist(), present):
+        values[i] = v
+    return values
+
+
+def is_anim_bfm_cache(bfm_cache):
+    """ check if cache contains a bricksdict for each frame (frame keys contain no commas) """
+    return len(bfm_cache) > 0 and all("," not in key for key in bfm_cache.keys())
+
+
+def write_bricksdict(writer, bricksdict, frame=None):
+    """ write bricksdict (or animation frame delta) to BfmCacheWriter as a column per field """
+    header = {"type": "bricksdict", "frame": frame}
+    if is_bricksdict_delta(bricksdict):
+        header["base_frame"] = bricksdict["base_frame"]
+        header["removed"] = bricksdict["removed"]
+        bricksdict = bricksdict["changed"]
+    keys = list(bricksdict.keys())
+    entries = [bricksdict[key] for key in keys]
+    fields = list(entries[0].keys()) if len(entries) > 0 else []
+    locs = [entry.get("loc") for entry in entries]
+    keys_are_derived = all(loc is not None and key == list_to_str(loc) for key, loc in zip(keys, locs))
+    header.update({"num_entries": len(keys), "fields": fields, "keys": None if keys_are_derived else keys})
+    writer.write_record(header)
+    for field in fields:
+        header, arrays = pack_column([entry[field] for entry in entries])
+        header["field"] = field
+        writer.write_record(header, arrays)
+
+
+def write_bfm_cache(stream, bfm_cache, codec="ZLIB"):
+    """ write bricksdict (or dict of bricksdicts per frame) to binary file-like object """
+    write_bfm_cache_records(BfmCacheWriter(stream, codec=codec), bfm_cache)
+
+
+def write_bfm_cache_records(writer, bfm_cache):
+    """ write bricksdict (or dict of bricksdicts per frame) to BfmCacheWriter or BfmCacheArrayWriter """
+    anim = is_anim_bfm_cache(bfm_cache)
+    writer.write_record({"type": "cache", "anim": anim})
+    if anim:
+        for frame, bricksdict in bfm_cache.items():
+            write_bricksdict(writer, bricksdict, frame=frame)
+    else:
+        write_bricksdict(writer, bfm_cache)
+    writer.close()
+
+
+def read_bfm_cache(stream):
+    """ read bricksdict (or dict of bricksdicts per frame) from binary file-like object """
+    return read_bfm_cache_records(iter_bfm_cache_records(stream))
+
+
+def read_bfm_cache_records(records):
+    """ read bricksdict (or dict of bricksdicts per frame) from iterable of (header, arrays) records """
+    bfm_cache = {}
+    anim = False
+    bricksdict_info = None
+    columns = {}
+
+    def finish_bricksdict():
+        keys = bricksdict_info["keys"]
+        if keys is None:
+            keys = [list_to_str(loc) for loc in columns.get("loc", [])]
+        fields = bricksdict_info["fields"]
+        rows = zip(*(columns[field] for field in fields))
+        bricksdict = {key: dict(zip(fields, row)) for key, row in zip(keys, rows)}
+        if bricksdict_info.get("base_frame") is not None:
+            bricksdict = {"base_frame": bricksdict_info["base_frame"], "changed": bricksdict, "removed": bricksdict_info["removed"]}
+        if anim:
+            bfm_cache[bricksdict_info["frame"]] = bricksdict
+        else:
+            bfm_cache.update(bricksdict)
+
+    for header, arrays in records:
+        if header["type"] == "cache":
+            anim = header["anim"]
+        elif header["type"] == "bricksdict":
+            if bricksdict_info is not None:
+                finish_bricksdict()
+            bricksdict_info = header
+            columns = {}
+        elif header["type"] == "column":
+            columns[header["field"]] = unpack_column(header, arrays, bricksdict_info["num_entries"])
+    if bricksdict_info is not None:
+        finish_bricksdict()
+    return bfm_cache
+
+
+def dumps_bfm_cache(bfm_cache, codec="ZLIB"):
+    """ encode bricksdict cache as text for storage in 'cm.bfm_cache' """
+    stream = io.BytesIO()
+    write_bfm_cache(stream, bricksdict_to_dict(bfm_cache), codec=codec)
+    return BFM_CACHE_STR_PREFIX + base64.b64encode(stream.getvalue()).decode("ascii")
+
+
+def loads_bfm_cache(string):
+    """ decode bricksdict cache from 'cm.bfm_cache' text (supports legacy marshal+hex caches) """
+    if not string.startswith("BFMC"):
+        return marshal.loads(bytes.fromhex(string))
+    data = base64.b64decode(string[string.index(":") + 1:])
+    return read_bfm_cache(io.BytesIO(data))
+
+
+def pack_bfm_cache_arrays(bfm_cache):
+    """ pack bricksdict cache into list of JSON-compatible record headers and dict of named numpy arrays """
+    writer = BfmCacheArrayWriter()
+    write_bfm_cache_records(writer, bricksdict_to_dict(bfm_cache))
+    return writer.records, writer.arrays
+
+
+def unpack_bfm_cache_arrays(records, arrays):
+    """ unpack bricksdict cache from record headers and named numpy arrays created by 'pack_bfm_cache_arrays' (arrays may be memory-mapped) """
+    return read_bfm_cache_records((header, [arrays[name] for name in header["array_names"]]) for header in records)
@@ -16,16 +16,19 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 # System imports
-import marshal
+# NONE!
 
 # Blender imports
 import bpy
 
 # Module imports
+from .deltas import *
+from .dense import *
 from .generate import *
 from .modify import *
 from .exposure import *
-from ...lib.caches import bricker_bfm_cache, cache_exists
+from .serialization import *
+from ...lib.caches import bricker_bfm_cache, bricker_last_frame_cache, cache_exists
 
 
 def get_bricksdict(cm, d_type="MODEL", cur_frame=None):
@@ -34,12 +37,12 @@ def get_bricksdict(cm, d_type="MODEL", cur_frame=None):
     # if bricksdict can be pulled from cache
     if not matrix_really_is_dirty(cm) and cache_exists(cm) and not (cm.anim_is_dirty and "ANIM" in d_type):
         # try getting bricksdict from light cache, then deep cache
-        bricksdict = bricker_bfm_cache.get(cm.id) or marshal.loads(bytes.fromhex(cm.bfm_cache))
+        bricksdict = bricker_bfm_cache.get(cm.id) or loads_bfm_cache(cm.bfm_cache)
         # if animated, index into that dict
         if "ANIM" in d_type and bricksdict is not None:
             adjusted_frame_current = get_anim_adjusted_frame(cur_frame, cm.last_start_frame, cm.last_stop_frame, cm.last_step_frame)
             try:
-                bricksdict = bricksdict[str(adjusted_frame_current)]
+                bricksdict = get_anim_frame_bricksdict(bricksdict, str(adjusted_frame_current))
             except KeyError:
                 return None
         return bricksdict
@@ -51,6 +54,7 @@ def light_to_deep_cache(bricker_bfm_cache, cm_ids=None):
     """ send bricksdict from blender cache to python cache for quick access """
     scn = bpy.context.scene
     num_pushed_ids = 0
+    codec = get_addon_preferences().bfm_cache_compression
     cm_ids = cm_ids or bricker_bfm_cache.keys()
     for cm_id in cm_ids:
         # get cmlist item referred to by object
@@ -58,7 +62,9 @@ def light_to_deep_cache(bricker_bfm_cache, cm_ids=None):
         if not cm:
             continue
         # save last cache to cm.bfm_cache
-        cm.bfm_cache = marshal.dumps(bricker_bfm_cache[cm_id]).hex()
+        if bricker_bfm_cache[cm_id] is None:
+            continue
+        cm.bfm_cache = dumps_bfm_cache(bricker_bfm_cache[cm_id], codec=codec)
         num_pushed_ids += 1
     if num_pushed_ids > 0:
         print("[Bricker] pushed {num_keys} {pluralized_dicts} from light cache to deep cache".format(num_keys=num_pushed_ids, pluralized_dicts="dict" if num_pushed_ids == 1 else "dicts"))
@@ -70,7 +76,7 @@ def deep_to_light_cache(bricker_bfm_cache, cm):
     if cm.bfm_cache == "":
         return
     try:
-        bricksdict = marshal.loads(bytes.fromhex(cm.bfm_cache))
+        bricksdict = loads_bfm_cache(cm.bfm_cache)
         bricker_bfm_cache[cm.id] = bricksdict
     except Exception as e:
         print("ERROR in deep_to_light_cache:", e)
@@ -86,4 +92,10 @@ def cache_bricks_dict(action, cm, bricksdict, cur_frame=None):
         if (cm.id not in bricker_bfm_cache.keys() or
            type(bricker_bfm_cache[cm.id]) != dict):
             bricker_bfm_cache[cm.id] = {}
-        bricker_bfm_cache[cm.id][str(cur_frame)] = bricksdict
+        if cm.temporal_coherence:
+            # store changes since the previous frame instead of the full bricksdict where possible
+            prev_frame, prev_bricksdict = bricker_last_frame_cache.get(cm.id, (None, None))
+            store_anim_frame_bricksdict(bricker_bfm_cache[cm.id], str(cur_frame), bricksdict, prev_frame, prev_bricksdict)
+            bricker_last_frame_cache[cm.id] = (str(cur_frame), bricksdict)
+        else:
+            bricker_bfm_cache[cm.id][str(cur_frame)] = bricksdict
@@ -0,0 +1,305 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import numpy as np
+
+# Blender imports
+import bpy
+from mathutils import Vector
+
+# Module imports
+from ..common import *
+
+# max number of (triangle, scanline) pairs to evaluate at once
+SCANLINE_CHUNK_SIZE = 2000000
+
+
+def get_triangle_data(obj):
+    """ returns triangle coordinates, triangle face indices, and face normals of obj mesh (in local space) as numpy arrays """
+    if b280():
+        depsgraph = bpy.context.view_layer.depsgraph
+        mesh = obj.evaluated_get(depsgraph).data
+    else:
+        mesh = obj.data
+    # get vertex coordinates and face normals
+    vert_cos = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", vert_cos)
+    vert_cos.shape = (-1, 3)
+    face_normals = np.empty(len(mesh.polygons) * 3, dtype=np.float64)
+    mesh.polygons.foreach_get("normal", face_normals)
+    face_normals.shape = (-1, 3)
+    # get triangle vert indices and the face each triangle belongs to
+    if b280():
+        mesh.calc_loop_triangles()
+        tri_verts = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", tri_verts)
+        tri_verts.shape = (-1, 3)
+        tri_faces = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+        mesh.loop_triangles.foreach_get("polygon_index", tri_faces)
+    else:
+        tri_verts, tri_faces = fan_triangulate(mesh)
+    return vert_cos[tri_verts], tri_faces, face_normals
+
+
+def fan_triangulate(mesh):
+    """ triangulate mesh polygons as triangle fans (for Blender versions without loop triangles) """
+    loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    # each polygon with n verts produces n - 2 triangles
+    num_tris = np.maximum(loop_totals - 2, 0)
+    tri_faces = np.repeat(np.arange(len(loop_starts), dtype=np.int32), num_tris)
+    tri_offsets = np.arange(len(tri_faces)) - np.repeat(np.cumsum(num_tris) - num_tris, num_tris)
+    starts = loop_starts[tri_faces]
+    tri_verts = np.stack((
+        loop_verts[starts],
+        loop_verts[starts + tri_offsets + 1],
+        loop_verts[starts + tri_offsets + 2],
+    ), axis=1)
+    return tri_verts, tri_faces
+
+
+def _is_top_left(d_u, d_v):
+    """ tie-breaking rule so points on an edge shared by two triangles are only counted once """
+    return (d_v > 0) | ((d_v == 0) & (d_u < 0))
+
+
+def get_scanline_hits(tri_cos, axis, origin, step, shape):
+    """ intersect all triangles with all lattice scanlines running parallel to 'axis'
+
+    Keyword arguments:
+    tri_cos -- (num_tris, 3, 3) array of triangle vertex coordinates
+    axis    -- index of the axis the scanlines run along (0: x, 1: y, 2: z)
+    origin  -- coordinate of the first lattice location
+    step    -- distance between lattice locations along each axis
+    shape   -- number of lattice locations along each axis
+
+    returns sorted arrays of scanline ids (u_idx * shape[v] + v_idx), hit coordinates along 'axis', and triangle indices
+    """
+    u, v = (axis + 1) % 3, (axis + 2) % 3
+    p_u = tri_cos[:, :, u]
+    p_v = tri_cos[:, :, v]
+    p_a = tri_cos[:, :, axis]
+    # get doubled signed area of triangles projected onto the uv plane
+    area = (p_u[:, 1] - p_u[:, 0]) * (p_v[:, 2] - p_v[:, 0]) - (p_v[:, 1] - p_v[:, 0]) * (p_u[:, 2] - p_u[:, 0])
+    # get range of scanlines within the projected bounds of each triangle
+    u0 = np.maximum(np.ceil((p_u.min(axis=1) - origin[u]) / step[u]), 0).astype(np.int64)
+    u1 = np.minimum(np.floor((p_u.max(axis=1) - origin[u]) / step[u]), shape[u] - 1).astype(np.int64)
+    v0 = np.maximum(np.ceil((p_v.min(axis=1) - origin[v]) / step[v]), 0).astype(np.int64)
+    v1 = np.minimum(np.floor((p_v.max(axis=1) - origin[v]) / step[v]), shape[v] - 1).astype(np.int64)
+    count_u = np.maximum(u1 - u0 + 1, 0)
+    count_v = np.maximum(v1 - v0 + 1, 0)
+    counts = count_u * count_v
+    # ignore triangles that are edge-on to the scanlines
+    counts[area == 0] = 0
+    candidate_tris = np.nonzero(counts)[0]
+
+    scan_ids, hit_locs, hit_tris = [], [], []
+    # process triangles in chunks to limit peak memory
+    chunk_ends = np.searchsorted(np.cumsum(counts[candidate_tris]), np.arange(SCANLINE_CHUNK_SIZE, counts.sum() + SCANLINE_CHUNK_SIZE, SCANLINE_CHUNK_SIZE), side="right")
+    chunk_start = 0
+    for chunk_end in chunk_ends:
+        chunk_end = max(chunk_end, chunk_start + 1)
+        tris = candidate_tris[chunk_start:chunk_end]
+        chunk_start = chunk_end
+        if len(tris) == 0:
+            break
+        # enumerate every (triangle, scanline) pair in the chunk
+        tri_counts = counts[tris]
+        tri_idx = np.repeat(tris, tri_counts)
+        local_idx = np.arange(len(tri_idx)) - np.repeat(np.cumsum(tri_counts) - tri_counts, tri_counts)
+        i_u = u0[tri_idx] + local_idx // count_v[tri_idx]
+        i_v = v0[tri_idx] + local_idx % count_v[tri_idx]
+        pt_u = origin[u] + i_u * step[u]
+        pt_v = origin[v] + i_v * step[v]
+        # compute edge functions for each pair (normalized to counter-clockwise winding)
+        sign = np.sign(area[tri_idx])
+        inside = np.ones(len(tri_idx), dtype=bool)
+        weights = []
+        for i0, i1 in ((1, 2), (2, 0), (0, 1)):
+            a_u, a_v = p_u[tri_idx, i0], p_v[tri_idx, i0]
+            b_u, b_v = p_u[tri_idx, i1], p_v[tri_idx, i1]
+            # evaluate edge from a consistent endpoint so edges shared by two triangles get exactly opposite values
+            swap = (a_u > b_u) | ((a_u == b_u) & (a_v > b_v))
+            start_u, start_v = np.where(swap, b_u, a_u), np.where(swap, b_v, a_v)
+            end_u, end_v = np.where(swap, a_u, b_u), np.where(swap, a_v, b_v)
+            edge = (end_u - start_u) * (pt_v - start_v) - (end_v - start_v) * (pt_u - start_u)
+            edge *= np.where(swap, -sign, sign)
+            d_u = (b_u - a_u) * sign
+            d_v = (b_v - a_v) * sign
+            inside &= (edge > 0) | ((edge == 0) & _is_top_left(d_u, d_v))
+            weights.append(edge)
+        # interpolate hit location along the scanline axis from barycentric weights
+        tri_area = area[tri_idx] * sign
+        hit_loc = (weights[0] * p_a[tri_idx, 0] + weights[1] * p_a[tri_idx, 1] + weights[2] * p_a[tri_idx, 2]) / tri_area
+        scan_ids.append((i_u * shape[v] + i_v)[inside])
+        hit_locs.append(hit_loc[inside])
+        hit_tris.append(tri_idx[inside])
+
+    if len(scan_ids) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int64)
+    scan_ids = np.concatenate(scan_ids)
+    hit_locs = np.concatenate(hit_locs)
+    hit_tris = np.concatenate(hit_tris)
+    # sort hits by scanline, then by location along the scanline
+    order = np.lexsort((hit_locs, scan_ids))
+    return scan_ids[order], hit_locs[order], hit_tris[order]
+
+
+def get_scanline_intersections(tri_cos, tri_faces, face_normals, axis, origin, step, shape, use_normals):
+    """ compute insideness and nearest intersections for every lattice location by sweeping along 'axis'
+
+    returns dictionary of arrays (indexed [axis location, scanline id]) containing:
+    - inside     - lattice location is inside the mesh (using ray parity in both directions along 'axis')
+    - first_hit  - index into 'hit_*' arrays of the first intersection at or beyond each location (-1 if none)
+    - last_hit   - index into 'hit_*' arrays of the last intersection before the next location (-1 if none)
+    - hit_locs, hit_faces, hit_dirs - location along 'axis', face index, and normal component along 'axis' of each intersection
+    """
+    u, v = (axis + 1) % 3, (axis + 2) % 3
+    num_scans = shape[u] * shape[v]
+    scan_ids, hit_locs, hit_tris = get_scanline_hits(tri_cos, axis, origin, step, shape)
+    hit_faces = tri_faces[hit_tris]
+    hit_dirs = face_normals[hit_faces, axis] if len(hit_faces) > 0 else np.empty(0)
+    # get range of hits in each scanline
+    scan_starts = np.searchsorted(scan_ids, np.arange(num_scans), side="left")
+    scan_ends = np.searchsorted(scan_ids, np.arange(num_scans), side="right")
+    # combine scanline id and normalized hit location into a single sorted key
+    loc_min = origin[axis] - step[axis]
+    loc_range = (shape[axis] + 2) * step[axis]
+    norm_loc = lambda loc: np.clip((loc - loc_min) / loc_range, 0, 0.999999)
+    keys = scan_ids + norm_loc(hit_locs)
+    # get lattice location coordinates along axis (rows) for each scanline (cols)
+    cell_locs = origin[axis] + np.arange(shape[axis]) * step[axis]
+    cell_keys = np.arange(num_scans)[None, :] + norm_loc(cell_locs)[:, None]
+    next_keys = np.arange(num_scans)[None, :] + norm_loc(cell_locs + step[axis])[:, None]
+    next_idx = np.searchsorted(keys, cell_keys, side="left")
+    edge_end_idx = np.searchsorted(keys, next_keys, side="right")
+    # count intersections in front of and behind each location
+    num_forward = scan_ends[None, :] - next_idx
+    num_backward = next_idx - scan_starts[None, :]
+    inside_forward = num_forward % 2 == 1
+    inside_backward = num_backward % 2 == 1
+    if use_normals and len(hit_dirs) > 0:
+        # treat location as inside if nearest face in ray direction faces away from location
+        inside_forward |= (num_forward > 0) & (hit_dirs[np.minimum(next_idx, len(hit_dirs) - 1)] > 0)
+        inside_backward |= (num_backward > 0) & (hit_dirs[np.maximum(next_idx - 1, 0)] < 0)
+    edge_intersects = edge_end_idx > next_idx
+    return {
+        "inside": inside_forward & inside_backward,
+        "first_hit": np.where(edge_intersects, next_idx, -1),
+        "last_hit": np.where(edge_intersects, edge_end_idx - 1, -1),
+        "cell_locs": cell_locs,
+        "hit_locs": hit_locs,
+        "hit_faces": hit_faces,
+    }
+
+
+def _to_lattice_order(arr, axis, shape):
+    """ reshape array indexed [axis location, scanline id] to lattice shape indexed [x, y, z] """
+    u, v = (axis + 1) % 3, (axis + 2) % 3
+    arr = arr.reshape((shape[axis], shape[u], shape[v]))
+    # move axes from (axis, u, v) order into (x, y, z) order
+    return np.moveaxis(arr, (0, 1, 2), (axis, u, v))
+
+
+def get_brick_freq_matrix_scanline(source, face_idx_matrix, lattice, brick_shell, insideness_ray_cast_dir, use_normals, axes="xyz", print_status=True, cursor_status=False):
+    """ returns unadjusted brick_freq_matrix (computed for entire scanlines at once rather than ray casting from each lattice location) """
+    origin, step, shape = lattice.origin, lattice.step, np.array(lattice.shape)
+    tri_cos, tri_faces, face_normals = get_triangle_data(source)
+    # get axes needed for insideness and shell calculations
+    if insideness_ray_cast_dir == "HIGH_EFFICIENCY":
+        insideness_axes = axes
+    else:
+        insideness_axes = insideness_ray_cast_dir.lower()
+    all_axes = [axis for axis in range(3) if "xyz"[axis] in axes + insideness_axes]
+
+    # sweep lattice along each required axis
+    intersections = {}
+    for i, axis in enumerate(all_axes):
+        update_progress_bars(i / len(all_axes), 0, "Shell", print_status, cursor_status)
+        intersections[axis] = get_scanline_intersections(tri_cos, tri_faces, face_normals, axis, origin, step, shape, use_normals)
+        intersections[axis]["inside"] = _to_lattice_order(intersections[axis]["inside"], axis, shape)
+
+    # get insideness to use for each calculation axis
+    if insideness_ray_cast_dir != "HIGH_EFFICIENCY":
+        votes = [intersections["xyz".index(a)]["inside"] for a in insideness_axes]
+        shared_inside = np.sum(votes, axis=0) > len(votes) / 2
+    get_inside = lambda axis: intersections[axis]["inside"] if insideness_ray_cast_dir == "HIGH_EFFICIENCY" else shared_inside
+
+    brick_freq_matrix = np.zeros(shape, dtype=np.int8)
+    nearest_dists = np.full(shape, np.inf)
+    nearest_hits = {}
+    for axis in range(3):
+        if "xyz"[axis] not in axes:
+            continue
+        data = intersections[axis]
+        inside = get_inside(axis)
+        u, v = (axis + 1) % 3, (axis + 2) % 3
+        first_hit = _to_lattice_order(data["first_hit"], axis, shape)
+        last_hit = _to_lattice_order(data["last_hit"], axis, shape)
+        edge_intersects = first_hit != -1
+        # brick shell doesn't take insideness into account for consistent shell
+        point_inside = inside & ~edge_intersects if brick_shell == "CONSISTENT" else inside
+        # define bricks as inside shell
+        brick_freq_matrix[(brick_freq_matrix == 0) & point_inside] = -1
+        # get shell locations on the current side of each intersected edge
+        if brick_shell == "OUTSIDE":
+            shell_here = edge_intersects & ~point_inside
+        else:
+            shell_here = edge_intersects & point_inside
+        shell_next = edge_intersects & ~shell_here
+        cell_locs = data["cell_locs"]
+        cell_loc_at = lambda idxs: cell_locs[idxs[axis]]
+        # store shell locations on current side with first intersection
+        idxs = np.nonzero(shell_here)
+        hits = first_hit[idxs]
+        dists = data["hit_locs"][hits] - cell_loc_at(idxs)
+        _update_nearest(brick_freq_matrix, nearest_dists, nearest_hits, idxs, dists, hits, axis)
+        # store shell locations on next side with last intersection
+        idxs = list(np.nonzero(shell_next))
+        hits = last_hit[tuple(idxs)]
+        dists = step[axis] - (data["hit_locs"][hits] - cell_loc_at(idxs))
+        idxs[axis] = idxs[axis] + 1
+        in_bounds = idxs[axis] < shape[axis]
+        idxs = tuple(idx[in_bounds] for idx in idxs)
+        _update_nearest(brick_freq_matrix, nearest_dists, nearest_hits, idxs, dists[in_bounds], hits[in_bounds], axis)
+
+    # transfer nearest intersection data to face_idx_matrix
+    for (x, y, z), (axis, hit) in nearest_hits.items():
+        data = intersections[axis]
+        loc = lattice.co((x, y, z))
+        loc[axis] = data["hit_locs"][hit]
+        face_idx = int(data["hit_faces"][hit])
+        face_idx_matrix[x][y][z] = {"idx": face_idx, "dist": float(nearest_dists[x, y, z]), "loc": loc, "normal": Vector(face_normals[face_idx])}
+
+    return brick_freq_matrix.astype(np.float32)
+
+
+def _update_nearest(brick_freq_matrix, nearest_dists, nearest_hits, idxs, dists, hits, axis):
+    """ mark locations at 'idxs' as shell and store intersection if nearer than the current one """
+    if len(idxs[0]) == 0:
+        return
+    brick_freq_matrix[idxs] = 1
+    for x, y, z, dist, hit in zip(*idxs, dists, hits):
+        if dist < nearest_dists[x, y, z]:
+            nearest_dists[x, y, z] = dist
+            nearest_hits[(int(x), int(y), int(z))] = (axis, int(hit))
+
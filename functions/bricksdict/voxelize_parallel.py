@@ -0,0 +1,168 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import os
+import time
+import numpy as np
+
+# Blender imports
+import bpy
+from mathutils import Vector
+
+# Module imports
+from .chunked_grid import *
+from ..common import *
+from ...subtrees.background_processing.classes.job_manager import JobManager
+
+# minimum number of lattice locations along the slab axis for each slab
+MIN_SLAB_THICKNESS = 4
+
+
+def can_voxelize_in_parallel(cm, shape):
+    """ check if lattice of size 'shape' should be voxelized in slabs by background Blender instances """
+    prefs = get_addon_preferences()
+    return (
+        prefs.parallel_voxelization and
+        prefs.max_workers > 1 and
+        # background instances can't spawn background instances of their own
+        not bpy.app.background and
+        # job manager requires a saved blend file
+        bpy.data.filepath != "" and
+        not cm.is_smoke and
+        max(shape) >= MIN_SLAB_THICKNESS * 2
+    )
+
+
+def get_slab_regions(shape, num_slabs):
+    """ split lattice of size 'shape' into slabs along its longest axis
+
+    returns list of min (inclusive) and max (exclusive) lattice locs for each slab, with and without one location of padding on either side
+    """
+    axis = int(np.argmax(shape))
+    num_slabs = max(1, min(num_slabs, shape[axis] // MIN_SLAB_THICKNESS))
+    bounds = np.linspace(0, shape[axis], num_slabs + 1).round().astype(int)
+    regions = []
+    for v0, v1 in zip(bounds[:-1], bounds[1:]):
+        min_loc, max_loc = [0, 0, 0], list(shape)
+        min_loc[axis], max_loc[axis] = int(v0), int(v1)
+        padded_min, padded_max = min_loc.copy(), max_loc.copy()
+        padded_min[axis] = max(v0 - 1, 0)
+        padded_max[axis] = min(v1 + 1, shape[axis])
+        regions.append(((tuple(min_loc), tuple(max_loc)), (tuple(padded_min), tuple(padded_max))))
+    return regions
+
+
+def get_brick_matrix_parallel(cm, source, face_idx_matrix, lattice_args, shape, axes="xyz", cursor_status=False):
+    """ returns unadjusted brick_freq_matrix computed in slabs by background Blender instances (or None if any slab failed)
+
+    Keyword arguments:
+    cm              -- cmlist item for the model being voxelized
+    source          -- source duplicate to voxelize
+    face_idx_matrix -- face_idx_matrix to populate with nearest face data (returns ChunkedGrid brick_freq_matrix if this is a ChunkedGrid)
+    lattice_args    -- arguments passed to 'generate_lattice' as (vert_dist, scale, offset)
+    shape           -- number of lattice locations along each axis
+    axes            -- axes to calculate the shell along
+    cursor_status   -- update mouse cursor with status of matrix creation
+    """
+    prefs = get_addon_preferences()
+    job_manager = JobManager.get_instance("voxelize_%(id)s" % {"id": cm.id})
+    job_manager.max_workers = prefs.max_workers
+    job_manager.max_attempts = 1
+    job_manager.adaptive_workers = prefs.adaptive_workers
+    job_manager.use_worker_pool = prefs.persistent_workers
+    addon_path = get_addon_directory()
+    script = os.path.join(addon_path, "lib", "voxelize_slab_in_background_template.py")
+    # send source mesh to all background instances at once
+    filename = bpy.path.basename(bpy.data.filepath)[:-6]
+    source_filename = "%(filename)s__%(name)s_voxelize_source.blend" % {"filename": filename, "name": source.name}
+    source_path = os.path.join(job_manager.temp_path, source_filename)
+    bpy.data.libraries.write(source_path, {source}, fake_user=True)
+    # settings read by 'get_brick_matrix'
+    cmlist_props = {
+        "voxelize_method": cm.voxelize_method,
+        "insideness_ray_cast_dir": cm.insideness_ray_cast_dir,
+        "use_normals": cm.use_normals,
+        "brick_shell": cm.brick_shell,
+        "calc_internals": cm.calc_internals,
+        "mat_shell_depth": cm.mat_shell_depth,
+    }
+
+    # add a job for each slab of the lattice
+    regions = get_slab_regions(shape, prefs.max_workers)
+    jobs = []
+    for i, (region, padded_region) in enumerate(regions):
+        job = "%(filename)s__%(name)s__slab_%(i)s" % {"filename": filename, "name": source.name, "i": i}
+        passed_data = {
+            "addon_module": os.path.basename(addon_path),
+            "source_filename": source_filename,
+            "source_name": source.name,
+            "cmlist_props": cmlist_props,
+            "lattice_args": tuple(tuple(vec) for vec in lattice_args),
+            "region": region,
+            "padded_region": padded_region,
+            "axes": axes,
+        }
+        job_added, msg = job_manager.add_job(job, script=script, passed_data=passed_data, use_blend_file=False)
+        if not job_added:
+            print("[Bricker] Couldn't voxelize in parallel:", msg)
+            cleanup_slab_jobs(job_manager, jobs, source_path)
+            return None
+        jobs.append(job)
+
+    # wait for all slabs to complete
+    update_progress_bars(0, 0, "Shell", True, cursor_status)
+    old_percent = 0
+    while True:
+        for job in jobs:
+            job_manager.process_job(job, debug_level=1)
+        if any(job_manager.job_dropped(job) for job in jobs):
+            dropped_job = next(job for job in jobs if job_manager.job_dropped(job))
+            print_exception("Bricker log", errormsg=job_manager.get_issue_string(dropped_job))
+            job_manager.kill_all()
+            cleanup_slab_jobs(job_manager, jobs, source_path)
+            return None
+        num_completed = sum(job_manager.job_complete(job) for job in jobs)
+        old_percent = update_progress_bars(num_completed / len(jobs), old_percent, "Shell", True, cursor_status)
+        if num_completed == len(jobs):
+            break
+        time.sleep(0.05)
+    update_progress_bars(1, 0, "Shell", True, cursor_status, end=True)
+
+    # stitch slabs together in order (results are independent of the number of slabs)
+    use_sparse_voxels = isinstance(face_idx_matrix, ChunkedGrid)
+    brick_freq_matrix = ChunkedGrid(shape) if use_sparse_voxels else np.zeros(shape, dtype=np.int8)
+    for job, (region, _) in zip(jobs, regions):
+        shared_arrays = job_manager.get_retrieved_shared_arrays(job)
+        if use_sparse_voxels:
+            brick_freq_matrix.set_block(region[0], shared_arrays["brick_freq_matrix"].astype(np.float32))
+        else:
+            region_slice = tuple(slice(v0, v1) for v0, v1 in zip(*region))
+            brick_freq_matrix[region_slice] = shared_arrays["brick_freq_matrix"]
+        face_data = zip(shared_arrays["face_locs"].tolist(), shared_arrays["face_idxs"].tolist(), shared_arrays["face_dists"].tolist(), shared_arrays["face_points"].tolist(), shared_arrays["face_normals"].tolist())
+        for (x, y, z), idx, dist, loc, normal in face_data:
+            face_idx_matrix[x][y][z] = {"idx": idx, "dist": dist, "loc": Vector(loc), "normal": Vector(normal)}
+    cleanup_slab_jobs(job_manager, jobs, source_path)
+    return brick_freq_matrix if use_sparse_voxels else brick_freq_matrix.astype(np.float32)
+
+
+def cleanup_slab_jobs(job_manager, jobs, source_path):
+    """ remove temporary files written for voxelizing slabs in background """
+    for job in jobs:
+        job_manager.cleanup_job(job)
+    if os.path.isfile(source_path):
+        os.remove(source_path)
@@ -34,6 +34,10 @@ def clear_cache(cm, brick_mesh=True, light_matrix=True, deep_matrix=True, rgba_v
     # clear light matrix cache
     if light_matrix:
         bricker_bfm_cache[cm.id] = None
+        bricker_source_snapshot_cache.pop(cm.id, None)
+        bricker_last_frame_cache.pop(cm.id, None)
+        if cm.source_obj is not None:
+            bricker_bvh_cache.pop(cm.source_obj.name + "__dup__", None)
     # clear deep matrix cache
     if deep_matrix:
         cm.bfm_cache = ""
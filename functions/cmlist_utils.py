@@ -75,6 +75,7 @@ def match_properties(cm_to, cm_from):
         "start_frame",
         "stop_frame",
         "step_frame",
+        "temporal_coherence",
         # BASIC MODEL SETTINGS
         "brick_height",
         "gap",
@@ -119,6 +120,7 @@ def match_properties(cm_to, cm_from):
         "color_snap",
         "color_depth",
         "blur_radius",
+        "max_rgb_materials",
         "color_snap_specular",
         "color_snap_roughness",
         "color_snap_sss",
@@ -149,11 +151,13 @@ def match_properties(cm_to, cm_from):
         "col_step",
         # ADVANCED SETTINGS
         "insideness_ray_cast_dir",
+        "voxelize_method",
         "brick_shell",
         "calculation_axes",
         "use_normals",
         "grid_offset",
         "calc_internals",
+        "incremental_updates",
         "use_local_orient",
         "instance_method",
     ]
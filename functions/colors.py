@@ -23,6 +23,13 @@ import colorsys
 # Module imports
 from .general import *
 
+# number of steps per rgba channel when quantizing rgba values for the snapped color memo
+COLOR_MEMO_RESOLUTION = 4096
+# number of rgba values compared against the full palette at once when snapping colors
+COLOR_SNAP_CHUNK_SIZE = 65536
+# maximum number of snapped rgba values remembered for each palette
+MAX_COLOR_MEMO_SIZE = 1000000
+
 
 def get_colors():
     if not hasattr(get_colors, "colors"):
@@ -34,15 +41,62 @@ def get_colors():
     return get_colors.colors
 
 
+def get_palette_index(trans_weight=1, mat_obj=None):
+    """ get palette of brick colors (restricted to materials of 'mat_obj' if not None) as arrays for vectorized nearest color lookups """
+    colors = get_colors()
+    if mat_obj is None:
+        names = list(colors.keys())
+    else:
+        mat_names = set(mat_obj.data.materials.keys())
+        names = [k for k in colors.keys() if k in mat_names]
+    index_key = (tuple(names), trans_weight)
+    if not hasattr(get_palette_index, "indices"):
+        get_palette_index.indices = dict()
+    if index_key not in get_palette_index.indices:
+        get_palette_index.indices[index_key] = {
+            "names": names,
+            "colors": np.array([colors[k][:4] for k in names], dtype=np.float64).reshape(len(names), 4),
+            # channel weights matching 'rgba_distance'
+            "weights": np.array([0.30, 0.59, 0.11, trans_weight], dtype=np.float64),
+            # nearest color names of previously snapped rgba values (keyed by quantized rgba)
+            "memo": dict(),
+        }
+    return get_palette_index.indices[index_key]
+
+
+def find_nearest_brick_color_names(rgbas, trans_weight=1, mat_obj=None):
+    """ get nearest brick color name for each rgba value in 'rgbas' ('' for None values) in one vectorized pass """
+    palette = get_palette_index(trans_weight, mat_obj)
+    color_names = [""] * len(rgbas)
+    idxs = [i for i, rgba in enumerate(rgbas) if rgba is not None]
+    if len(idxs) == 0 or len(palette["names"]) == 0:
+        return color_names
+    # snap each distinct quantized rgba value only once (quantized channels are packed into a single integer key)
+    quantized = np.clip(np.round(np.array([tuple(rgbas[i])[:4] for i in idxs], dtype=np.float64) * COLOR_MEMO_RESOLUTION), 0, COLOR_MEMO_RESOLUTION).astype(np.int64)
+    packed = quantized @ (np.int64(COLOR_MEMO_RESOLUTION + 1) ** np.arange(4, dtype=np.int64))
+    unique_keys, first_idxs, inverse = np.unique(packed, return_index=True, return_inverse=True)
+    unique_keys = unique_keys.tolist()
+    memo = palette["memo"]
+    missing = [j for j, rgba_key in enumerate(unique_keys) if rgba_key not in memo]
+    if len(memo) + len(missing) > MAX_COLOR_MEMO_SIZE:
+        memo.clear()
+        missing = list(range(len(unique_keys)))
+    for start in range(0, len(missing), COLOR_SNAP_CHUNK_SIZE):
+        chunk = missing[start:start + COLOR_SNAP_CHUNK_SIZE]
+        chunk_rgbas = quantized[first_idxs[chunk]] / COLOR_MEMO_RESOLUTION
+        diffs = ((chunk_rgbas[:, None, :] - palette["colors"][None, :, :]) ** 2) @ palette["weights"]
+        for j, color_idx in zip(chunk, np.argmin(diffs, axis=1).tolist()):
+            memo[unique_keys[j]] = palette["names"][color_idx]
+    unique_names = [memo[rgba_key] for rgba_key in unique_keys]
+    for i, j in zip(idxs, inverse.reshape(-1).tolist()):
+        color_names[i] = unique_names[j]
+    return color_names
+
+
 def find_nearest_brick_color_name(rgba, trans_weight=1, mat_obj=None):
     if rgba is None:
         return ""
-    colors = get_colors().copy()
-    if mat_obj is not None:
-        for k in list(colors.keys()):  # copy keys list as it will change during iteration
-            if k not in mat_obj.data.materials.keys():
-                colors.pop(k, None)
-    return find_nearest_color_name(rgba, trans_weight, colors)
+    return find_nearest_brick_color_names([rgba], trans_weight, mat_obj)[0]
 
 
 def find_nearest_color_name(rgba, trans_weight=1, colors=None):
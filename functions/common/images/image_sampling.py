@@ -197,6 +197,140 @@ def get_uv_pixel_color(obj:Object, face_idx:int, point:Vector, uv_image:Image=No
     return [round(v, 6) for v in rgba]
 
 
+def get_uv_pixel_colors(obj:Object, face_idxs:list, points:list, uv_image:Image=None, image_frame:int=None, mapping_loc:Vector=Vector((0, 0)), mapping_scale:Vector=Vector((1, 1)), color_depth:int=0, blur_radius:int=0):
+    """ get RGBA values in UV images for many points at specified face indices (batched version of 'get_uv_pixel_color')
+
+    returns list of RGBA values (None where no UV image or UV layer was found for the face)
+    """
+    num_samples = len(face_idxs)
+    rgbas = [None] * num_samples
+    if num_samples == 0:
+        return rgbas
+    # per-face images are only stored in the mesh data in Blender 2.79
+    if not b280() and verify_img(uv_image) is None and obj.data.uv_textures.active:
+        return [get_uv_pixel_color(obj, face_idx, Vector(point), uv_image, image_frame, mapping_loc, mapping_scale, color_depth, blur_radius) for face_idx, point in zip(face_idxs, points)]
+    mesh = obj.data
+    face_idxs = np.asarray(face_idxs, dtype=np.int64)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    # get mesh data for all faces at once
+    vert_cos = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", vert_cos)
+    vert_cos.shape = (-1, 3)
+    loop_verts = np.empty(len(mesh.loops), dtype=np.int64)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    loop_starts = np.empty(len(mesh.polygons), dtype=np.int64)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int64)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    mat_idxs = np.empty(len(mesh.polygons), dtype=np.int64)
+    mesh.polygons.foreach_get("material_index", mat_idxs)
+    sample_mat_idxs = mat_idxs[face_idxs]
+    # image and uv layer depend only on the face's material, so sample faces with the same material together
+    for mat_idx in np.unique(sample_mat_idxs).tolist():
+        in_group = np.flatnonzero(sample_mat_idxs == mat_idx)
+        first_face_idx = int(face_idxs[in_group[0]])
+        image = get_uv_image(obj, first_face_idx, uv_image)
+        if image is None:
+            continue
+        uv = get_uv_layer_data(obj, get_mat_at_face_idx(obj, first_face_idx))
+        if uv is None:
+            continue
+        loop_uvs = np.empty(len(uv) * 2, dtype=np.float64)
+        uv.foreach_get("uv", loop_uvs)
+        loop_uvs.shape = (-1, 2)
+        # compute uv locations for faces with the same number of verts together
+        group_faces = face_idxs[in_group]
+        group_totals = loop_totals[group_faces]
+        uv_locs = np.empty((len(in_group), 2), dtype=np.float64)
+        for total in np.unique(group_totals).tolist():
+            same_total = group_totals == total
+            loops = loop_starts[group_faces[same_total]][:, None] + np.arange(total)
+            weights = get_poly_3d_weights(vert_cos[loop_verts[loops]], points[in_group[same_total]])
+            uv_locs[same_total] = np.einsum("ij,ijk->ik", weights, loop_uvs[loops])
+        pixel_coords = get_uv_pixel_coords(uv_locs, image.size, mapping_loc, mapping_scale)
+        group_rgbas = get_pixels_at_coords(image, pixel_coords, image_frame=image_frame, color_depth=color_depth, blur_radius=blur_radius)
+        for i, rgba in zip(in_group.tolist(), group_rgbas):
+            rgbas[i] = rgba
+    return rgbas
+
+
+def get_poly_3d_weights(poly_cos:np.ndarray, points:np.ndarray):
+    """ returns mean value weights of 'points' in polygons with vert coordinates 'poly_cos' (batched version of 'poly_3d_calc')
+
+    poly_cos -- (num_points, num_verts, 3) array of polygon vert coordinates
+    points   -- (num_points, 3) array of points on the polygons
+    """
+    eps = 1e-5
+    num_points, num_verts, _ = poly_cos.shape
+    vecs = poly_cos - points[:, None, :]
+    lens = np.linalg.norm(vecs, axis=2)
+    next_vecs = np.roll(vecs, -1, axis=1)
+    next_lens = np.roll(lens, -1, axis=1)
+    # half tangents of angles between consecutive verts (as seen from the point)
+    areas = np.linalg.norm(np.cross(vecs, next_vecs), axis=2)
+    dots = np.einsum("ijk,ijk->ij", vecs, next_vecs)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        half_tans = np.where(areas > np.finfo(np.float32).eps, (lens * next_lens - dots) / areas, 0)
+        half_tans[~np.isfinite(half_tans)] = 0
+        weights = (np.roll(half_tans, 1, axis=1) + half_tans) / lens
+        totals = weights.sum(axis=1)
+        weights = np.where(totals[:, None] != 0, weights / totals[:, None], weights)
+    # points at a vert or on an edge are linearly interpolated between the edge's verts
+    edge_vecs = np.roll(poly_cos, -1, axis=1) - poly_cos
+    edge_len_sqs = np.einsum("ijk,ijk->ij", edge_vecs, edge_vecs)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        facs = np.where(edge_len_sqs != 0, np.einsum("ijk,ijk->ij", -vecs, edge_vecs) / edge_len_sqs, 0)
+    clamped_facs = np.clip(facs, 0, 1)
+    seg_dist_sqs = np.sum((poly_cos + edge_vecs * clamped_facs[:, :, None] - points[:, None, :]) ** 2, axis=2)
+    # check verts and edges in the same order as 'poly_3d_calc' (starting from the last vert)
+    check_order = np.roll(np.arange(num_verts), 1)
+    at_vert = lens[:, check_order] < eps
+    on_edge = seg_dist_sqs[:, check_order] < eps ** 2
+    checks = np.stack((at_vert, on_edge), axis=2).reshape(num_points, -1)
+    degenerate = np.flatnonzero(checks.any(axis=1))
+    if len(degenerate) > 0:
+        first_checks = checks[degenerate].argmax(axis=1)
+        cur_idxs = check_order[first_checks // 2]
+        next_idxs = (cur_idxs + 1) % num_verts
+        edge_facs = np.where(first_checks % 2 == 1, clamped_facs[degenerate, cur_idxs], 0)
+        weights[degenerate] = 0
+        weights[degenerate, cur_idxs] = 1 - edge_facs
+        weights[degenerate, next_idxs] += edge_facs
+    return weights
+
+
+def get_uv_pixel_coords(uv_locs:np.ndarray, image_size:tuple, mapping_loc:Vector=Vector((0, 0)), mapping_scale:Vector=Vector((1, 1))):
+    """ convert (num_points, 2) array of uv locations to pixel coordinates in image (batched version of the end of 'get_uv_coord') """
+    # ensure uv_locs are in range(0,1)
+    uv_locs = np.round(uv_locs, 5) % 1
+    # apply location and scale offset
+    uv_locs = (uv_locs - np.array(mapping_loc[:2])) / np.array(mapping_scale[:2])
+    # once again ensure uv_locs are in range(0,1)
+    uv_locs = np.round(uv_locs, 5) % 1
+    # convert uv_locs in range(0,1) to uv coordinates
+    return np.round(uv_locs * (np.array(image_size[:2]) - 1)).astype(np.int64)
+
+
+def get_pixels_at_coords(image:Image, pixel_coords:np.ndarray, image_frame:int=None, color_depth:int=0, blur_radius:int=0):
+    """ returns list of RGBA values at (num_points, 2) array of pixel coordinates (batched version of 'get_pixel' with gamma correction) """
+    pixels = get_pixels_cache(image, frame=image_frame, color_depth=color_depth, blur_radius=blur_radius)
+    channels = image.channels
+    pixel_numbers = (image.size[0] * pixel_coords[:, 1] + pixel_coords[:, 0]) * channels
+    assert np.all((0 <= pixel_numbers) & (pixel_numbers < len(pixels)))
+    rgbas = np.asarray(pixels)[pixel_numbers[:, None] + np.arange(channels)].astype(np.float64)
+    # un-premultiply
+    if image.alpha_mode == "PREMUL":
+        alphas = rgbas[:, 3:4]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rgbas[:, :3] = np.where(alphas == 0, 0, rgbas[:, :3] / alphas)
+    # gamma correct color values
+    if image.colorspace_settings.name == "sRGB":
+        rgb = rgbas[:, :3]
+        with np.errstate(invalid="ignore"):
+            rgbas[:, :3] = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    return np.round(rgbas, 6).tolist()
+
+
 def get_uv_image(obj:Object, face_idx:int, uv_image:Image=None):
     """ returns UV image for object (priority to passed image, then face index, then first one found in material nodes) """
     image = verify_img(uv_image)
@@ -115,6 +115,8 @@ def update_brick_size_and_dict(dimensions, source_name, bricksdict, brick_size,
                     new_brick_d["near_intersection"] = new_brick_d["near_intersection"] or tuple(brick_d["near_intersection"])
                     if new_brick_d["val"] == 0:
                         set_brick_val(bricksdict, new_loc, new_key)
+    # store adjusted size (sizes of dense bricksdict entries are copies)
+    brick_d["size"] = brick_size
     return brick_size
 
 
@@ -147,6 +149,37 @@ def get_bricksdicts_from_objs(obj_names):
     return bricksdicts
 
 
+def get_keys_around_bricks(bricksdict, obj_names, zstep, margin=(0, 0, 0)):
+    """ get keys within (and 'margin' locations around) the bricks named in 'obj_names', plus the parent keys of bricks at those locations """
+    keys = set()
+    mx, my, mz = margin
+    for obj_name in obj_names:
+        dkey = get_dict_key(obj_name)
+        x0, y0, z0 = get_dict_loc(bricksdict, dkey)
+        size = bricksdict[dkey]["size"]
+        for x in range(x0 - mx, x0 + size[0] + mx):
+            for y in range(y0 - my, y0 + size[1] + my):
+                for z in range(z0 - mz, z0 + -(-size[2] // zstep) + mz):
+                    k = list_to_str((x, y, z))
+                    keys.add(k)
+                    parent_key = get_parent_key(bricksdict, k)
+                    if parent_key is not None:
+                        keys.add(parent_key)
+    return keys
+
+
+def get_keys_around_selected_bricks(obj_names_dict, bricksdicts, margin=(0, 0, 0)):
+    """ get keys around selected bricks for each cm_id in 'obj_names_dict' (e.g. keys recorded before editing the bricks) """
+    scn = bpy.context.scene
+    keys_dict = {}
+    for cm_id, obj_names in obj_names_dict.items():
+        if cm_id not in bricksdicts:
+            continue
+        cm = get_item_by_id(scn.cmlist, cm_id)
+        keys_dict[cm_id] = get_keys_around_bricks(bricksdicts[cm_id], obj_names, cm.zstep, margin)
+    return keys_dict
+
+
 def update_vals_linear(bricksdict, keys):
     checked_keys = set()
     updated_keys = set()
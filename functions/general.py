@@ -121,6 +121,7 @@ def get_matrix_settings_str(cm=None):
         "use_normals": cm.use_normals,
         "grid_offset": list(cm.grid_offset),
         "insideness_ray_cast_dir": cm.insideness_ray_cast_dir,
+        "voxelize_method": cm.voxelize_method,
         "brick_shell": cm.brick_shell,
         "calc_internals": cm.calc_internals,
         "calculation_axes": cm.calculation_axes,
@@ -443,6 +444,9 @@ def get_keys_dict(bricksdict, keys=None, parents_only=False):
 
 
 def get_parent_key(bricksdict, key):
+    # dense bricksdicts read the parent from integer columns (see 'DenseBricksdict.get_parent_key')
+    if hasattr(bricksdict, "parent_loc_at"):
+        return bricksdict.get_parent_key(key)
     try:
         brick_d = bricksdict[key]
     except KeyError:
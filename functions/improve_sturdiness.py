@@ -35,22 +35,25 @@ def improve_sturdiness(bricksdict, keys, cm, zstep, brick_type, merge_seed, iter
     last_conn_comps = [-1, -1]
     # initialize minimum sturdiness
     lowest_conn_data = {"disconnected_parts": inf, "weak_points": inf}
-    sturdiest_bricksdict = None
+    # original entries of bricksdict changed since the sturdiest model was found
+    sturdiest_changes = None
+    # reset 'attempted_merge' for all items in bricksdict
+    for key0 in bricksdict:
+        bricksdict[key0]["attempted_merge"] = False
+    # build connectivity graph (updated as bricks are split and merged)
+    conn_graph = ConnectivityGraph(bricksdict, zstep, get_parent_keys(bricksdict, keys))
     print()
     # run sturdiness improvement iteratively
     for i in range(iterations + 1):
-        # reset 'attempted_merge' for all items in bricksdict
-        for key0 in bricksdict:
-            bricksdict[key0]["attempted_merge"] = False
         # get connectivity data
-        conn_comps, weak_points, weak_point_neighbors, parent_keys = get_connectivity_data(bricksdict, zstep, keys, verbose=True)
+        conn_comps, weak_points, weak_point_neighbors, parent_keys = get_connectivity_data(bricksdict, zstep, keys, verbose=True, conn_graph=conn_graph)
         # check if this is the sturdiest model thusfar
         num_disconnected_parts = get_num_disconnected_parts(conn_comps)
         if i > min(100, iterations / 2) and (num_disconnected_parts < lowest_conn_data["disconnected_parts"] or (num_disconnected_parts == lowest_conn_data["disconnected_parts"] and len(weak_points) < lowest_conn_data["weak_points"])):
             print("cached...")
             lowest_conn_data["disconnected_parts"] = num_disconnected_parts
             lowest_conn_data["weak_points"] = len(weak_points)
-            sturdiest_bricksdict = deepcopy(bricksdict)
+            sturdiest_changes = dict()
         # set last connectivity vals
         last_weak_points.append(len(weak_points))
         last_conn_comps.append(len(conn_comps))
@@ -71,6 +74,11 @@ def improve_sturdiness(bricksdict, keys, cm, zstep, brick_type, merge_seed, iter
         # split up bricks
         split_keys = set()
         for k in weak_points | weak_point_neighbors | component_interfaces:
+            # store original entries so the sturdiest model can be restored
+            if sturdiest_changes is not None:
+                for k0 in get_keys_in_brick(bricksdict, bricksdict[k]["size"], zstep, key=k):
+                    if k0 not in sturdiest_changes:
+                        sturdiest_changes[k0] = deepcopy(dict(bricksdict[k0]))
             split_keys |= split_brick(bricksdict, k, zstep, brick_type)
         # get merge direction and sort order
         new_merge_seed = merge_seed + i + 1
@@ -83,12 +91,18 @@ def improve_sturdiness(bricksdict, keys, cm, zstep, brick_type, merge_seed, iter
 
         # merge split bricks
         merged_keys = merge_bricks(bricksdict, split_keys, cm, merge_seed=new_merge_seed, target_type="BRICK" if brick_type == "BRICKS_AND_PLATES" else brick_type, any_height=brick_type == "BRICKS_AND_PLATES", direction_mult=direction_mult, sort_fn=sort_fn)
+        # reset 'attempted_merge' for merged keys (only split keys are merged)
+        for key0 in split_keys:
+            bricksdict[key0]["attempted_merge"] = False
+        # update connectivity graph for split and merged bricks
+        conn_graph.update_bricks(split_keys)
 
-    # replace bricksdict with the sturdiest one found
-    if sturdiest_bricksdict is not None:
-        # modify bricksdict in place so the pointer remains the same
-        bricksdict.clear()
-        bricksdict.update(sturdiest_bricksdict)
+    # replace changed entries with those of the sturdiest model found
+    if sturdiest_changes is not None:
+        # modify bricksdict entries in place so the pointer remains the same
+        for k0, brick_d in sturdiest_changes.items():
+            bricksdict[k0] = brick_d
+        conn_graph.update_bricks(sturdiest_changes.keys())
 
     # print the result
     if iterations > 0 and len(conn_comps) == 1 and len(weak_points) == 0:
@@ -96,7 +110,7 @@ def improve_sturdiness(bricksdict, keys, cm, zstep, brick_type, merge_seed, iter
     else:
         # get the final components data
         print("\nResult:")
-        conn_comps, weak_points, _, _ = get_connectivity_data(bricksdict, zstep, keys, get_neighbors=False, verbose=True)
+        conn_comps, weak_points, _, _ = get_connectivity_data(bricksdict, zstep, keys, get_neighbors=False, verbose=True, conn_graph=conn_graph)
 
     return conn_comps, weak_points
 
@@ -106,19 +120,25 @@ def get_num_disconnected_parts(conn_comps):
 
 
 
-def get_connectivity_data(bricksdict, zstep, keys=None, get_neighbors=True, verbose=False):
-    parent_keys = get_parent_keys(bricksdict, keys)
+def get_connectivity_data(bricksdict, zstep, keys=None, get_neighbors=True, verbose=False, conn_graph=None):
+    """ get connected components, weak points, weak point neighbors, and parent keys (from 'conn_graph' if passed, else from scratch) """
     # get connected components
     if verbose:
         print("getting connected components...", end="")
-    conn_comps = get_connected_components(bricksdict, zstep, parent_keys)
+    if conn_graph is None:
+        parent_keys = set(get_parent_keys(bricksdict, keys))
+        conn_comps, weak_points = get_connectivity_from_brick_graph(bricksdict, zstep, parent_keys)
+    else:
+        parent_keys = conn_graph.neighbors.keys()
+        conn_comps = conn_graph.get_conn_comps()
     if verbose:
         print(len(conn_comps))
     # get weak articulation points
     if verbose:
         print("getting weak articulation points...", end="")
     # weak_points = get_bridges_recursive(conn_comps)
-    weak_points = get_bridges(conn_comps)
+    if conn_graph is not None:
+        weak_points = conn_graph.get_weak_points()
     if verbose:
         print(len(weak_points))
     # get weak point neighbors
@@ -40,11 +40,13 @@ from .matlist_utils import *
 from .post_hollowing import *
 from .post_merging import *
 from .post_shrinking import *
-from ..lib.caches import bricker_mesh_cache
+from ..lib.caches import bricker_mesh_cache, set_cache_memory_limit
 
 
 @timed_call()
 def make_bricks(cm, bricksdict, keys_dict, target_keys, parent, logo, dimensions, action, bcoll, num_source_mats, split=False, brick_scale=None, merge_vertical=True, clear_existing_collection=True, frame_num=None, cursor_status=False, print_status=True, placeholder_meshes=False, run_pre_merge=True, force_post_merge=False, redrawing=False):
+    # keep brick mesh cache within the memory budget set in the addon preferences
+    set_cache_memory_limit(get_addon_preferences().cache_memory_limit)
     # initialize cmlist attributes (prevents 'update' function for each property from running every time)
     n = cm.source_obj.name
     cm_id = cm.id
@@ -125,6 +127,8 @@ def make_bricks(cm, bricksdict, keys_dict, target_keys, parent, logo, dimensions
                 brick_d0["mat_name"] = ""
                 brick_d0["custom_mat_name"] = False
 
+        # precompute availability of bricks for merging
+        merge_grid = PreMergeGrid(bricksdict, max(max_width, max_depth), keys_dict, target_keys)
 
         # run merge operations (twice if flat brick type)
         for time_through in range(num_iters):
@@ -157,7 +161,7 @@ def make_bricks(cm, bricksdict, keys_dict, target_keys, parent, logo, dimensions
                     loc = get_dict_loc(bricksdict, key)
 
                     # merge current brick with available adjacent bricks
-                    merge_with_adjacent_bricks(brick_d, bricksdict, key, loc, [1, 1, zstep], zstep, rand_s1, build_is_dirty, brick_type, max_width, max_depth, legal_bricks_only, merge_internals_h, merge_internals_v, material_type, merge_vertical=merge_vertical)
+                    merge_with_adjacent_bricks(brick_d, bricksdict, key, loc, [1, 1, zstep], zstep, rand_s1, build_is_dirty, brick_type, max_width, max_depth, legal_bricks_only, merge_internals_h, merge_internals_v, material_type, merge_vertical=merge_vertical, merge_grid=merge_grid)
 
                     # print status to terminal and cursor
                     cur_percent = (i / denom)
@@ -246,7 +250,7 @@ def make_bricks(cm, bricksdict, keys_dict, target_keys, parent, logo, dimensions
     elif material_type in ("CUSTOM", "NONE"):
         mats.append(custom_mat)
     # initialize vars for brick drawing
-    all_meshes = bmesh.new()
+    all_meshes = get_mesh_collector(instance_method, split, random_rot)
     bricks_created = list()
 
     # draw merged bricks
@@ -265,8 +269,14 @@ def make_bricks(cm, bricksdict, keys_dict, target_keys, parent, logo, dimensions
     # end progress bars
     update_progress_bars(1, 0, "Building", print_status, cursor_status, end=True)
 
+    # draw instances of each brick variant with instancer objects
+    if isinstance(all_meshes, MeshInstancer):
+        name = "Bricker_%(n)s_bricks" % locals()
+        if frame_num is not None:
+            name = "%(name)s_f_%(frame_num)s" % locals()
+        bricks_created += all_meshes.to_objects(name, mats, bcoll, parent, cm_id)
     # combine meshes to a single object, link to scene, and add relevant data to the new Blender MESH object
-    if not split:
+    elif not split:
         name = "Bricker_%(n)s_bricks" % locals()
         if frame_num is not None:
             name = "%(name)s_f_%(frame_num)s" % locals()
@@ -36,6 +36,7 @@ from .common import *
 from .general import *
 from .hash_object import hash_object
 from .mat_utils import *
+from .mesh_assembly import *
 from ..lib.caches import bricker_mesh_cache
 
 
@@ -56,8 +57,6 @@ def draw_brick(cm_id, bricksdict, key, loc, bcoll, clear_existing_collection, pa
     else:
         # get brick mesh
         m = get_brick_data(brick_d, dimensions, brick_type, brick_size, circle_verts, underside_detail, use_stud, logo_to_use, logo_type, logo_inset, logo_scale, logo_resolution, logo_decimate, rand_s3)
-    # duplicate data if not instancing by mesh data
-    m = m if instance_method == "LINK_DATA" else m.copy()
     # apply random rotation to edit mesh according to parameters
     random_rot_matrix = get_random_rot_matrix(random_rot, rand_s2, brick_size)
     # get brick location
@@ -69,6 +68,8 @@ def draw_brick(cm_id, bricksdict, key, loc, bcoll, clear_existing_collection, pa
         mat = internal_mat
 
     if split:
+        # duplicate data if not instancing by mesh data
+        m = m if instance_method in ("LINK_DATA", "INSTANCE_VARIANTS") else m.copy()
         brick = bpy.data.objects.get(brick_d["name"])
         if brick:
             # NOTE: last brick object is left in memory (faster)
@@ -97,56 +98,24 @@ def draw_brick(cm_id, bricksdict, key, loc, bcoll, clear_existing_collection, pa
         if clear_existing_collection or brick.name not in bcoll.objects.keys():
             bcoll.objects.link(brick)
     else:
-        # duplicates mesh – prevents crashes in 2.79 (may need to add back if experiencing crashes in b280)
-        if not b280():
-            m = m.copy()
-        # apply rotation matrices to edit mesh
-        if random_rot_matrix is not None:
-            m.transform(random_rot_matrix)
-        # transform brick mesh to coordinate on matrix
-        m.transform(Matrix.Translation(brick_loc))
-
         # keep track of mats already used
         if mat in mats:
             mat_idx = mats.index(mat)
         elif mat is not None:
             mats.append(mat)
             mat_idx = len(mats) - 1
-
-        # set material
-        if mat is not None:
-            # point all polygons to target material (index will correspond in all_meshes object)
-            for p in m.polygons:
-                p.material_index = mat_idx
-
-        # append mesh to all_meshes bmesh object
-        all_meshes.from_mesh(m)
-
-        # remove mesh in 2.79 (mesh was duplicated above to prevent crashes)
-        if not b280():
-            bpy.data.meshes.remove(m)
-        # NOTE: The following lines clean up the mesh if not duplicated
-        else:
-            # reset polygon material mapping
-            if mat is not None:
-                for p in m.polygons:
-                    p.material_index = 0
-
-            # reset transformations for reference mesh
-            m.transform(Matrix.Translation(-brick_loc))
-            if random_rot_matrix is not None:
-                random_rot_matrix.invert()
-                m.transform(random_rot_matrix)
+        # add transformed instance of brick mesh to all_meshes (material index will correspond in all_meshes object)
+        all_meshes.add(m, random_rot_matrix, brick_loc, mat_idx if mat is not None else None)
 
     return bricksdict
 
 
-def merge_with_adjacent_bricks(brick_d, bricksdict, key, loc, default_size, zstep, rand_s1, build_is_dirty, brick_type, max_width, max_depth, legal_bricks_only, merge_internals_h, merge_internals_v, material_type, merge_vertical=True):
+def merge_with_adjacent_bricks(brick_d, bricksdict, key, loc, default_size, zstep, rand_s1, build_is_dirty, brick_type, max_width, max_depth, legal_bricks_only, merge_internals_h, merge_internals_v, material_type, merge_vertical=True, merge_grid=None):
     brick_size = brick_d["size"]
     if brick_size is None or build_is_dirty:
         prefer_largest = 0 < brick_d["val"] < 1
         axis_sort_order = [2, 0, 1] if rand_s1.randint(0, 2) else [2, 1, 0]
-        brick_size, _, keys_in_brick = attempt_pre_merge(bricksdict, key, default_size, zstep, brick_type, max_width, max_depth, legal_bricks_only, merge_internals_h, merge_internals_v, material_type, axis_sort_order=axis_sort_order, loc=loc, prefer_largest=prefer_largest, merge_vertical=merge_vertical, height_3_only=brick_d["type"] in get_brick_types(height=3))
+        brick_size, _, keys_in_brick = attempt_pre_merge(bricksdict, key, default_size, zstep, brick_type, max_width, max_depth, legal_bricks_only, merge_internals_h, merge_internals_v, material_type, axis_sort_order=axis_sort_order, loc=loc, prefer_largest=prefer_largest, merge_vertical=merge_vertical, height_3_only=brick_d["type"] in get_brick_types(height=3), merge_grid=merge_grid)
     else:
         keys_in_brick = get_keys_in_brick(bricksdict, brick_size, zstep, loc=loc)
     return brick_size, keys_in_brick
@@ -17,6 +17,7 @@
 
 # System imports
 from colorsys import rgb_to_hsv, hsv_to_rgb
+import numpy as np
 
 # Module imports
 from .common import *
@@ -236,6 +237,37 @@ def create_new_material(model_name, rgba, rgba_vals, sss, sat_mat, specular, rou
     return mat_name
 
 
+def create_new_materials(model_name, rgbas, sss, sat_mat, specular, roughness, ior, transmission, displacement, use_abs_template, last_use_abs_template, include_transparency, cur_frame=None, max_materials=0):
+    """ create one material for each unique color in 'rgbas' and return material name for each rgba value ('' for None values) """
+    mat_names = [""] * len(rgbas)
+    idxs = [i for i, rgba in enumerate(rgbas) if rgba is not None]
+    if len(idxs) == 0:
+        return mat_names
+    # group colors that round to the same material name
+    colors = np.array([tuple(rgbas[i])[:4] for i in idxs], dtype=np.float64)
+    cluster_colors, labels = np.unique(np.round(colors, 5), axis=0, return_inverse=True)
+    labels = labels.reshape(-1)
+    # merge groups of similar colors until at most 'max_materials' remain
+    if 0 < max_materials < len(cluster_colors):
+        colors = cluster_colors[labels]
+        levels = 2 ** 10
+        while True:
+            quantized = np.minimum(np.floor(colors * levels), levels - 1)
+            quantized_colors, labels = np.unique(quantized, axis=0, return_inverse=True)
+            labels = labels.reshape(-1)
+            if len(quantized_colors) <= max_materials or levels == 1:
+                break
+            levels = max(1, int(levels * 0.8))
+        # use average color of each merged group
+        counts = np.bincount(labels)
+        cluster_colors = np.column_stack([np.bincount(labels, weights=colors[:, c]) / counts for c in range(4)])
+    # create each material once
+    cluster_mat_names = [create_new_material(model_name, list(rgba), None, sss, sat_mat, specular, roughness, ior, transmission, displacement, use_abs_template, last_use_abs_template, include_transparency, cur_frame) for rgba in cluster_colors.tolist()]
+    for i, label in zip(idxs, labels.tolist()):
+        mat_names[i] = cluster_mat_names[label]
+    return mat_names
+
+
 def get_brick_rgba(obj, face_idx, point, uv_image=None, color_depth:int=0, blur_radius:int=0):
     """ returns RGBA value for brick """
     if face_idx is None:
@@ -253,6 +285,24 @@ def get_brick_rgba(obj, face_idx, point, uv_image=None, color_depth:int=0, blur_
     return rgba, orig_mat_name
 
 
+def get_brick_rgbas(obj, face_idxs, points, uv_image=None, color_depth:int=0, blur_radius:int=0):
+    """ returns lists of RGBA values and original material names for many bricks (batched version of 'get_brick_rgba') """
+    rgbas = get_uv_pixel_colors(obj, face_idxs, points, uv_image, color_depth=color_depth, blur_radius=blur_radius)
+    orig_mat_names = [""] * len(rgbas)
+    mat_colors = dict()
+    for i, (face_idx, rgba) in enumerate(zip(face_idxs, rgbas)):
+        if rgba is not None:
+            continue
+        # get closest material using material slot of face
+        orig_mat = get_mat_at_face_idx(obj, face_idx)
+        orig_mat_name = orig_mat.name if orig_mat is not None else ""
+        if orig_mat_name not in mat_colors:
+            mat_colors[orig_mat_name] = get_material_color(orig_mat_name)
+        rgbas[i] = mat_colors[orig_mat_name]
+        orig_mat_names[i] = orig_mat_name
+    return rgbas, orig_mat_names
+
+
 def get_materials_in_model(cm, cur_frame=None):
     """ cannot account for materials added with BrickSculpt paintbrush """
     scn, cm, n = get_active_context_info(cm=cm)
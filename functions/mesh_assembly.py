@@ -0,0 +1,289 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import numpy as np
+
+# Blender imports
+import bpy
+
+# Module imports
+from .common import *
+
+# loop layers copied to the combined mesh as (collection name, attribute, width, default value)
+LOOP_LAYER_TYPES = (
+    ("uv_layers", "uv", 2, 0),
+    ("vertex_colors", "color", 4, 1),
+)
+
+
+class MeshAssembler:
+    """ collects transformed instances of template meshes and writes them to a single mesh in one pass
+
+    Produces the same vertex, edge, loop and face order as appending each instance to a bmesh with 'from_mesh'
+    """
+
+    def __init__(self):
+        self.templates = dict()
+        self.instances = list()
+
+    def add(self, m, rot_matrix=None, loc=(0, 0, 0), mat_idx=None):
+        """ add instance of mesh 'm' rotated by 'rot_matrix' and then translated to 'loc' (polygons assigned to 'mat_idx' if not None) """
+        key = m.as_pointer()
+        if key not in self.templates:
+            self.templates[key] = get_mesh_template(m)
+        rot = np.identity(3, dtype=np.float32) if rot_matrix is None else np.array(rot_matrix.to_3x3(), dtype=np.float32)
+        self.instances.append((key, rot, np.array(loc, dtype=np.float32), mat_idx))
+
+    def to_mesh(self, m):
+        """ write all instances to empty mesh 'm' """
+        instance_keys = [key for key, _, _, _ in self.instances]
+        # get offset of each instance in the combined element arrays
+        offsets = dict()
+        for domain in ("verts", "edges", "loops", "polys"):
+            counts = np.array([len(self.templates[key][domain]) for key in instance_keys], dtype=np.int64)
+            offsets[domain] = np.concatenate(([0], np.cumsum(counts)))
+        num_verts, num_edges, num_loops, num_polys = (int(offsets[domain][-1]) for domain in ("verts", "edges", "loops", "polys"))
+        co = np.empty((num_verts, 3), dtype=np.float32)
+        edge_verts = np.empty((num_edges, 2), dtype=np.int32)
+        edge_seams = np.empty(num_edges, dtype=bool)
+        edge_sharps = np.empty(num_edges, dtype=bool)
+        loop_verts = np.empty(num_loops, dtype=np.int32)
+        loop_edges = np.empty(num_loops, dtype=np.int32)
+        loop_starts = np.empty(num_polys, dtype=np.int32)
+        loop_totals = np.empty(num_polys, dtype=np.int32)
+        poly_smooths = np.empty(num_polys, dtype=bool)
+        poly_mats = np.empty(num_polys, dtype=np.int32)
+        loop_layers = dict()
+        for layer_type in LOOP_LAYER_TYPES:
+            _, _, width, default = layer_type
+            for template in self.templates.values():
+                for name in template["loop_layers"][layer_type]:
+                    if name not in loop_layers.setdefault(layer_type, dict()):
+                        loop_layers[layer_type][name] = np.full((num_loops, width), default, dtype=np.float32)
+
+        # instantiate each template for all of its instances at once
+        instance_idxs = dict()
+        for i, key in enumerate(instance_keys):
+            instance_idxs.setdefault(key, []).append(i)
+        for key, idxs in instance_idxs.items():
+            template = self.templates[key]
+            idxs = np.array(idxs)
+            rots = np.array([self.instances[i][1] for i in idxs])
+            locs = np.array([self.instances[i][2] for i in idxs])
+            # get indices of instance elements in the combined element arrays
+            v_idxs, e_idxs, l_idxs, p_idxs = (offsets[domain][idxs, None] + np.arange(len(template[domain])) for domain in ("verts", "edges", "loops", "polys"))
+            co[v_idxs] = np.einsum("kij,nj->kni", rots, template["verts"]) + locs[:, None, :]
+            edge_verts[e_idxs] = template["edges"] + offsets["verts"][idxs, None, None]
+            edge_seams[e_idxs] = template["edge_seams"]
+            edge_sharps[e_idxs] = template["edge_sharps"]
+            loop_verts[l_idxs] = template["loops"] + offsets["verts"][idxs, None]
+            loop_edges[l_idxs] = template["loop_edges"] + offsets["edges"][idxs, None]
+            loop_starts[p_idxs] = template["polys"] + offsets["loops"][idxs, None]
+            loop_totals[p_idxs] = template["loop_totals"]
+            poly_smooths[p_idxs] = template["poly_smooths"]
+            mat_idxs = [self.instances[i][3] for i in idxs]
+            assigned = np.array([mat_idx is not None for mat_idx in mat_idxs])
+            poly_mats[p_idxs[~assigned]] = template["poly_mats"]
+            poly_mats[p_idxs[assigned]] = np.array([mat_idx for mat_idx in mat_idxs if mat_idx is not None], dtype=np.int32)[:, None]
+            for layer_type, layers in loop_layers.items():
+                for name, data in layers.items():
+                    if name in template["loop_layers"][layer_type]:
+                        data[l_idxs] = template["loop_layers"][layer_type][name]
+
+        # write combined element arrays to mesh
+        arrays = {
+            "verts": co,
+            "edges": edge_verts,
+            "edge_seams": edge_seams,
+            "edge_sharps": edge_sharps,
+            "loops": loop_verts,
+            "loop_edges": loop_edges,
+            "polys": loop_starts,
+            "loop_totals": loop_totals,
+            "poly_smooths": poly_smooths,
+            "poly_mats": poly_mats,
+        }
+        for (collection_name, _, _, _), layers in loop_layers.items():
+            for name, data in layers.items():
+                arrays["%(collection_name)s:%(name)s" % locals()] = data
+        set_mesh_arrays(m, arrays)
+
+
+class MeshInstancer:
+    """ collects instances of template meshes and draws them with one vertex instancer object per template mesh and material
+
+    Templates are keyed by mesh name (meshes from 'get_brick_data' are named by their 'bm_cache_string' hash)
+    Instances are drawn at their locations only, as vertex instancing does not support arbitrary instance rotations
+    (see 'get_mesh_collector')
+    """
+
+    def __init__(self):
+        self.templates = dict()
+        self.instances = list()
+
+    def add(self, m, rot_matrix=None, loc=(0, 0, 0), mat_idx=None):
+        """ add instance of mesh 'm' at 'loc' (assigned to material 'mat_idx' if not None; 'rot_matrix' must be None) """
+        assert rot_matrix is None, "MeshInstancer can't draw rotated instances"
+        self.templates.setdefault(m.name, m)
+        self.instances.append((m.name, tuple(loc), mat_idx))
+
+    def get_instance_table(self):
+        """ get list of template meshes and arrays of template index, location and material index (-1 if unassigned) for each instance """
+        template_idxs = {key: i for i, key in enumerate(self.templates)}
+        num_instances = len(self.instances)
+        template_ids = np.array([template_idxs[key] for key, _, _ in self.instances], dtype=np.int32)
+        locs = np.array([loc for _, loc, _ in self.instances], dtype=np.float32).reshape(num_instances, 3)
+        mat_idxs = np.array([-1 if mat_idx is None else mat_idx for _, _, mat_idx in self.instances], dtype=np.int32)
+        return list(self.templates.values()), template_ids, locs, mat_idxs
+
+    def to_objects(self, name, mats, bcoll, parent, cm_id):
+        """ create instancer objects (prefixed with 'name') for all instances and link them to 'bcoll' """
+        templates, template_ids, locs, mat_idxs = self.get_instance_table()
+        groups = np.unique(np.column_stack((template_ids, mat_idxs)), axis=0).tolist() if len(self.instances) > 0 else []
+        objs = list()
+        for i, (template_id, mat_idx) in enumerate(groups):
+            # create point cloud with a vertex at each instance location
+            instancer_name = "%(name)s_instancer_%(i)s" % locals()
+            group_locs = locs[(template_ids == template_id) & (mat_idxs == mat_idx)]
+            old_mesh = bpy.data.meshes.get(instancer_name)
+            points = bpy.data.meshes.new(instancer_name)
+            if old_mesh and old_mesh.users > 0:
+                old_mesh.user_remap(points)
+            points.vertices.add(len(group_locs))
+            points.vertices.foreach_set("co", group_locs.ravel())
+            points.update()
+            instancer = get_instancing_object(instancer_name, points, bcoll, cm_id)
+            instancer.instance_type = "VERTS"
+            instancer.show_instancer_for_viewport = False
+            instancer.show_instancer_for_render = False
+            instancer.parent = parent
+            # create object with template mesh data to instance at each vertex
+            template_obj = get_instancing_object("%(name)s_variant_%(i)s" % locals(), templates[template_id], bcoll, cm_id)
+            if mat_idx != -1:
+                set_material(template_obj, mats[mat_idx])
+            template_obj.parent = instancer
+            objs += [instancer, template_obj]
+        # remove instancer objects left over from previous builds
+        i = len(groups)
+        while bpy.data.objects.get("%(name)s_instancer_%(i)s" % locals()) is not None:
+            for obj_name in ("%(name)s_variant_%(i)s" % locals(), "%(name)s_instancer_%(i)s" % locals()):
+                obj = bpy.data.objects.get(obj_name)
+                if obj is not None:
+                    bpy.data.objects.remove(obj, do_unlink=True)
+            i += 1
+        return objs
+
+
+def get_mesh_collector(instance_method, split, random_rot):
+    """ get MeshInstancer for unsplit models drawn with instanced brick variants, else MeshAssembler (also used for random brick rotation, which instancing can't draw) """
+    if instance_method == "INSTANCE_VARIANTS" and not split and random_rot == 0:
+        return MeshInstancer()
+    return MeshAssembler()
+
+
+def get_instancing_object(name, data, bcoll, cm_id):
+    """ get object 'name' with 'data' (created if it doesn't exist) linked to 'bcoll' """
+    obj = bpy.data.objects.get(name)
+    if obj is None:
+        obj = bpy.data.objects.new(name, data)
+        obj.cmlist_id = cm_id
+    elif obj.data != data:
+        obj.data = data
+    if obj.name not in bcoll.objects.keys():
+        bcoll.objects.link(obj)
+    # protect object from being deleted
+    obj.is_brickified_object = True
+    return obj
+
+
+def get_mesh_template(m):
+    """ get element arrays of mesh 'm' used to instantiate it with MeshAssembler """
+    num_verts, num_edges, num_loops, num_polys = len(m.vertices), len(m.edges), len(m.loops), len(m.polygons)
+    template = {
+        "verts": np.empty((num_verts, 3), dtype=np.float32),
+        "edges": np.empty((num_edges, 2), dtype=np.int32),
+        "edge_seams": np.empty(num_edges, dtype=bool),
+        "edge_sharps": np.empty(num_edges, dtype=bool),
+        "loops": np.empty(num_loops, dtype=np.int32),
+        "loop_edges": np.empty(num_loops, dtype=np.int32),
+        "polys": np.empty(num_polys, dtype=np.int32),
+        "loop_totals": np.empty(num_polys, dtype=np.int32),
+        "poly_smooths": np.empty(num_polys, dtype=bool),
+        "poly_mats": np.empty(num_polys, dtype=np.int32),
+        "loop_layers": dict(),
+    }
+    m.vertices.foreach_get("co", template["verts"].ravel())
+    m.edges.foreach_get("vertices", template["edges"].ravel())
+    m.edges.foreach_get("use_seam", template["edge_seams"])
+    m.edges.foreach_get("use_edge_sharp", template["edge_sharps"])
+    m.loops.foreach_get("vertex_index", template["loops"])
+    m.loops.foreach_get("edge_index", template["loop_edges"])
+    m.polygons.foreach_get("loop_start", template["polys"])
+    m.polygons.foreach_get("loop_total", template["loop_totals"])
+    m.polygons.foreach_get("use_smooth", template["poly_smooths"])
+    m.polygons.foreach_get("material_index", template["poly_mats"])
+    for layer_type in LOOP_LAYER_TYPES:
+        collection_name, attr, width, _ = layer_type
+        template["loop_layers"][layer_type] = dict()
+        for layer in getattr(m, collection_name):
+            data = np.empty((num_loops, width), dtype=np.float32)
+            layer.data.foreach_get(attr, data.ravel())
+            template["loop_layers"][layer_type][layer.name] = data
+    return template
+
+
+def new_loop_layer(m, collection_name, name):
+    """ add new loop layer named 'name' to the 'collection_name' collection of mesh 'm' """
+    if collection_name == "uv_layers" and not b280():
+        m.uv_textures.new(name)
+        return m.uv_layers[name]
+    return getattr(m, collection_name).new(name=name)
+
+
+def get_mesh_arrays(m):
+    """ get element arrays of mesh 'm' as a flat dict (loop layers are keyed by '<collection name>:<layer name>') """
+    template = get_mesh_template(m)
+    arrays = {key: value for key, value in template.items() if key != "loop_layers"}
+    for (collection_name, _, _, _), layers in template["loop_layers"].items():
+        for name, data in layers.items():
+            arrays["%(collection_name)s:%(name)s" % locals()] = data
+    return arrays
+
+
+def set_mesh_arrays(m, arrays):
+    """ write element arrays from 'get_mesh_arrays' to empty mesh 'm' (arrays may be read-only or memory-mapped) """
+    m.vertices.add(len(arrays["verts"]))
+    m.vertices.foreach_set("co", arrays["verts"].ravel())
+    m.edges.add(len(arrays["edges"]))
+    m.edges.foreach_set("vertices", arrays["edges"].ravel())
+    m.edges.foreach_set("use_seam", arrays["edge_seams"])
+    m.edges.foreach_set("use_edge_sharp", arrays["edge_sharps"])
+    m.loops.add(len(arrays["loops"]))
+    m.loops.foreach_set("vertex_index", arrays["loops"])
+    m.loops.foreach_set("edge_index", arrays["loop_edges"])
+    m.polygons.add(len(arrays["polys"]))
+    m.polygons.foreach_set("loop_start", arrays["polys"])
+    m.polygons.foreach_set("loop_total", arrays["loop_totals"])
+    m.polygons.foreach_set("use_smooth", arrays["poly_smooths"])
+    m.polygons.foreach_set("material_index", arrays["poly_mats"])
+    for collection_name, attr, _, _ in LOOP_LAYER_TYPES:
+        for key, data in arrays.items():
+            if key.startswith(collection_name + ":"):
+                layer = new_loop_layer(m, collection_name, key[len(collection_name) + 1:])
+                layer.data.foreach_set(attr, data.ravel())
+    m.update()
@@ -40,6 +40,8 @@ def run_post_hollowing(bricksdict, keys, parent_keys, cm, zstep, brick_type, rem
     # initialize vars
     removed_keys = set()
     num_removed_bricks = 0
+    # build connectivity graph (updated as bricks are removed)
+    conn_graph = ConnectivityGraph(bricksdict, zstep, parent_keys, track_components=False)
     # # DEBUGGING LINES
     # last_conn_comps_full = get_connected_components(bricksdict, zstep, parent_keys)
     # last_weak_points_full = get_bridges(last_conn_comps_full)
@@ -55,16 +57,17 @@ def run_post_hollowing(bricksdict, keys, parent_keys, cm, zstep, brick_type, rem
         # find key connected to this brick to start subgraph from
         conn_keys = get_connected_keys(bricksdict, k, zstep)
         if len(conn_keys) > 1:
-            # get connectivity data starting at current key
+            # get connectivity data of bricks connected to current key within subgraph bounds
+            # NOTE: other components within the bounds are unaffected by removing this brick, so they aren't compared
             bounds = get_subgraph_bounds(bricksdict, k, radius=subgraph_radius)
-            internal_keys_in_bounds = set(k2 for k2 in parent_keys if bricksdict[k2]["draw"] and key_in_bounds(bricksdict, k2, bounds))
-            last_conn_comps = get_connected_components(bricksdict, zstep, internal_keys_in_bounds, bounds)
+            subgraph = conn_graph.get_subgraph(k, bounds)
+            last_conn_comps = [subgraph]
             last_weak_points = get_bridges(last_conn_comps)
-            # reset entries in bricksdict and remove key from evaluated keys
+            # reset entries in bricksdict
             reset_bricksdict_entries(bricksdict, keys_in_brick)
-            internal_keys_in_bounds.remove(k)
-            # get connectivity data again starting at current key
-            conn_comps = get_connected_components(bricksdict, zstep, internal_keys_in_bounds, bounds)
+            # get connectivity data again without current key
+            subgraph_without_k = {k1: neighbors - {k} for k1, neighbors in subgraph.items() if k1 != k}
+            conn_comps = split_connected_components(subgraph_without_k, subgraph_without_k.keys())
             weak_points = get_bridges(conn_comps)
         else:
             # reset entries in bricksdict without needing to analyze connectivity data
@@ -73,6 +76,7 @@ def run_post_hollowing(bricksdict, keys, parent_keys, cm, zstep, brick_type, rem
         if len(conn_keys) <= 1 or (len(conn_comps) <= len(last_conn_comps) and len(weak_points) <= len(last_weak_points)):
             removed_keys |= popped_keys.keys()
             num_removed_bricks += 1
+            conn_graph.update_bricks(keys_in_brick)
             if remove_object:
                 obj_name = popped_keys[k]["name"]
                 delete(bpy.data.objects.get(obj_name))
@@ -29,7 +29,9 @@ from .general import *
 from .transform_data import *
 from .mat_utils import *
 from .matlist_utils import *
+from ..lib.caches import set_cache_memory_limit
 from ..subtrees.background_processing.classes.job_manager import JobManager
+from ..subtrees.background_processing.classes.worker_pool import WorkerPool
 
 
 def uniquify_name(self, context):
@@ -116,6 +118,20 @@ def update_job_manager_properties(self, context):
     scn, cm, _ = get_active_context_info()
     job_manager = JobManager.get_instance(cm.id)
     job_manager.max_workers = self.max_workers
+    job_manager.adaptive_workers = self.adaptive_workers
+    job_manager.use_worker_pool = self.persistent_workers
+
+
+def update_persistent_workers(self, context):
+    update_job_manager_properties(self, context)
+    # stop resident workers so they don't hold on to memory
+    if not self.persistent_workers:
+        WorkerPool.shutdown()
+
+
+def update_cache_memory_limit(self, context):
+    """ updates the memory budget of the LRU caches """
+    set_cache_memory_limit(self.cache_memory_limit)
 
 
 def update_brick_shell(self, context):
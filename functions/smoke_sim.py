@@ -17,6 +17,7 @@
 
 # System imports
 import time
+import numpy as np
 
 # Module imports
 from .common import *
@@ -66,12 +67,10 @@ def get_smoke_info(source):
     max_res = Vector(domain_res) * (max_res_i / max(domain_res))
     max_res = get_adjusted_res(smoke_data, max_res)
     # get channel data
-    density_grid = smoke_data["density_grid"]
-    flame_grid = smoke_data["flame_grid"]
-    color_grid = smoke_data["color_grid"]
-    # density_grid = np.array(smoke_data["density_grid"]).reshape(domain_res[::-1])
-    # flame_grid = np.array(smoke_data["flame_grid"]).reshape(domain_res[::-1])
-    # color_grid = np.array(smoke_data["color_grid"]).reshape(domain_res[::-1] + [4])
+    grid_shape = tuple(domain_res[::-1])
+    density_grid = np.array(smoke_data["density_grid"]).reshape(grid_shape)
+    flame_grid = np.array(smoke_data["flame_grid"]).reshape(grid_shape)
+    color_grid = np.array(smoke_data["color_grid"]).reshape(grid_shape + (4,))
 
     return density_grid, flame_grid, color_grid, domain_res, max_res, adapt, adapt_min, adapt_max
 
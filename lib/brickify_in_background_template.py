@@ -1,5 +1,12 @@
-# NOTE: Requires 'cmlist_props', 'cmlist_pointer_props' 'frame', and 'action' as variables
+# NOTE: Requires 'cmlist_props', 'cmlist_pointer_props' 'frame', 'action', and 'addon_module' as variables
 import sys
+import importlib
+# clear model data cached by previous jobs in a persistent worker (brick mesh cache is kept warm)
+caches = importlib.import_module(addon_module + ".lib.caches")
+caches.bricker_bfm_cache.clear()
+caches.bricker_source_snapshot_cache.clear()
+caches.bricker_source_mesh_cache.clear()
+caches.bricker_rgba_vals_cache.clear()
 # redefine common functions
 def b280():
     return bpy.app.version >= (2,80,0)
@@ -40,6 +47,19 @@ frame_str = "_f_%(frame)s" % locals() if cm.use_animation else ""
 bpy_collections = bpy.data.groups if bpy.app.version < (2,80,0) else bpy.data.collections
 target_coll = bpy_collections.get("Bricker_%(n)s_bricks%(frame_str)s" % locals())
 parent_obj = bpy.data.objects.get("Bricker_%(n)s_parent%(frame_str)s" % locals())
+# send bricksdict columns and combined brick mesh geometry as shared arrays instead of through the python data and blend library files
+bfm_cache_records, bfm_cache_arrays = bpy.props.bfm_cache_arrays
+shared_arrays.update(bfm_cache_arrays)
+shared_meshes = []
+if not cm.split_model and hasattr(bpy.types.Mesh, "clear_geometry"):
+    get_mesh_arrays = importlib.import_module(addon_module + ".functions.mesh_assembly").get_mesh_arrays
+    for obj in target_coll.objects:
+        if obj.type != "MESH" or obj.data.name in shared_meshes:
+            continue
+        for key, arr in get_mesh_arrays(obj.data).items():
+            shared_arrays["mesh_%(i)s/%(key)s" % {"i": len(shared_meshes), "key": key}] = arr
+        shared_meshes.append(obj.data.name)
+        obj.data.clear_geometry()
 
 ### SET 'data_blocks' EQUAL TO LIST OF OBJECT DATA TO BE SEND BACK TO THE BLENDER HOST ###
 
@@ -51,7 +71,8 @@ data_blocks = [
 ### PYTHON DATA TO BE SEND BACK TO THE BLENDER HOST ###
 
 python_data = {
-    "bricksdict": bpy.props.bfm_cache_bytes_hex,
+    "bricksdict": bfm_cache_records,
+    "shared_meshes": shared_meshes,
     "brick_sizes_used": cm.brick_sizes_used,
     "brick_types_used": cm.brick_types_used,
     "rgba_vals": cm.rgba_vals,
@@ -15,17 +15,148 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-# initialize the brick bmesh cache dictionary
-bricker_mesh_cache = {}
+# System imports
+import sys
+from collections import OrderedDict
 
-# initialize the source mesh cache dictionary
-bricker_source_mesh_cache = {}
+# Blender imports
+# NONE!
+
+# Module imports
+# NONE!
+
+# estimated memory used by each bmesh element (in bytes)
+BMESH_VERT_BYTES = 96
+BMESH_EDGE_BYTES = 72
+BMESH_FACE_BYTES = 80
+BMESH_LOOP_BYTES = 64
+# default memory budget for each LRU cache (in bytes)
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024
+
+
+def estimate_size(value):
+    """ estimate memory used by cached value (in bytes) """
+    if value is None:
+        return 0
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    # bmesh or mesh data
+    if hasattr(value, "verts") or hasattr(value, "vertices"):
+        verts = value.verts if hasattr(value, "verts") else value.vertices
+        num_loops = sum(len(f.verts) for f in value.faces) if hasattr(value, "faces") else len(value.loops)
+        faces = value.faces if hasattr(value, "faces") else value.polygons
+        return len(verts) * BMESH_VERT_BYTES + len(value.edges) * BMESH_EDGE_BYTES + len(faces) * BMESH_FACE_BYTES + num_loops * BMESH_LOOP_BYTES
+    return sys.getsizeof(value)
+
+
+def free_bmeshes(value):
+    """ free bmesh data of evicted brick mesh cache entry """
+    for bm in value or []:
+        if hasattr(bm, "free"):
+            bm.free()
+
+
+class LRUCache(object):
+    """ dictionary-like cache that evicts least recently used entries once their estimated size exceeds 'max_bytes' """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, on_evict=None):
+        self.entries = OrderedDict()
+        self.sizes = dict()
+        self.max_bytes = max_bytes  # 0 for unlimited
+        self.num_bytes = 0
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            raise KeyError(key)
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        if key in self.entries:
+            self.num_bytes -= self.sizes[key]
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.sizes[key] = estimate_size(value)
+        self.num_bytes += self.sizes[key]
+        self.evict()
+
+    def get(self, key, default=None):
+        if key not in self.entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def pop(self, key, *default):
+        if key not in self.entries:
+            return self.entries.pop(key, *default)
+        self.num_bytes -= self.sizes.pop(key)
+        return self.entries.pop(key)
+
+    def keys(self):
+        return self.entries.keys()
+
+    def clear(self):
+        if self.on_evict is not None:
+            for value in self.entries.values():
+                self.on_evict(value)
+        self.entries.clear()
+        self.sizes.clear()
+        self.num_bytes = 0
+
+    def evict(self):
+        """ remove least recently used entries until cache fits in memory budget (always keeps the newest entry) """
+        while self.max_bytes > 0 and self.num_bytes > self.max_bytes and len(self.entries) > 1:
+            key, value = self.entries.popitem(last=False)
+            self.num_bytes -= self.sizes.pop(key)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(value)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+# initialize the brick bmesh cache
+bricker_mesh_cache = LRUCache(on_evict=free_bmeshes)
+
+# initialize the source mesh cache
+bricker_source_mesh_cache = LRUCache()
 
 # initialize the bfm_cache
 bricker_bfm_cache = {}
 
 # initialize the rgba_vals cache
-bricker_rgba_vals_cache = {}
+bricker_rgba_vals_cache = LRUCache()
+
+
+def set_cache_memory_limit(max_mb):
+    """ set memory budget of the LRU caches (evicting entries that no longer fit) """
+    for cache in (bricker_mesh_cache, bricker_source_mesh_cache, bricker_rgba_vals_cache):
+        cache.max_bytes = max_mb * 1024 * 1024
+        cache.evict()
+
+# initialize the source snapshot cache (used to update lattice regions affected by source edits)
+bricker_source_snapshot_cache = {}
+
+# initialize the BVH tree cache (used for ray casting against source objects)
+bricker_bvh_cache = {}
+
+# initialize the last frame cache (full bricksdict of the last animation frame brickified, for reuse by the next frame)
+bricker_last_frame_cache = {}
 
 # cache functions
 def cache_exists(cm):
@@ -64,10 +64,27 @@ class BRICKER_AP_preferences(AddonPreferences):
     max_workers = IntProperty(
         name="Max Worker Instances",
         description="Maximum number of Blender instances allowed to run in background for Bricker calculations (larger numbers are faster at a higher CPU load; 0 for local calculation)",
-        min=0, max=24,
+        min=0, max=64,
         update=update_job_manager_properties,
         default=5,
     )
+    adaptive_workers = BoolProperty(
+        name="Adaptive Worker Count",
+        description="Run fewer than the maximum number of worker instances when there aren't enough free CPU cores or memory (memory per instance is estimated from the model resolution)",
+        update=update_job_manager_properties,
+        default=True,
+    )
+    parallel_voxelization = BoolProperty(
+        name="Parallel Voxelization",
+        description="Split the lattice into slabs and voxelize them simultaneously in background Blender instances (blend file must be saved)",
+        default=False,
+    )
+    persistent_workers = BoolProperty(
+        name="Persistent Workers",
+        description="Keep background Blender instances running between jobs so animation frames don't each pay for Blender startup and addon registration (idle instances close after 5 minutes)",
+        update=update_persistent_workers,
+        default=False,
+    )
     # CUSTOMIZE SETTINGS
     show_legacy_customization_tools = BoolProperty(
         name="Show Legacy Brick Operations",
@@ -77,9 +94,36 @@ class BRICKER_AP_preferences(AddonPreferences):
     # Other
     show_debugging_tools = BoolProperty(
         name="Show Debugging Tools",
-        description="Show advanced tools for debugging issues with Bricker",
+        description="Show advanced tools for debugging issues with Bricker (and print debugging info, like bricksdict reuse between animation frames, to the console)",
         default=False,
     )
+    use_dense_bricksdict = BoolProperty(
+        name="Dense Bricksdict Storage",
+        description="Store new brick dictionaries in compact numpy arrays (uses much less memory for high resolution models)",
+        default=False,
+    )
+    use_sparse_voxels = BoolProperty(
+        name="Sparse Voxel Storage",
+        description="Store voxelized lattice values in chunks allocated only where they vary (uses much less memory for high resolution models with thin shells; smoke simulations always use dense storage)",
+        default=False,
+    )
+    cache_memory_limit = IntProperty(
+        name="Cache Memory Limit (MB)",
+        description="Maximum memory used by each of Bricker's in-memory caches (brick meshes, source meshes, colors) before least recently used entries are removed; 0 for unlimited",
+        min=0, max=65536,
+        update=update_cache_memory_limit,
+        default=1024,
+    )
+    bfm_cache_compression = EnumProperty(
+        name="Cache Compression",
+        description="Compression used when saving brick dictionaries to the blend file",
+        items=[
+            ("ZLIB", "Zlib", "Fast compression (recommended)"),
+            ("LZMA", "LZMA", "Smallest file size, but slower to save"),
+            ("NONE", "None", "Don't compress brick dictionaries (fastest, but largest file size)"),
+        ],
+        default="ZLIB",
+    )
     auto_refresh_model_info = BoolProperty(
         name="Auto Refresh Model Info",
         description="Refresh model info automatically each time the 'Brickify' process is run (may slow down Brickify process slightly)",
@@ -143,6 +187,9 @@ class BRICKER_AP_preferences(AddonPreferences):
         if self.brickify_in_background != "OFF":
             col = split.column(align=True)
             col.prop(self, "max_workers", text="Max Worker Instances")
+            col.prop(self, "adaptive_workers")
+            col.prop(self, "parallel_voxelization")
+            col.prop(self, "persistent_workers")
         col1.separator()
         col1.separator()
         row = col1.row(align=True)
@@ -150,5 +197,9 @@ class BRICKER_AP_preferences(AddonPreferences):
         col = row.column()
         # col.prop(self, "auto_refresh_model_info")
         col.prop(self, "show_legacy_customization_tools")
+        col.prop(self, "use_dense_bricksdict")
+        col.prop(self, "use_sparse_voxels")
+        col.prop(self, "bfm_cache_compression")
+        col.prop(self, "cache_memory_limit")
         col.prop(self, "show_debugging_tools")
         col1.separator()
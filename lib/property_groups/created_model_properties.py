@@ -97,6 +97,11 @@ class CreatedModelProperties(bpy.types.PropertyGroup):
         min=0, max=500000,
         default=1,
     )
+    temporal_coherence = BoolProperty(
+        name="Reuse Unchanged Regions",
+        description="Reuse the previous frame's bricks for lattice regions unaffected by changes to the source, and store only the changes between frames (falls back to a full frame if the source bounds change)",
+        default=True,
+    )
 
     # BASIC MODEL SETTINGS
     brick_height = FloatProperty(
@@ -416,6 +421,13 @@ class CreatedModelProperties(bpy.types.PropertyGroup):
         update=dirty_build,
         default=0,  # 1
     )
+    max_rgb_materials = IntProperty(
+        name="Max Materials",
+        description="Maximum number of materials created for the model (similar colors are merged until the limit is met; 0 for unlimited)",
+        min=0, soft_max=1000,
+        update=dirty_build,
+        default=0,
+    )
     color_snap_specular = FloatProperty(
         name="Specular",
         description="Specular value for the created materials",
@@ -712,6 +724,16 @@ class CreatedModelProperties(bpy.types.PropertyGroup):
         update=dirty_matrix,
         default="HIGH_EFFICIENCY",
     )
+    voxelize_method = EnumProperty(
+        name="Voxelization Method",
+        description="Method for calculating the brick shell and insideness of the lattice",
+        items=[
+            ("RAY_CAST", "Ray Cast", "Cast rays from each lattice location to calculate intersections with the source mesh"),
+            ("SCANLINE", "Scanline", "Intersect entire rows of the lattice with the source mesh at once (much faster for high resolution models)"),
+        ],
+        update=dirty_matrix,
+        default="RAY_CAST",
+    )
     brick_shell = EnumProperty(
         name="Brick Shell",
         description="Choose whether the outer shell of bricks will be inside or outside the source mesh",
@@ -758,6 +780,11 @@ class CreatedModelProperties(bpy.types.PropertyGroup):
         update=dirty_matrix,
         default=True,
     )
+    incremental_updates = BoolProperty(
+        name="Incremental Updates",
+        description="When updating the model, only recalculate regions of the lattice affected by edits to the source mesh (falls back to a full update if the source bounds have changed)",
+        default=True,
+    )
     use_local_orient = BoolProperty(
         name="Use Local Orient",
         description="Generate bricks based on local orientation of source object",
@@ -769,6 +796,7 @@ class CreatedModelProperties(bpy.types.PropertyGroup):
         items=[
             ("NONE", "None", "No object instancing"),
             ("LINK_DATA", "Link Data", "Link mesh data for like objects when 'Split Model' is enabled"),
+            ("INSTANCE_VARIANTS", "Instance Variants", "Instance one mesh per unique brick variant and material over point clouds when 'Split Model' is disabled (this method does not support customization; models with random brick rotation are drawn as a single mesh instead)"),
             ("POINT_CLOUD", "Point Cloud (experimental)", "Instance a single mesh over a point cloud (this method does not support multiple materials or brick merging)"),
         ],
         update=dirty_build,
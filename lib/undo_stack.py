@@ -22,8 +22,9 @@ import marshal
 import bpy
 
 # Module imports
-from .caches import bricker_bfm_cache
+from .caches import bricker_bfm_cache, bricker_source_snapshot_cache
 from ..functions.common.blender import get_preferences
+from ..functions.bricksdict.dense import bricksdict_to_dict, copy_bricksdict
 
 python_undo_state = {}
 
@@ -92,39 +93,79 @@ class UndoStack():
             "bfm_cache": bfm_cache,
         }
 
+    def _create_record(self, cm_id, keys=None):
+        """ record bricksdict for cm_id (only the entries at 'keys' if passed, where missing entries are stored as None) """
+        bricksdict = bricker_bfm_cache[cm_id]
+        if keys is None:
+            return {"keys": None, "data": marshal.dumps(bricksdict_to_dict(bricksdict))}
+        entries = {k: dict(bricksdict[k]) if k in bricksdict else None for k in keys}
+        return {"keys": list(keys), "data": marshal.dumps(entries)}
+
+    @staticmethod
+    def get_record_keys(state):
+        """ get affected ids and recorded keys of undo state (to record the inverse state) """
+        affected_ids = list(state["bfm_cache"].keys())
+        touched_keys = {cm_id: record["keys"] for cm_id, record in state["bfm_cache"].items() if record["keys"] is not None}
+        return affected_ids, touched_keys
+
+    @staticmethod
+    def load_bricksdict(record, bricksdict=None):
+        """ get new copy of the bricksdict stored by undo record ('bricksdict' with the recorded entries restored for key-level records) """
+        if record["keys"] is None:
+            return marshal.loads(record["data"])
+        bricksdict = copy_bricksdict(bricksdict)
+        apply_record_changes(bricksdict, marshal.loads(record["data"]))
+        return bricksdict
+
     def _restore_state(self, state, cm_id=None):
         global bricker_bfm_cache
         keys = [cm_id] if cm_id is not None else state["bfm_cache"].keys()
         for key in keys:
-            bricker_bfm_cache[key] = marshal.loads(state["bfm_cache"][key])
+            record = state["bfm_cache"][key]
+            if record["keys"] is None:
+                bricker_bfm_cache[key] = marshal.loads(record["data"])
+            elif key in bricker_bfm_cache:
+                apply_record_changes(bricker_bfm_cache[key], marshal.loads(record["data"]))
+            # restored bricksdict may no longer match the source snapshot
+            bricker_source_snapshot_cache.pop(key, None)
         return bricker_bfm_cache
 
-    def append_state(self, action, stackType, affected_ids="ALL"):
+    def append_state(self, action, stackType, affected_ids="ALL", touched_keys=None):
         global bricker_bfm_cache
         stack = getattr(self, stackType)
-        bfm_cached = stack[-1]["bfm_cache"] if len(stack) > 0 else {}
+        touched_keys = touched_keys or {}
         # perform append state in active Blender session
         new_bfm_cache = {}
         for cm_id in bricker_bfm_cache:
-            if affected_ids != "ALL" and cm_id not in affected_ids and cm_id in bfm_cached:
-                new_bfm_cache[cm_id] = bfm_cached[cm_id]
-            else:
-                new_bfm_cache[cm_id] = marshal.dumps(bricker_bfm_cache[cm_id])
+            if affected_ids == "ALL" or cm_id in affected_ids:
+                new_bfm_cache[cm_id] = self._create_record(cm_id, touched_keys.get(cm_id))
         stack.append(self._create_state(action, new_bfm_cache))
         return new_bfm_cache
 
+    def get_memory_usage(self, stackType="undo"):
+        """ get number of bytes used by records of states in stack """
+        return sum(len(record["data"]) for state in getattr(self, stackType) for record in state["bfm_cache"].values())
+
     def revert_to_last_state(self, cm_id):
         bricker_bfm_cache = self._restore_state(self.undo[-1])
         return bricker_bfm_cache[cm_id]
 
-    def undo_push(self, action, affected_ids="ALL", repeatable=False):
+    def undo_push(self, action, affected_ids="ALL", repeatable=False, touched_keys=None):
+        """ push state of affected bricksdicts to undo stack
+
+        Keyword arguments:
+        action       -- name of action pushed to the undo stack
+        affected_ids -- cm_ids of models the action will modify (or "ALL")
+        repeatable   -- skip pushing state if last action pushed was the same action
+        touched_keys -- dict of bricksdict keys the action will modify for each cm_id (full bricksdicts are recorded for cm_ids not in this dict)
+        """
         # skip pushing to undo if action is repeatable and we are repeating actions
         if repeatable and self.undo and self.undo[-1]["action"] == action:
             return
         # skip pushing to undo if bricker not initialized
         if not bpy.props.bricker_initialized:
             return
-        new_bfm_cache = self.append_state(action, "undo", affected_ids=affected_ids)
+        new_bfm_cache = self.append_state(action, "undo", affected_ids=affected_ids, touched_keys=touched_keys)
         while len(self.undo) > self.undo_depth:
             self.undo.pop(0)  # limit stack size
         self.redo.clear()
@@ -134,8 +175,9 @@ class UndoStack():
     def undo_pop(self):
         if not self.undo:
             return
-        self.append_state("undo", "redo")
-        self._restore_state(self.undo.pop())
+        state = self.undo.pop()
+        self.append_state("undo", "redo", *self.get_record_keys(state))
+        self._restore_state(state)
         self.instrument_write("undo")
         # iterate undo states
         global python_undo_state
@@ -155,8 +197,9 @@ class UndoStack():
     def redo_pop(self):
         if not self.redo:
             return
-        self.append_state("redo", "undo")
-        self._restore_state(self.redo.pop())
+        state = self.redo.pop()
+        self.append_state("redo", "undo", *self.get_record_keys(state))
+        self._restore_state(state)
         self.instrument_write("redo")
         # iterate undo states
         global python_undo_state
@@ -180,3 +223,12 @@ class UndoStack():
         tb.write("")        # position cursor to end
         tb.write(data_str)
         tb.write("\n")
+
+
+def apply_record_changes(bricksdict, changes):
+    """ apply recorded entries from undo record to bricksdict in place (entries set to None are removed) """
+    for k, brick_d in changes.items():
+        if brick_d is None:
+            bricksdict.pop(k, None)
+        else:
+            bricksdict[k] = brick_d
@@ -0,0 +1,68 @@
+# NOTE: Requires 'addon_module', 'source_filename', 'source_name', 'cmlist_props', 'lattice_args', 'region', 'padded_region', and 'axes' as variables
+import importlib
+import numpy as np
+from mathutils import Vector
+# import voxelization functions from the Bricker addon
+generate_lattice = importlib.import_module(addon_module + ".functions.bricksdict.generate_lattice").generate_lattice
+get_brick_matrix = importlib.import_module(addon_module + ".functions.bricksdict.generate").get_brick_matrix
+# redefine common functions
+def b280():
+    return bpy.app.version >= (2,80,0)
+def link_object(o, scene=None):
+    scene = scene or bpy.context.scene
+    if b280():
+        scene.collection.objects.link(o)
+    else:
+        scene.objects.link(o)
+# create and populate new cmlist index
+scn = bpy.context.scene
+bpy.ops.cmlist.list_action(action="ADD")
+scn.cmlist_index = 0
+cm = scn.cmlist[scn.cmlist_index]
+for item in cmlist_props:
+    setattr(cm, item, cmlist_props[item])
+# load source mesh (written once to the temp directory and shared by all slabs of the lattice)
+source_path = os.path.join(os.path.dirname(target_path_base), source_filename)
+with bpy.data.libraries.load(source_path) as (data_from, data_to):
+    data_to.objects = [source_name]
+source = data_to.objects[0]
+link_object(source)
+if b280():
+    bpy.context.view_layer.update()
+else:
+    scn.update()
+# voxelize slab of lattice with one extra location on each side (for shell calculations along slab boundaries)
+brick_scale, l_scale, offset = (Vector(vec) for vec in lattice_args)
+lattice = generate_lattice(brick_scale, l_scale, offset, extra_res=1, region=padded_region)
+nx, ny, nz = lattice.shape
+face_idx_matrix = [[[0 for z in range(nz)] for y in range(ny)] for x in range(nx)]
+brick_freq_matrix = get_brick_matrix(source, face_idx_matrix, lattice, cm.brick_shell, axes=axes, print_status=False, adjust=False)
+# crop results to slab
+(x0, y0, z0), (x1, y1, z1) = region
+(px, py, pz), _ = padded_region
+face_locs, face_idxs, face_dists, face_points, face_normals = [], [], [], [], []
+for x in range(x0, x1):
+    for y in range(y0, y1):
+        for z in range(z0, z1):
+            face_d = face_idx_matrix[x - px][y - py][z - pz]
+            if type(face_d) == dict:
+                face_locs.append((x, y, z))
+                face_idxs.append(face_d["idx"])
+                face_dists.append(face_d["dist"])
+                face_points.append(tuple(face_d["loc"]))
+                face_normals.append(tuple(face_d["normal"]))
+
+### SET 'data_blocks' EQUAL TO LIST OF OBJECT DATA TO BE SEND BACK TO THE BLENDER HOST ###
+
+data_blocks = []
+
+### NUMPY ARRAYS TO BE SEND BACK TO THE BLENDER HOST (memory-mapped by the host instead of passed through the python data) ###
+
+shared_arrays.update({
+    "brick_freq_matrix": np.asarray(brick_freq_matrix[x0 - px:x1 - px, y0 - py:y1 - py, z0 - pz:z1 - pz], dtype=np.int8),
+    "face_locs": np.array(face_locs, dtype=np.int32).reshape(-1, 3),
+    "face_idxs": np.array(face_idxs, dtype=np.int64),
+    "face_dists": np.array(face_dists, dtype=np.float64),
+    "face_points": np.array(face_points, dtype=np.float64).reshape(-1, 3),
+    "face_normals": np.array(face_normals, dtype=np.float64).reshape(-1, 3),
+})
@@ -21,7 +21,6 @@ import sys
 import math
 import shutil
 import json
-import marshal
 
 # Blender imports
 import bpy
@@ -78,7 +77,12 @@ class BRICKER_OT_brickify(bpy.types.Operator):
                         if anim_action: self.report({"INFO"}, "Completed frame %(frame)s of model '%(n)s'" % locals())
                         # cache bricksdict
                         retrieved_data = self.job_manager.get_retrieved_python_data(job)
-                        bricksdict = None if retrieved_data["bricksdict"] in ("", "null") else marshal.loads(bytes.fromhex(retrieved_data["bricksdict"]))
+                        shared_arrays = self.job_manager.get_retrieved_shared_arrays(job)
+                        bricksdict = unpack_bfm_cache_arrays(retrieved_data["bricksdict"], shared_arrays)
+                        # fill combined brick meshes with geometry sent as shared arrays
+                        for i, mesh_name in enumerate(retrieved_data["shared_meshes"]):
+                            prefix = "mesh_%(i)s/" % locals()
+                            set_mesh_arrays(bpy.data.meshes[mesh_name], {key[len(prefix):]: arr for key, arr in shared_arrays.items() if key.startswith(prefix)})
                         cm.brick_sizes_used = retrieved_data["brick_sizes_used"]
                         cm.brick_types_used = retrieved_data["brick_types_used"]
                         cm.rgba_vals = retrieved_data["rgba_vals"]
@@ -238,6 +242,7 @@ class BRICKER_OT_brickify(bpy.types.Operator):
             wm.event_timer_remove(self._timer)
         cm.brickifying_in_background = False
         stopwatch("Total Time Elapsed", self.start_time, precision=2)
+        self.job_manager.report_job_timing()
 
         # refresh model info
         prefs = get_addon_preferences()
@@ -265,6 +270,8 @@ class BRICKER_OT_brickify(bpy.types.Operator):
         prefs = get_addon_preferences()
         self.job_manager.max_workers = prefs.max_workers
         self.job_manager.max_attempts = 1
+        self.job_manager.adaptive_workers = prefs.adaptive_workers
+        self.job_manager.use_worker_pool = prefs.persistent_workers
         self.debug_level = 1 if "ANIM" in self.action else 1 # or bpy.props.bricker_developer_mode == 0 else 1
         self.completed_frames = []
         self.bricker_addon_path = get_addon_directory()
@@ -281,6 +288,7 @@ class BRICKER_OT_brickify(bpy.types.Operator):
             if self.action.startswith("UPDATE"):
                 unlink_object(self.source)
             self.brickify_in_background = should_brickify_in_background(cm, r, self.action)
+            self.job_manager.job_memory = get_background_job_memory(r)
 
     ###################################################
     # class variables
@@ -397,6 +405,15 @@ class BRICKER_OT_brickify(bpy.types.Operator):
             if self.orig_frame != cm.model_created_on_frame:
                 scn.frame_set(cm.model_created_on_frame)
 
+        # redraw lattice regions affected by edits to the source mesh
+        if self.action == "UPDATE_MODEL" and cm.incremental_updates and not matrix_dirty and not cm.is_smoke:
+            bricksdict = get_bricksdict(cm)
+            if bricksdict is not None and update_edited_regions(cm, self.source, bricksdict) is None:
+                # edits can't be applied to the existing lattice, so regenerate the full bricksdict
+                clear_cache(cm, brick_mesh=False, rgba_vals=False, images=False, dupes=False)
+                cm.matrix_is_dirty = True
+                matrix_dirty = True
+
         # if there are no changes to apply, simply return "FINISHED"
         if self.action == "UPDATE_MODEL" and not update_can_run("MODEL"):
             return{"FINISHED"}
@@ -446,7 +463,7 @@ class BRICKER_OT_brickify(bpy.types.Operator):
             if cm.id in bricker_bfm_cache.keys() and cm.customized:
                 light_to_deep_cache(bricker_bfm_cache, [cm.id])
             script, cmlist_props, cmlist_pointer_props, data_blocks_to_send = get_args_for_background_processor(cm, self.bricker_addon_path, source_dup, skip_bfm_cache=not cm.customized)
-            job_added, msg = self.job_manager.add_job(cur_job, script=script, passed_data={"frame":None, "cmlist_id":cm.id, "cmlist_props":cmlist_props, "cmlist_pointer_props":cmlist_pointer_props, "action":self.action}, passed_data_blocks=data_blocks_to_send, use_blend_file=False)
+            job_added, msg = self.job_manager.add_job(cur_job, script=script, passed_data={"frame":None, "cmlist_id":cm.id, "cmlist_props":cmlist_props, "cmlist_pointer_props":cmlist_pointer_props, "action":self.action, "addon_module":basename(self.bricker_addon_path)}, passed_data_blocks=data_blocks_to_send, use_blend_file=False)
             if not job_added: raise Exception(msg)
             self.jobs.append(cur_job)
             # replace stored parents to source object
@@ -542,7 +559,7 @@ class BRICKER_OT_brickify(bpy.types.Operator):
                     self.source.stored_parents.clear()
                 # send job to the background processor
                 script, cmlist_props, cmlist_pointer_props, data_blocks_to_send = get_args_for_background_processor(cm, self.bricker_addon_path, duplicates[cur_frame], skip_bfm_cache=True)
-                job_added, msg = self.job_manager.add_job(cur_job, script=script, passed_data={"frame":cur_frame, "cmlist_id":cm.id, "cmlist_props":cmlist_props, "cmlist_pointer_props":cmlist_pointer_props, "action":self.action}, passed_data_blocks=data_blocks_to_send, use_blend_file=False)
+                job_added, msg = self.job_manager.add_job(cur_job, script=script, passed_data={"frame":cur_frame, "cmlist_id":cm.id, "cmlist_props":cmlist_props, "cmlist_pointer_props":cmlist_pointer_props, "action":self.action, "addon_module":basename(self.bricker_addon_path)}, passed_data_blocks=data_blocks_to_send, use_blend_file=False, priority=1 if cur_frame == scn.frame_current else 0)
                 if not job_added: raise Exception(msg)
                 self.jobs.append(cur_job)
                 overwrite_blend = False
@@ -559,6 +576,9 @@ class BRICKER_OT_brickify(bpy.types.Operator):
         if scn.frame_current != self.orig_frame:
             scn.frame_set(self.orig_frame)
 
+        # release bricksdict kept for reuse by the next frame
+        bricker_last_frame_cache.pop(cm.id, None)
+
         # unlink source duplicates
         for obj in duplicates.values():
             unlink_object(obj)
@@ -607,9 +627,14 @@ class BRICKER_OT_brickify(bpy.types.Operator):
             parent.use_fake_user = True
             parent.update_tag()  # TODO: is it necessary to update this?
 
+        # reuse previous frame's bricksdict for lattice regions unaffected by changes to the source
+        bricksdict = None
+        if cm.temporal_coherence and not in_background:
+            bricksdict = get_temporally_coherent_bricksdict(cm, source_dup, source_details, cur_frame, action)
+
         # create new bricks
         try:
-            coll_name, _ = create_new_bricks(source_dup, parent, source_details, dimensions, action, split=cm.split_model, cur_frame=cur_frame, clear_existing_collection=False, orig_source=cm.source_obj, select_created=False)
+            coll_name, _ = create_new_bricks(source_dup, parent, source_details, dimensions, action, split=cm.split_model, cur_frame=cur_frame, bricksdict=bricksdict, clear_existing_collection=False, orig_source=cm.source_obj, select_created=False)
         except KeyboardInterrupt:
             if cur_frame != cm.start_frame:
                 wm.progress_end()
@@ -19,7 +19,6 @@ import os
 import sys
 import math
 import json
-import marshal
 
 # Blender imports
 import bpy
@@ -57,8 +56,8 @@ class BRICKER_OT_brickify_in_background(bpy.types.Operator):
             BRICKER_OT_brickify.brickify_current_frame(self.frame, self.action, in_background=True)
         else:
             BRICKER_OT_brickify.brickify_active_frame(self.action)
-        # save last cache to prop temporarily
-        bpy.props.bfm_cache_bytes_hex = marshal.dumps(bricker_bfm_cache[cm.id]).hex()
+        # save last cache to prop temporarily (as record headers and numpy arrays to be shared with the host)
+        bpy.props.bfm_cache_arrays = pack_bfm_cache_arrays(bricker_bfm_cache[cm.id])
         return {"FINISHED"}
 
     ################################################
@@ -18,6 +18,7 @@
 # System imports
 import time
 import os
+import marshal
 
 # Blender imports
 import bpy
@@ -68,3 +69,58 @@ class BRICKER_OT_clear_cache(bpy.types.Operator):
         self.undo_stack.undo_push('clear_cache')
 
     #############################################
+
+
+class BRICKER_OT_benchmark_bfm_cache(bpy.types.Operator):
+    """Compare size and speed of the bricksdict deep cache formats for all models (printed to the console)"""
+    bl_idname = "bricker.benchmark_bfm_cache"
+    bl_label = "Benchmark Cache Formats"
+    bl_options = {"REGISTER"}
+
+    ################################################
+    # Blender Operator methods
+
+    @classmethod
+    def poll(self, context):
+        if not bpy.props.bricker_initialized:
+            return False
+        return True
+
+    def execute(self, context):
+        try:
+            scn = context.scene
+            num_benchmarked = 0
+            for cm in scn.cmlist:
+                bfm_cache = bricker_bfm_cache.get(cm.id)
+                if bfm_cache is None and cm.bfm_cache not in ("", "null"):
+                    bfm_cache = loads_bfm_cache(cm.bfm_cache)
+                if bfm_cache is None:
+                    continue
+                print("[Bricker] Cache format benchmark for '%(name)s':" % {"name": cm.name})
+                self.benchmark_format("LEGACY", lambda: marshal.dumps(bricksdict_to_dict(bfm_cache)).hex(), lambda s: marshal.loads(bytes.fromhex(s)))
+                for codec in BFM_CACHE_CODECS:
+                    self.benchmark_format(codec, lambda: dumps_bfm_cache(bfm_cache, codec=codec), loads_bfm_cache)
+                num_benchmarked += 1
+            if num_benchmarked == 0:
+                self.report({"WARNING"}, "No cached models to benchmark")
+            else:
+                self.report({"INFO"}, "Benchmark results printed to the console")
+        except:
+            bricker_handle_exception()
+
+        return{"FINISHED"}
+
+    #############################################
+    # class methods
+
+    @staticmethod
+    def benchmark_format(name, dumps, loads):
+        ct = time.time()
+        cache_str = dumps()
+        encode_time = time.time() - ct
+        ct = time.time()
+        loads(cache_str)
+        decode_time = time.time() - ct
+        print("    {name:<7} {size:>12,} chars    encode {encode_time:.3f}s    decode {decode_time:.3f}s".format(name=name, size=len(cache_str), encode_time=encode_time, decode_time=decode_time))
+
+    #############################################
@@ -16,7 +16,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 # System imports
-import marshal
+# NONE!
 
 # Blender imports
 import bpy
@@ -69,7 +69,7 @@ class BRICKER_OT_change_brick_material(Operator):
                 cm = get_item_by_id(scn.cmlist, cm_id)
                 self.undo_stack.iterate_states(cm)
                 # initialize vars
-                bricksdict = marshal.loads(self.cached_bfm[cm_id])
+                bricksdict = self.undo_stack.load_bricksdict(self.cached_bfm[cm_id], self.bricksdicts[cm_id])
                 keys_to_update = set()
                 cm.customized = True
 
@@ -110,7 +110,8 @@ class BRICKER_OT_change_brick_material(Operator):
         self.mat_name = "NONE"
         # push to undo stack
         self.undo_stack = UndoStack.get_instance()
-        self.cached_bfm = self.undo_stack.undo_push("change material", list(self.obj_names_dict.keys()))
+        touched_keys = get_keys_around_selected_bricks(self.obj_names_dict, self.bricksdicts)
+        self.cached_bfm = self.undo_stack.undo_push("change material", list(self.obj_names_dict.keys()), touched_keys=touched_keys)
 
     ###################################################
     # class variables
@@ -145,7 +145,9 @@ class BRICKER_OT_change_brick_type(Operator):
         self.undo_stack.match_python_to_blender_state()
         # push to undo stack
         if self.orig_undo_stack_length == self.undo_stack.get_length():
-            self.undo_stack.undo_push("change_type", affected_ids=list(self.obj_names_dict.keys()))
+            # record locations above and below bricks (bricks may grow to 3 layers, changing exposure of bricks up to 3 layers above them)
+            touched_keys = get_keys_around_selected_bricks(self.obj_names_dict, self.bricksdicts, margin=(0, 0, 5))
+            self.undo_stack.undo_push("change_type", affected_ids=list(self.obj_names_dict.keys()), touched_keys=touched_keys)
         scn = context.scene
         legal_brick_sizes = bpy.props.bricker_legal_brick_sizes
         # get original active and selected objects
@@ -65,7 +65,9 @@ class BRICKER_OT_draw_adjacent(Operator):
             self.undo_stack.match_python_to_blender_state()
             # push to undo stack
             if self.orig_undo_stack_length == self.undo_stack.get_length():
-                self.undo_stack.undo_push("draw_adjacent", affected_ids=[cm.id])
+                # record adjacent locations and the locations of bricks above and below them (exposure of those bricks may change)
+                touched_keys = {cm.id: get_keys_around_bricks(self.bricksdict, [context.active_object.name], cm.zstep, margin=(1, 1, 4))}
+                self.undo_stack.undo_push("draw_adjacent", affected_ids=[cm.id], touched_keys=touched_keys)
             if not b280(): scn.update()
             self.undo_stack.iterate_states(cm)
             # get fresh copy of self.bricksdict
@@ -107,7 +107,8 @@ class BRICKER_OT_merge_bricks(Operator):
         self.bricksdicts = get_bricksdicts_from_objs(self.obj_names_dict.keys())
         # push to undo stack
         self.undo_stack = UndoStack.get_instance()
-        self.undo_stack.undo_push("merge", list(self.obj_names_dict.keys()))
+        touched_keys = get_keys_around_selected_bricks(self.obj_names_dict, self.bricksdicts)
+        self.undo_stack.undo_push("merge", list(self.obj_names_dict.keys()), touched_keys=touched_keys)
         # set merge_inconsistent_mats
         self.merge_inconsistent_mats = bpy.props.bricker_last_selected == [obj.name for obj in selected_objects]
 
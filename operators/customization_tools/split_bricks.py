@@ -16,7 +16,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 # System imports
-import marshal
+# NONE!
 
 # Blender imports
 import bpy
@@ -123,7 +123,8 @@ class BRICKER_OT_split_bricks(Operator):
             self.undo_stack.match_python_to_blender_state()
             # push to undo stack
             if self.orig_undo_stack_length == self.undo_stack.get_length():
-                self.cached_bfm = self.undo_stack.undo_push("split", affected_ids=list(self.obj_names_dict.keys()))
+                touched_keys = get_keys_around_selected_bricks(self.obj_names_dict, self.bricksdicts)
+                self.cached_bfm = self.undo_stack.undo_push("split", affected_ids=list(self.obj_names_dict.keys()), touched_keys=touched_keys)
             # initialize vars
             scn = context.scene
             objs_to_select = []
@@ -131,7 +132,7 @@ class BRICKER_OT_split_bricks(Operator):
             for cm_id in self.obj_names_dict.keys():
                 cm = get_item_by_id(scn.cmlist, cm_id)
                 self.undo_stack.iterate_states(cm)
-                bricksdict = marshal.loads(self.cached_bfm[cm_id]) if deep_copy_matrix else self.bricksdicts[cm_id]
+                bricksdict = self.undo_stack.load_bricksdict(self.cached_bfm[cm_id], self.bricksdicts[cm_id]) if deep_copy_matrix else self.bricksdicts[cm_id]
                 keys_to_update = set()
                 cm.customized = True
 
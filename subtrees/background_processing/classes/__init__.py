@@ -18,3 +18,5 @@
 from .add_job import *
 from .job_manager import *
 from .kill_job import *
+from .progress_server import *
+from .worker_pool import *
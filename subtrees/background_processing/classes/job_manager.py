@@ -24,6 +24,8 @@ import json
 import sys
 import platform
 import shlex
+import glob
+import numpy as np
 
 # Blender imports
 import bpy
@@ -31,6 +33,8 @@ from bpy.types import Operator
 from bpy.props import *
 
 # Module imports
+from .progress_server import *
+from .worker_pool import *
 from ..functions import *
 
 
@@ -51,9 +55,11 @@ class JobManager():
         self.job_statuses = dict()
         self.job_paths = dict()
         self.job_timeouts = dict()
+        self.job_priorities = dict()
         self.retrieved_data = dict()
         self.stop_now = False
         self.blendfile_paths = dict()
+        self.job_memory = 0  # estimated memory used by each job (in bytes) in addition to 'base_job_memory'
         # create '/tmp/background_processing/' path if necessary
         if not os.path.exists(self.temp_path):
             os.makedirs(self.temp_path)
@@ -64,6 +70,10 @@ class JobManager():
     instance = dict()
     max_workers = 5  # maximum number of blender instances to run at once
     max_attempts = 1  # maximum number of times the background processor will attempt to run a job if error occurs
+    adaptive_workers = False  # limit number of running jobs by available cores and memory (never exceeds 'max_workers')
+    base_job_memory = 400 * 1024 * 1024  # estimated memory used by a background Blender instance without any job data (in bytes)
+    startup_grace_period = 10  # seconds before a newly started job is assumed to have allocated its memory
+    use_worker_pool = False  # run jobs in resident Blender instances from the shared WorkerPool (except jobs that use the blend file)
 
     #############################################
     # class methods
@@ -74,7 +84,7 @@ class JobManager():
             JobManager.instance[index] = JobManager()
         return JobManager.instance[index]
 
-    def add_job(self, job:str, script:str, timeout:float=0, passed_data:dict={}, passed_data_blocks:set=set(), use_blend_file:bool=False, overwrite_blend:bool=True):
+    def add_job(self, job:str, script:str, timeout:float=0, passed_data:dict={}, passed_data_blocks:set=set(), use_blend_file:bool=False, overwrite_blend:bool=True, priority:int=0):
         """
         Add a job to the job queue
 
@@ -86,6 +96,7 @@ class JobManager():
             passed_data_blocks -- pass blend data blocks to background scripts
             use_blend_file     -- run background script in a separate instance of the active blend file
             overwrite_blend    -- overwrite saved copy of the active blender file if running background script in instance of active blend file (does not overwrite active file itself)
+            priority           -- jobs with higher priority are started first (jobs with equal priority start in the order they were added)
 
         Returns:
             success       -- boolean if job successfully added to queue
@@ -106,7 +117,8 @@ class JobManager():
         self.passed_data[job] = passed_data
         self.uses_blend_file[job] = use_blend_file
         self.job_timeouts[job] = timeout
-        self.job_statuses[job] = {"started":False, "returncode":None, "stdout":None, "stderr":None, "start_time":time.time(), "end_time":None, "attempts":0, "progress":0.0, "timed_out":False}
+        self.job_priorities[job] = priority
+        self.job_statuses[job] = {"started":False, "returncode":None, "stdout":None, "stderr":None, "start_time":time.time(), "end_time":None, "attempts":0, "progress":0.0, "timed_out":False, "startup_time":None, "compute_time":None}
         # make image paths absolute
         old_filepaths = dict()
         for im in bpy.data.images:
@@ -130,14 +142,16 @@ class JobManager():
         # insert final blend file name to top of files
         target_path_base = os.path.join(self.temp_path, job)
         # clear old files if they exist
-        progress_file_path = target_path_base + "_progress.py"
+        ProgressServer.get_instance().clear_progress(job)
         blend_data_file_path = target_path_base + "_retrieved_data.blend"
         python_data_file_path = target_path_base + "_retrieved_data.py"
-        for f in (progress_file_path, blend_data_file_path, python_data_file_path):
+        timing_file_path = target_path_base + "_timing.py"
+        shared_arrays_manifest_path = target_path_base + "_shared_arrays.json"
+        for f in [blend_data_file_path, python_data_file_path, timing_file_path, shared_arrays_manifest_path] + glob.glob(target_path_base + "_shared_array_*.npy"):
             if os.path.isfile(f):
                 os.remove(f)
         # add storage path and additional passed data to lines in job file in READ mode
-        lines = add_lines(script, target_path_base, self.passed_data[job], sent_data_blocks_path)
+        lines = add_lines(script, target_path_base, self.passed_data[job], sent_data_blocks_path, ProgressServer.get_instance().get_address())
         # write text to job file in WRITE mode
         src=open(self.job_paths[job],"w")
         src.writelines(lines)
@@ -146,7 +160,15 @@ class JobManager():
 
     def start_job(self, job:str, debug_level:int=0):
         """ Start a job in the job queue """
-        # send job string to background blender instance with subprocess
+        self.job_statuses[job].update({"started":True, "returncode":None, "start_time":time.time(), "end_time":None, "progress":0.0, "timed_out":False})
+        self.job_statuses[job]["attempts"] += 1
+        self.retrieved_data[job] = {"retrieved_data_blocks":None, "retrieved_python_data":None, "retrieved_shared_arrays":None}
+        # send job to a resident background blender instance
+        if self.use_worker_pool and not self.uses_blend_file[job]:
+            self.job_processes[job] = WorkerPool.get_instance().submit(self.job_paths[job])
+            print("JOB STARTED:  ", job, "(worker pool)")
+            return
+        # send job string to new background blender instance with subprocess
         binary_path = bpy.app.binary_path
         blendfile_path = "'" + self.blendfile_paths[job] + "'" if self.uses_blend_file[job] else ""
         temp_job_path = self.job_paths[job]
@@ -155,18 +177,51 @@ class JobManager():
         if platform.system() not in ("Darwin", "Linux"):
             thread_func = shlex.split(thread_func)
         self.job_processes[job] = subprocess.Popen(thread_func, stdout=subprocess.PIPE if debug_level in (0, 2) and platform.system() in ("Darwin", "Linux") else None, stderr=subprocess.PIPE if debug_level < 2 and platform.system() in ("Darwin", "Linux") else None, shell=True)
-        self.job_statuses[job]["started"] = True
-        self.job_statuses[job]["start_time"] = time.time()
-        self.job_statuses[job]["attempts"] += 1
-        self.retrieved_data[job] = {"retrieved_data_blocks":None, "retrieved_python_data":None}
         print("JOB STARTED:  ", job)
 
+    def start_queued_jobs(self, debug_level:int=0):
+        """ Start queued jobs in order of priority while workers are available """
+        queued_jobs = sorted((job for job in self.jobs if self.job_queued(job)), key=lambda job: -self.job_priorities[job])
+        for job in queued_jobs:
+            if self.num_running_jobs() >= self.get_worker_limit():
+                break
+            self.start_job(job, debug_level=debug_level)
+
+    def get_worker_limit(self):
+        """ returns number of jobs this JobManager may run at once """
+        if not self.adaptive_workers:
+            return self.max_workers
+        # leave one core for the host Blender instance and share the rest with other JobManagers
+        num_other_jobs = sum(job_manager.num_running_jobs() for job_manager in JobManager.instance.values() if job_manager is not self)
+        limit = min(self.max_workers, (os.cpu_count() or 1) - 1 - num_other_jobs)
+        available_memory = get_available_memory()
+        if available_memory is not None:
+            # jobs that just started haven't allocated their memory yet
+            job_memory = self.base_job_memory + self.job_memory
+            num_starting_jobs = len([job for job in self.job_processes if time.time() - self.job_statuses[job]["start_time"] < self.startup_grace_period])
+            limit = min(limit, self.num_running_jobs() + int((available_memory * 0.8 - num_starting_jobs * job_memory) // job_memory))
+        # always allow one job to run so the queue can't stall
+        return max(min(1, self.max_workers), limit)
+
+    def set_job_priority(self, job:str, priority:int):
+        self.job_priorities[job] = priority
+
+    def requeue_job(self, job:str):
+        """ Stop job if running and move it back to the job queue """
+        status = self.job_statuses[job]
+        if job in self.job_processes:
+            self.kill_job(job)
+            self.job_processes.pop(job)
+            # don't count attempt that was interrupted
+            status["attempts"] -= 1
+        status.update({"started":False, "returncode":None, "end_time":None, "progress":0.0, "timed_out":False})
+        ProgressServer.get_instance().clear_progress(job)
+
     def process_job(self, job:str, debug_level:int=0, overwrite_data=False):
-        # check if job has been started
-        if not self.job_started(job) or (self.job_statuses[job]["returncode"] not in (None, 0) and self.job_statuses[job]["attempts"] < self.max_attempts):
-            # start job if background worker available
-            if len(self.job_processes) < self.max_workers:
-                self.start_job(job, debug_level=debug_level)
+        # check if job is waiting to be started
+        if self.job_queued(job):
+            # start queued jobs (highest priority first) if background workers available
+            self.start_queued_jobs(debug_level=debug_level)
             return
         job_status = self.job_statuses[job]
         # check if job already processed
@@ -193,28 +248,38 @@ class JobManager():
             # if job was successful, retrieve any saved blend data
             if job_status["returncode"] == 0:
                 try:
+                    self.retrieve_timing(job)
                     self.retrieve_data(job, overwrite_data)
                 except FileNotFoundError as e:
                     job_status["returncode"] = -42
                     job_status["stderr"] = ["EXCEPTION (<class 'FileNotFoundError'>): No data file found by 'retrieve_data()' function", "", str(e)]
             # print status of job
-            print("JOB CANCELLED:" if job_status["returncode"] != 0 else "JOB ENDED:    ", job, " (returncode:" + str(job_status["returncode"]) + ")" if job_status["returncode"] != 0 else "(time elapsed:" + get_elapsed_time(job_status["start_time"], job_status["end_time"]) + ")")
+            print("JOB CANCELLED:" if job_status["returncode"] != 0 else "JOB ENDED:    ", job, " (returncode:" + str(job_status["returncode"]) + ")" if job_status["returncode"] != 0 else "(time elapsed:" + get_elapsed_time(job_status["start_time"], job_status["end_time"]) + ", startup: %(startup_time)ss, compute: %(compute_time)ss)" % self.get_job_timing(job))
 
     def process_jobs(self):
+        self.start_queued_jobs()
         for job in self.jobs:
             if self.jobs_complete():
                 break
             self.process_job(job)
 
     def update_job_progress(self, job:str):
-        progress_file_path = os.path.join(self.temp_path, "%(job)s_progress.py" % locals())
-        if not os.path.exists(progress_file_path): return
-        progress_file = open(progress_file_path, "r")
-        progress = progress_file.readline()
-        progress_file.close()
-        if progress == "": return
+        progress_server = ProgressServer.get_instance()
+        progress_server.update()
+        progress = progress_server.get_progress(job)
+        if progress is None: return
         self.job_statuses[job]["progress"] = float(progress)
 
+    def retrieve_timing(self, job:str):
+        """ split elapsed time of completed job into startup overhead (before the job script ran) and compute time """
+        timing_file_path = os.path.join(self.temp_path, "%(job)s_timing.py" % locals())
+        timing_file = open(timing_file_path, "r")
+        script_start_time, script_end_time = (float(t) for t in timing_file.readline().split())
+        timing_file.close()
+        job_status = self.job_statuses[job]
+        job_status["startup_time"] = max(0, script_start_time - job_status["start_time"])
+        job_status["compute_time"] = script_end_time - script_start_time
+
     def retrieve_data(self, job:str, overwrite_data:bool=False):
         # retrieve python data stored to temp directory
         data_file_path = os.path.join(self.temp_path, "%(job)s_retrieved_data.py" % locals())
@@ -222,6 +287,11 @@ class JobManager():
         dumped_dict = data_file.readline()
         data_file.close()
         self.retrieved_data[job]["retrieved_python_data"] = marshal.loads(bytes.fromhex(dumped_dict)) if dumped_dict != "" else {}
+        # map numpy arrays stored to temp directory (read-only, without copying them into memory)
+        manifest_file = open(os.path.join(self.temp_path, "%(job)s_shared_arrays.json" % locals()), "r")
+        shared_array_paths = json.load(manifest_file)
+        manifest_file.close()
+        self.retrieved_data[job]["retrieved_shared_arrays"] = {name: np.load(path, mmap_mode="r") for name, path in shared_array_paths.items()}
         # retrieve blend data stored to temp directory
         full_blend_path = os.path.join(self.temp_path, "%(job)s_retrieved_data.blend" % locals())
         orig_data_names = lambda: None
@@ -290,9 +360,28 @@ class JobManager():
     def get_retrieved_python_data(self, job:str):
         return self.retrieved_data[job]["retrieved_python_data"]
 
+    def get_retrieved_shared_arrays(self, job:str):
+        """ returns dict of read-only memory-mapped numpy arrays set in the job script's 'shared_arrays' variable """
+        return self.retrieved_data[job]["retrieved_shared_arrays"]
+
     def get_retrieved_data_blocks(self, job:str):
         return self.retrieved_data[job]["retrieved_data_blocks"]
 
+    def get_job_timing(self, job:str):
+        """ returns startup overhead and compute time (in seconds) of completed job """
+        job_status = self.job_statuses[job]
+        return {"startup_time": round(job_status["startup_time"], 2), "compute_time": round(job_status["compute_time"], 2)}
+
+    def report_job_timing(self):
+        """ print average startup overhead and compute time of completed jobs (for sizing the number of workers) """
+        timings = [self.get_job_timing(job) for job in self.get_completed_job_names()]
+        if len(timings) == 0:
+            return
+        avg_startup_time = round(sum(t["startup_time"] for t in timings) / len(timings), 2)
+        avg_compute_time = round(sum(t["compute_time"] for t in timings) / len(timings), 2)
+        num_jobs = len(timings)
+        print("Background jobs: %(num_jobs)s completed (average startup: %(avg_startup_time)ss, average compute: %(avg_compute_time)ss)" % locals())
+
     def get_issue_string(self, job:str):
         if not self.job_dropped(job): return ""
         if self.job_timed_out(job):
@@ -313,6 +402,11 @@ class JobManager():
     def job_started(self, job:str):
         return self.job_statuses[job]["started"]
 
+    def job_queued(self, job:str):
+        """ returns True if job is waiting to be started (or restarted after an error) """
+        job_status = self.job_statuses[job]
+        return job not in self.job_processes and (not job_status["started"] or (job_status["returncode"] not in (None, 0) and job_status["attempts"] < self.max_attempts))
+
     def job_complete(self, job:str):
         """ returns True if job was completed successfully (return code 0) """
         return self.job_statuses[job]["returncode"] == 0
@@ -337,7 +431,7 @@ class JobManager():
 
     def kill_job(self, job:str):
         p = self.job_processes[job]
-        if platform.system() == "Windows":
+        if platform.system() == "Windows" and not isinstance(p, PooledJob):
             # os.kill(p.pid, signal.CTRL_C_EVENT)
             subprocess.call(["taskkill", "/F", "/T", "/PID", str(self.job_processes[job].pid)])  # causes CPU issues
         else:
@@ -357,6 +451,9 @@ class JobManager():
             del self.job_processes[job]
         if job in self.job_statuses:
             del self.job_statuses[job]
+        if job in self.job_priorities:
+            del self.job_priorities[job]
+        ProgressServer.get_instance().clear_progress(job)
         if job in self.retrieved_data:
             del self.retrieved_data[job]
 
@@ -364,7 +461,7 @@ class JobManager():
         return self.max_workers - len(self.job_processes)
 
     def num_pending_jobs(self):
-        return len([status for status in self.job_statuses.values() if not status["started"]])
+        return len([job for job in self.jobs if self.job_queued(job)])
 
     def num_running_jobs(self):
         return len(self.job_processes)
@@ -0,0 +1,109 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import os
+import queue
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+# Blender imports
+# NONE!
+
+# Module imports
+# NONE!
+
+
+class ProgressServer():
+    """ Receives progress updates streamed by running job scripts over local socket connections """
+
+    ################################################
+    # initialization method
+
+    def __init__(self):
+        self.authkey = os.urandom(16)
+        self.listener = Listener(("localhost", 0), authkey=self.authkey)
+        self.new_connections = queue.Queue()
+        self.connections = list()
+        self.progress = dict()
+        # accept connections from job scripts without blocking the host Blender instance
+        accept_thread = threading.Thread(target=self.accept_connections, daemon=True)
+        accept_thread.start()
+
+    ###################################################
+    # class variables
+
+    instance = None
+
+    #############################################
+    # class methods
+
+    @staticmethod
+    def get_instance():
+        if ProgressServer.instance is None:
+            ProgressServer.instance = ProgressServer()
+        return ProgressServer.instance
+
+    @staticmethod
+    def shutdown():
+        """ close the progress server socket and all open job script connections """
+        server = ProgressServer.instance
+        if server is None:
+            return
+        while not server.new_connections.empty():
+            server.connections.append(server.new_connections.get())
+        for conn in server.connections:
+            conn.close()
+        server.listener.close()
+        ProgressServer.instance = None
+
+    def get_address(self):
+        """ returns port and hex authkey job scripts use to connect to the server """
+        return self.listener.address[1], self.authkey.hex()
+
+    def update(self):
+        """ read all progress updates received since the last update """
+        while not self.new_connections.empty():
+            self.connections.append(self.new_connections.get())
+        for conn in self.connections.copy():
+            try:
+                while conn.poll():
+                    job, percent_complete = conn.recv()
+                    self.progress[job] = percent_complete
+            except (EOFError, OSError):
+                # job script finished
+                conn.close()
+                self.connections.remove(conn)
+
+    def get_progress(self, job:str):
+        return self.progress.get(job)
+
+    def clear_progress(self, job:str):
+        self.progress.pop(job, None)
+
+    def accept_connections(self):
+        while True:
+            try:
+                self.new_connections.put(self.listener.accept())
+            except AuthenticationError:
+                continue
+            except OSError:
+                # listener was closed
+                break
+
+    ###################################################
@@ -0,0 +1,217 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import io
+import os
+import queue
+import subprocess
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+# Blender imports
+import bpy
+
+# Module imports
+# NONE!
+
+
+class PooledJob():
+    """ Handle for a job run by a WorkerPool (mimics the parts of 'subprocess.Popen' used by JobManager) """
+
+    def __init__(self, pool, job_path:str):
+        self.pool = pool
+        self.job_path = job_path
+        self.worker = None
+        self.returncode = None
+        self.stdout = None
+        self.stderr = None
+
+    @property
+    def pid(self):
+        return None if self.worker is None else self.worker["process"].pid
+
+    def poll(self):
+        self.pool.update()
+        return self.returncode
+
+    def kill(self):
+        self.pool.kill_job(self)
+
+    def finish(self, returncode:int, stdout:str, stderr:str):
+        self.worker = None
+        self.returncode = returncode
+        self.stdout = io.BytesIO(stdout.encode("ASCII", errors="replace"))
+        self.stderr = io.BytesIO(stderr.encode("ASCII", errors="replace"))
+
+
+class WorkerPool():
+    """ Pool of resident background Blender instances that run job scripts without restarting Blender for each job """
+
+    ################################################
+    # initialization method
+
+    def __init__(self):
+        self.authkey = os.urandom(16)
+        self.listener = Listener(("localhost", 0), authkey=self.authkey)
+        self.new_connections = queue.Queue()
+        self.workers = list()
+        self.pending_jobs = list()
+        self.num_workers_started = 0
+        # accept connections from new workers without blocking the host Blender instance
+        accept_thread = threading.Thread(target=self.accept_connections, daemon=True)
+        accept_thread.start()
+
+    ###################################################
+    # class variables
+
+    instance = None
+    idle_timeout = 300  # seconds an idle worker stays resident before shutting down
+    worker_script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "worker_loop.py")
+
+    #############################################
+    # class methods
+
+    @staticmethod
+    def get_instance():
+        if WorkerPool.instance is None:
+            WorkerPool.instance = WorkerPool()
+        return WorkerPool.instance
+
+    @staticmethod
+    def shutdown():
+        """ stop all resident workers (running jobs are killed) """
+        pool = WorkerPool.instance
+        if pool is None:
+            return
+        for job in pool.pending_jobs:
+            job.finish(-9, "", "")
+        for worker in pool.workers.copy():
+            pool.remove_worker(worker)
+        pool.listener.close()
+        WorkerPool.instance = None
+
+    def submit(self, job_path:str):
+        """ queue job script at 'job_path' to run in the next available worker """
+        job = PooledJob(self, job_path)
+        self.pending_jobs.append(job)
+        self.update()
+        return job
+
+    def update(self):
+        """ connect new workers, collect finished jobs, and hand pending jobs to idle workers """
+        # register connections from newly started workers
+        while not self.new_connections.empty():
+            conn = self.new_connections.get()
+            try:
+                worker_id = conn.recv()
+            except (EOFError, OSError):
+                continue
+            worker = next((w for w in self.workers if w["id"] == worker_id), None)
+            if worker is None:
+                conn.close()
+            else:
+                worker["conn"] = conn
+                worker["last_used"] = time.time()
+        for worker in self.workers.copy():
+            job = worker["job"]
+            # check for workers that exited (crashed, or failed to start)
+            if worker["process"].poll() is not None and (worker["conn"] is None or job is None or not worker["conn"].poll()):
+                self.remove_worker(worker)
+                if job is not None:
+                    job.finish(worker["process"].returncode or -1, "", "Background worker exited unexpectedly while running '%(path)s'" % {"path": job.job_path})
+                elif worker["conn"] is None and len(self.pending_jobs) > 0:
+                    self.pending_jobs.pop(0).finish(worker["process"].returncode or -1, "", "Background worker failed to start")
+                continue
+            # collect results of finished jobs
+            if job is not None and worker["conn"].poll():
+                try:
+                    returncode, stdout, stderr = worker["conn"].recv()
+                except (EOFError, OSError):
+                    self.remove_worker(worker)
+                    job.finish(-1, "", "Lost connection to background worker while running '%(path)s'" % {"path": job.job_path})
+                    continue
+                job.finish(returncode, stdout, stderr)
+                worker["job"] = None
+                worker["last_used"] = time.time()
+        # hand pending jobs to idle workers
+        for worker in self.workers:
+            if len(self.pending_jobs) == 0:
+                break
+            if worker["conn"] is not None and worker["job"] is None:
+                job = self.pending_jobs.pop(0)
+                job.worker = worker
+                worker["job"] = job
+                worker["conn"].send(job.job_path)
+        # start new workers for the remaining pending jobs
+        num_free_workers = len([w for w in self.workers if w["job"] is None])
+        for _ in range(len(self.pending_jobs) - num_free_workers):
+            self.start_worker()
+        # shut down workers that have been idle too long
+        for worker in self.workers.copy():
+            if worker["conn"] is not None and worker["job"] is None and time.time() - worker["last_used"] > self.idle_timeout:
+                self.remove_worker(worker)
+
+    def start_worker(self):
+        port = self.listener.address[1]
+        worker_id = self.num_workers_started
+        self.num_workers_started += 1
+        args = [bpy.app.binary_path, "-b", "-P", self.worker_script, "--", str(port), self.authkey.hex(), str(worker_id)]
+        process = subprocess.Popen(args, stdout=subprocess.DEVNULL)
+        self.workers.append({"id": worker_id, "process": process, "conn": None, "job": None, "last_used": time.time()})
+
+    def remove_worker(self, worker:dict):
+        self.workers.remove(worker)
+        if worker["conn"] is not None:
+            try:
+                # ask worker to exit cleanly
+                worker["conn"].send(None)
+            except OSError:
+                pass
+            worker["conn"].close()
+        if worker["process"].poll() is None and worker["job"] is not None:
+            worker["process"].kill()
+
+    def kill_job(self, job:PooledJob):
+        if job in self.pending_jobs:
+            self.pending_jobs.remove(job)
+        elif job.worker is not None:
+            # the worker is busy running the job, so it must be killed with it
+            worker = job.worker
+            self.remove_worker(worker)
+            worker["process"].kill()
+        job.finish(-9, "", "")
+
+    def accept_connections(self):
+        while True:
+            try:
+                self.new_connections.put(self.listener.accept())
+            except AuthenticationError:
+                continue
+            except OSError:
+                # listener was closed
+                break
+
+    def num_workers(self):
+        return len(self.workers)
+
+    def num_idle_workers(self):
+        return len([w for w in self.workers if w["conn"] is not None and w["job"] is None])
+
+    ###################################################
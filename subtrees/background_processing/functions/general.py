@@ -15,6 +15,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+# System imports
+import ctypes
+import os
+import platform
+import subprocess
+
 # Module imports
 from .common import *
 
@@ -24,18 +30,24 @@ lines_to_add_at_beginning = [
     "import bpy\n",
     "import marshal\n",
     "import os\n",
+    "from multiprocessing.connection import Client\n",
+    "import time\n",
+    "job_script_start_time = time.time()\n",
     # remove default objects & meshes
     "if bpy.data.filepath == '':\n",
     "    bpy.ops.wm.read_homefile(use_empty=True)\n",
     # initialize variables
     "data_blocks = list()\n",
     "python_data = list()\n",
+    "shared_arrays = dict()\n",
     # functions to be used in background_processing scripts
+    "progress_conn = None\n",
     "def update_job_progress(percent_complete):\n",
-    "    assert type(percent_complete) in (int, float)\n"
-    "    progress_file = open(target_path_base + '_progress.py', 'w')\n",
-    "    print(percent_complete, file=progress_file, end='')\n",
-    "    progress_file.close()\n",
+    "    global progress_conn\n",
+    "    assert type(percent_complete) in (int, float)\n",
+    "    if progress_conn is None:\n",
+    "        progress_conn = Client(('localhost', progress_port), authkey=bytes.fromhex(progress_authkey))\n",
+    "    progress_conn.send((os.path.basename(target_path_base), percent_complete))\n",
     # retrieve passed data blocks
     "passed_data_block_infos = []\n",
     "passed_data_blocks = []\n",
@@ -51,17 +63,33 @@ lines_to_add_at_beginning = [
 ]
 lines_to_add_at_end = [
     "\n\n### DO NOT EDIT BELOW THESE LINES\n",
+    "if progress_conn is not None:\n",
+    "    progress_conn.close()\n",
     "assert None not in data_blocks  # ensures that all data from data_blocks exists\n",
     # write Blender data blocks to library in temp location
     "bpy.data.libraries.write(target_path_base + '_retrieved_data.blend', set(data_blocks), fake_user=True)\n",
     # write python data to library in temp location
     "data_file = open(target_path_base + '_retrieved_data.py', 'w')\n",
     "print(marshal.dumps(python_data).hex(), file=data_file, end='')\n",
-    "data_file.close()\n"
+    "data_file.close()\n",
+    # write numpy arrays to files the Blender host can memory-map, along with a JSON manifest of their names and paths
+    "import json\n",
+    "import numpy\n",
+    "shared_array_paths = dict()\n",
+    "for i, (name, arr) in enumerate(shared_arrays.items()):\n",
+    "    shared_array_paths[name] = target_path_base + '_shared_array_' + str(i) + '.npy'\n",
+    "    numpy.save(shared_array_paths[name], numpy.ascontiguousarray(arr))\n",
+    "manifest_file = open(target_path_base + '_shared_arrays.json', 'w')\n",
+    "json.dump(shared_array_paths, manifest_file)\n",
+    "manifest_file.close()\n",
+    # write start and end time of job script to temp location
+    "timing_file = open(target_path_base + '_timing.py', 'w')\n",
+    "print(job_script_start_time, time.time(), file=timing_file, end='')\n",
+    "timing_file.close()\n",
 ]
 
 
-def add_lines(script, target_path_base, passed_data, sent_data_blocks_path):
+def add_lines(script, target_path_base, passed_data, sent_data_blocks_path, progress_address):
     # get paths
     source_blend_file = str(splitpath(bpy.data.filepath))
     target_path_base_split = str(splitpath(target_path_base))
@@ -74,6 +102,7 @@ def add_lines(script, target_path_base, passed_data, sent_data_blocks_path):
     oline.insert(0, "target_path_base = os.path.join(*%(target_path_base_split)s)\n" % locals())
     oline.insert(0, "source_blend_file = os.path.join(*%(source_blend_file)s)\n" % locals())
     oline.insert(0, "sent_data_blocks_path = os.path.join(*%(sent_data_blocks_path_split)s)\n" % locals())
+    oline.insert(0, "progress_port, progress_authkey = %(progress_address)s\n" % locals())
     oline.insert(0, "import os\n" % locals())
     for key in passed_data:
         value = passed_data[key]
@@ -85,6 +114,32 @@ def add_lines(script, target_path_base, passed_data, sent_data_blocks_path):
     return oline
 
 
+def get_available_memory():
+    """ get memory available to new processes in bytes (None if unknown) """
+    system = platform.system()
+    try:
+        if system == "Linux":
+            with open("/proc/meminfo", "r") as meminfo:
+                for line in meminfo:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+        elif system == "Darwin":
+            vm_stat = subprocess.check_output(["vm_stat"]).decode("ASCII").splitlines()
+            page_size = int(vm_stat[0].split("page size of")[1].split()[0])
+            pages = {line.split(":")[0]: int(line.split(":")[1].strip(" .")) for line in vm_stat[1:] if ":" in line}
+            return (pages.get("Pages free", 0) + pages.get("Pages inactive", 0) + pages.get("Pages speculative", 0)) * page_size
+        elif system == "Windows":
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong), ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong), ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong), ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong), ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+            return status.ullAvailPhys
+    except (OSError, ValueError, IndexError, subprocess.CalledProcessError):
+        pass
+    return None
+
+
 def get_elapsed_time(start_time, end_time, precision:int=2):
     """ from seconds to Days;Hours:Minutes;Seconds """
     value = end_time - start_time
@@ -0,0 +1,37 @@
+# NOTE: Run by resident background Blender instances with 'blender -b -P worker_loop.py -- <port> <authkey> <worker_id>'
+import bpy
+import contextlib
+import io
+import sys
+import traceback
+from multiprocessing.connection import Client
+
+# connect to the WorkerPool of the host Blender instance
+port, authkey, worker_id = sys.argv[sys.argv.index("--") + 1:][:3]
+conn = Client(("localhost", int(port)), authkey=bytes.fromhex(authkey))
+conn.send(int(worker_id))
+
+# run job scripts sent by the host until told to exit (addon modules and their caches stay loaded between jobs)
+while True:
+    try:
+        job_path = conn.recv()
+    except EOFError:
+        # host Blender instance was closed
+        break
+    if job_path is None:
+        break
+    stdout, stderr = io.StringIO(), io.StringIO()
+    returncode = 0
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            with open(job_path, "r") as f:
+                code = compile(f.read(), job_path, "exec")
+            # job scripts reset the blend data with 'read_homefile' since no blend file is open in the worker
+            exec(code, {"__name__": "__main__", "__file__": job_path})
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:
+            traceback.print_exc()
+            # matches '--python-exit-code' used for single-job background instances
+            returncode = 155
+    conn.send((returncode, stdout.getvalue(), stderr.getvalue()))
@@ -0,0 +1,68 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+from copy import deepcopy
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Module imports
+from ..functions.bricksdict.adjust import *
+
+
+def get_random_bfm(shape, seed=0, fill=0.5):
+    """ returns random unadjusted brick_freq_matrix and face_idx_matrix with an outside (0) boundary like generated lattices """
+    rng = np.random.RandomState(seed)
+    vals = rng.choice((-1, 1), size=shape, p=(fill, 1 - fill)) * (rng.random_sample(shape) < fill * 1.5)
+    vals[[0, -1], :, :] = 0
+    vals[:, [0, -1], :] = 0
+    vals[:, :, [0, -1]] = 0
+    brick_freq_matrix = vals.tolist()
+    face_idx_matrix = np.zeros(shape, dtype=int).tolist()
+    for x, y, z in np.argwhere(vals == 1).tolist():
+        face_idx_matrix[x][y][z] = {"idx": int(rng.randint(1000)), "dist": float(rng.random_sample())}
+    return brick_freq_matrix, face_idx_matrix
+
+
+def get_adjust_bfm_mismatches(brick_freq_matrix, mat_shell_depth, calc_internals, face_idx_matrix=None, axes="xyz"):
+    """ run 'adjust_bfm' and 'adjust_bfm_python' on copies of the input and return list of locations where the results differ """
+    bfm0, bfm1 = deepcopy(brick_freq_matrix), deepcopy(brick_freq_matrix)
+    # NOTE: nearest face entries are compared by identity, so the dicts are shared rather than copied
+    fim0 = [[list(row) for row in plane] for plane in face_idx_matrix] if face_idx_matrix else None
+    fim1 = [[list(row) for row in plane] for plane in face_idx_matrix] if face_idx_matrix else None
+    adjust_bfm(bfm0, mat_shell_depth, calc_internals, fim0, axes=axes)
+    adjust_bfm_python(bfm1, mat_shell_depth, calc_internals, fim1, axes=axes)
+    mismatches = []
+    for x in range(len(bfm0)):
+        for y in range(len(bfm0[0])):
+            for z in range(len(bfm0[0][0])):
+                if bfm0[x][y][z] != bfm1[x][y][z] or (fim0 and fim0[x][y][z] is not fim1[x][y][z]):
+                    mismatches.append((x, y, z))
+    return mismatches
+
+
+def test_adjust_bfm_matches_python_implementation():
+    for seed in range(20):
+        rng = np.random.RandomState(seed)
+        shape = tuple(rng.randint(3, 16, 3).tolist())
+        brick_freq_matrix, face_idx_matrix = get_random_bfm(shape, seed=seed, fill=rng.uniform(0.2, 0.95))
+        for calc_internals in (True, False):
+            for mat_shell_depth in (1, 3):
+                for axes in ("xyz", "xy", "z"):
+                    assert get_adjust_bfm_mismatches(brick_freq_matrix, mat_shell_depth, calc_internals, face_idx_matrix, axes=axes) == []
@@ -0,0 +1,122 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import random
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Module imports
+from ..functions.bricksdict.brick_graph import *
+from ..functions.bricksdict.connected_components import *
+from ..functions.bricksdict.generate import create_bricksdict_entry
+from ..functions.general import get_keys_in_brick, list_to_str
+
+
+def get_random_brick_model(shape, seed=0, fill=0.5, zstep=1):
+    """ returns random bricksdict of merged bricks (with some bricks not drawn) and the parent keys of its bricks """
+    rng = np.random.RandomState(seed)
+    bricksdict = dict()
+    parent_keys = []
+    heights = (1, 3) if zstep == 1 else (zstep,)
+    for z in range(shape[2]):
+        for x in range(shape[0]):
+            for y in range(shape[1]):
+                if list_to_str((x, y, z)) in bricksdict or rng.random_sample() > fill:
+                    continue
+                size = [int(rng.randint(1, 4)), int(rng.randint(1, 4)), int(rng.choice(heights))]
+                locs = [(x + x0, y + y0, z + z0) for x0 in range(size[0]) for y0 in range(size[1]) for z0 in range(size[2] // zstep)]
+                if any(loc0[0] >= shape[0] or loc0[1] >= shape[1] or loc0[2] >= shape[2] or list_to_str(loc0) in bricksdict for loc0 in locs):
+                    size = [1, 1, zstep]
+                    locs = [(x, y, z)]
+                parent_key = list_to_str((x, y, z))
+                draw = rng.random_sample() > 0.05
+                for loc0 in locs:
+                    k = list_to_str(loc0)
+                    bricksdict[k] = create_bricksdict_entry(name="Bricker_test__" + k, loc=list(loc0), val=1, draw=draw, parent=parent_key, b_type="BRICK" if size[2] == 3 else "PLATE")
+                bricksdict[parent_key]["parent"] = "self"
+                bricksdict[parent_key]["size"] = size
+                if draw:
+                    parent_keys.append(parent_key)
+    return bricksdict, parent_keys
+
+
+def get_weak_point_mismatches(bricksdict:dict, zstep:int, parent_keys):
+    """ compare connectivity from BrickGraph arrays with 'get_connected_components' and 'get_bridges' and return list of differences found """
+    mismatches = []
+    brick_graph = BrickGraph.from_bricksdict(bricksdict, zstep, parent_keys, expand_to_components=True)
+    # compare connected components containing 'parent_keys'
+    conn_comps = get_connected_components(bricksdict, zstep, parent_keys)
+    graph_conn_comps = brick_graph.to_conn_comps()
+    get_comp_set = lambda ccs: set(frozenset((k, frozenset(neighbors)) for k, neighbors in cc.items()) for cc in ccs)
+    if get_comp_set(conn_comps) != get_comp_set(graph_conn_comps):
+        mismatches.append("connected components (%(num0)s vs. %(num1)s)" % {"num0": len(conn_comps), "num1": len(graph_conn_comps)})
+    # compare weak points (bridges are searched from the same starting brick of each component, so weak points should be equal)
+    weak_points = get_bridges(graph_conn_comps)
+    graph_weak_points = set(brick_graph.keys[i] for i in np.flatnonzero(brick_graph.get_weak_points()).tolist())
+    for k in sorted(weak_points ^ graph_weak_points):
+        mismatches.append("weak point at %(k)s (%(found)s by 'get_bridges' only)" % {"k": k, "found": "found" if k in weak_points else "not found"})
+    return mismatches
+
+
+def test_brick_graph_matches_get_bridges():
+    for seed in range(20):
+        rng = np.random.RandomState(seed)
+        shape = tuple(rng.randint(2, 16, 3).tolist())
+        zstep = 1 if seed % 2 == 0 else 3
+        bricksdict, parent_keys = get_random_brick_model(shape, seed=seed, fill=rng.uniform(0.2, 0.9), zstep=zstep)
+        # check whole models and components found from a single starting brick
+        assert get_weak_point_mismatches(bricksdict, zstep, parent_keys) == []
+        assert get_weak_point_mismatches(bricksdict, zstep, parent_keys[:1]) == []
+
+
+def get_rooted_weak_points(conn_graph:ConnectivityGraph, component_id:int):
+    """ get weak points of component with 'get_bridges', searching from the block containing the component root """
+    conn_comp = conn_graph.components[component_id]
+    root = next(k for k in conn_comp if conn_graph.block_entries[conn_graph.block_ids[k]] is None)
+    ordered_conn_comp = {root: conn_comp[root]}
+    ordered_conn_comp.update(conn_comp)
+    return get_bridges([ordered_conn_comp])
+
+
+def check_against_full_recalculation(conn_graph:ConnectivityGraph, bricksdict:dict, zstep:int):
+    parent_keys = [k for k in bricksdict if bricksdict[k]["parent"] == "self" and bricksdict[k]["draw"]]
+    conn_comps = get_connected_components(bricksdict, zstep, parent_keys)
+    assert set(frozenset(cc) for cc in conn_graph.get_conn_comps()) == set(frozenset(cc) for cc in conn_comps)
+    for component_id in conn_graph.components:
+        assert conn_graph.weak_points[component_id] == get_rooted_weak_points(conn_graph, component_id)
+
+
+def test_updates_match_full_recalculation():
+    zstep = 1
+    for seed in range(4):
+        bricksdict, parent_keys = get_random_brick_model((8, 8, 6), seed=seed, fill=0.7, zstep=zstep)
+        conn_graph = ConnectivityGraph(bricksdict, zstep, parent_keys)
+        rng = random.Random(seed)
+        all_parent_keys = [k for k in bricksdict if bricksdict[k]["parent"] == "self"]
+        for _ in range(40):
+            # hide or show a few random bricks
+            keys = set()
+            for k in rng.sample(all_parent_keys, rng.randint(1, 3)):
+                draw = not bricksdict[k]["draw"]
+                for k0 in get_keys_in_brick(bricksdict, bricksdict[k]["size"], zstep, key=k):
+                    bricksdict[k0]["draw"] = draw
+                    keys.add(k0)
+            conn_graph.update_bricks(keys)
+            check_against_full_recalculation(conn_graph, bricksdict, zstep)
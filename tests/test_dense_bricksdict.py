@@ -0,0 +1,77 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import random
+
+# Blender imports
+# NONE!
+
+# Module imports
+from ..functions.bricksdict.dense import DenseBricksdict
+from ..functions.bricksdict.generate import create_bricksdict_entry
+from ..functions.general import list_to_str
+
+
+def get_bricksdicts(shape=(4, 3, 5), model_name="test", seed=0):
+    """ returns matching plain and dense bricksdicts with entries at random lattice locations (and one outside the lattice) """
+    rng = random.Random(seed)
+    plain_bricksdict = {}
+    dense_bricksdict = DenseBricksdict(shape, model_name=model_name)
+    locs = [(x, y, z) for x in range(shape[0]) for y in range(shape[1]) for z in range(shape[2]) if rng.random() < 0.7]
+    locs.append((-1, 0, shape[2]))
+    for loc in locs:
+        key = list_to_str(loc)
+        name = "Bricker_%(model_name)s__%(key)s" % locals()
+        plain_bricksdict[key] = create_bricksdict_entry(name, list(loc), val=1, draw=True)
+        dense_bricksdict[key] = create_bricksdict_entry(name, list(loc), val=1, draw=True)
+    return plain_bricksdict, dense_bricksdict
+
+
+def test_keys_match_plain_dict():
+    plain_bricksdict, dense_bricksdict = get_bricksdicts()
+    assert sorted(dense_bricksdict) == sorted(plain_bricksdict)
+    assert len(dense_bricksdict) == len(plain_bricksdict)
+    for x in range(-1, 5):
+        for y in range(-1, 4):
+            for z in range(-1, 7):
+                key = list_to_str((x, y, z))
+                assert (key in dense_bricksdict) == (key in plain_bricksdict)
+                assert dense_bricksdict.exists_at(x, y, z) == (key in plain_bricksdict)
+    assert "not,a,key" not in dense_bricksdict
+    # deleted keys are removed from both
+    key = next(iter(plain_bricksdict))
+    del plain_bricksdict[key]
+    del dense_bricksdict[key]
+    assert sorted(dense_bricksdict) == sorted(plain_bricksdict)
+
+
+def test_parent_and_name_match_plain_dict():
+    plain_bricksdict, dense_bricksdict = get_bricksdicts(seed=1)
+    rng = random.Random(1)
+    keys = list(plain_bricksdict)
+    for key in keys:
+        parent = rng.choice([None, "self", rng.choice(keys)])
+        name = rng.choice([plain_bricksdict[key]["name"], "custom_%(key)s" % locals()])
+        for bricksdict in (plain_bricksdict, dense_bricksdict):
+            bricksdict[key]["parent"] = parent
+            bricksdict[key]["name"] = name
+    for key in keys:
+        assert dense_bricksdict[key]["parent"] == plain_bricksdict[key]["parent"]
+        assert dense_bricksdict[key]["name"] == plain_bricksdict[key]["name"]
+        assert dense_bricksdict[key]["loc"] == plain_bricksdict[key]["loc"]
+    assert dense_bricksdict.to_dict() == plain_bricksdict
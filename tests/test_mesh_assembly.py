@@ -0,0 +1,59 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import numpy as np
+
+# Blender imports
+import bpy
+from mathutils import Euler, Vector
+
+# Module imports
+from ..functions.mesh_assembly import *
+
+
+def get_test_mesh(name="bricker_test_mesh"):
+    """ returns new mesh with a single quad """
+    m = bpy.data.meshes.new(name)
+    m.from_pydata([(0, 0, 0), (1, 0, 0), (1, 2, 0), (0, 2, 3)], [], [(0, 1, 2, 3)])
+    m.update()
+    return m
+
+
+def test_random_rotation_falls_back_to_assembler():
+    assert isinstance(get_mesh_collector("INSTANCE_VARIANTS", False, 0), MeshInstancer)
+    assert isinstance(get_mesh_collector("INSTANCE_VARIANTS", False, 0.5), MeshAssembler)
+    assert isinstance(get_mesh_collector("INSTANCE_VARIANTS", True, 0), MeshAssembler)
+    assert isinstance(get_mesh_collector("NONE", False, 0), MeshAssembler)
+
+
+def test_rotated_instance_vertices():
+    template = get_test_mesh()
+    rot_matrix = Euler((0.3, -0.2, 1.1)).to_matrix().to_4x4()
+    loc = Vector((4, -1, 2))
+    all_meshes = get_mesh_collector("INSTANCE_VARIANTS", False, 0.5)
+    all_meshes.add(template, rot_matrix, loc)
+    all_meshes.add(template, None, loc)
+    m = bpy.data.meshes.new("bricker_test_combined")
+    try:
+        all_meshes.to_mesh(m)
+        co = np.array([v.co for v in m.vertices])
+        expected = [rot_matrix.to_3x3() @ v.co + loc for v in template.vertices] + [v.co + loc for v in template.vertices]
+        assert np.allclose(co, np.array(expected), atol=1e-5)
+    finally:
+        bpy.data.meshes.remove(m)
+        bpy.data.meshes.remove(template)
@@ -0,0 +1,112 @@
+# Copyright (C) 2020 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import math
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Module imports
+from ..functions.bricksdict.generate import get_smoke_sample_weights, sum_smoke_samples
+
+
+def get_sample_range(loc, s_idx, res_per_loc, quality, clamp):
+    """ get density grid voxels sampled along one axis for lattice location 'loc' (as in the per-voxel loop 'get_brick_matrix_smoke' replaced) """
+    loc0 = loc - s_idx
+    rn = [int(res_per_loc * loc0), int(res_per_loc * (loc0 + 1))]
+    if clamp:
+        rn[0] = max(0, rn[0])
+    rn[1] += 1 if rn[1] == rn[0] else 0
+    return range(rn[0], rn[1], math.ceil((rn[1] - rn[0]) / quality))
+
+
+def get_smoke_sums_per_voxel(grids, shape, s_idx, e_idx, domain_res, quality, clamp=True):
+    """ sum smoke grid samples at each lattice location one voxel at a time (reference for the vectorized sampler) """
+    sums = np.zeros((len(grids),) + shape)
+    counts = np.zeros(shape)
+    res_per_loc = [domain_res[i] / (e_idx[i] - s_idx[i]) for i in range(3)]
+    flat_grids = [grid.ravel() for grid in grids]
+    locs = [[loc for loc in range(int(s_idx[i]), int(e_idx[i])) if 0 <= loc < shape[i]] for i in range(3)]
+    for x in locs[0]:
+        for y in locs[1]:
+            for z in locs[2]:
+                for x1 in get_sample_range(x, s_idx[0], res_per_loc[0], quality, clamp):
+                    for y1 in get_sample_range(y, s_idx[1], res_per_loc[1], quality, clamp):
+                        for z1 in get_sample_range(z, s_idx[2], res_per_loc[2], quality, clamp):
+                            cur_idx = (z1 * domain_res[1] + y1) * domain_res[0] + x1
+                            for i, flat_grid in enumerate(flat_grids):
+                                sums[i, x, y, z] += flat_grid[cur_idx]
+                            counts[x, y, z] += 1
+    return sums, counts
+
+
+def get_smoke_sums_vectorized(grids, shape, s_idx, e_idx, domain_res, quality):
+    weights = [get_smoke_sample_weights(s_idx[i], e_idx[i], domain_res[i] / (e_idx[i] - s_idx[i]), domain_res[i], shape[i], quality) for i in range(3)]
+    sums = np.array([sum_smoke_samples(grid, weights) for grid in grids])
+    counts = np.einsum("a,b,c->abc", *(w.sum(axis=1) for w in weights))
+    return sums, counts
+
+
+def get_random_smoke_grids(domain_res, seed):
+    """ returns random density, flame, flame squared and density weighted color grids (indexed by z, y, x) """
+    rng = np.random.RandomState(seed)
+    grid_shape = tuple(domain_res[::-1])
+    density_grid = rng.uniform(0, 1, grid_shape) * (rng.uniform(0, 1, grid_shape) < 0.6)
+    flame_grid = rng.uniform(0, 1, grid_shape) * (rng.uniform(0, 1, grid_shape) < 0.3)
+    color_grid = rng.uniform(0, 1, grid_shape + (4,))
+    return [density_grid, flame_grid, flame_grid ** 2] + [density_grid * color_grid[..., i] for i in range(3)]
+
+
+def test_sampler_matches_per_voxel_loop():
+    for seed in range(12):
+        rng = np.random.RandomState(seed)
+        domain_res = rng.randint(2, 14, 3).tolist()
+        shape = tuple(rng.randint(2, 9, 3).tolist())
+        quality = rng.choice([1, 0.5, 0.25])
+        grids = get_random_smoke_grids(domain_res, seed)
+        if seed % 2 == 0:
+            # full domain
+            s_idx, e_idx = (0, 0, 0), shape
+        else:
+            # adaptive domain partially outside the lattice
+            s_idx = tuple(rng.uniform(-2, 1.5, 3).tolist())
+            e_idx = tuple((np.array(shape) + rng.uniform(-1.5, 2, 3)).tolist())
+        sums, counts = get_smoke_sums_vectorized(grids, shape, s_idx, e_idx, domain_res, quality)
+        expected_sums, expected_counts = get_smoke_sums_per_voxel(grids, shape, s_idx, e_idx, domain_res, quality)
+        assert np.array_equal(counts, expected_counts)
+        assert np.allclose(sums, expected_sums)
+
+
+def test_sampler_clamps_low_index_edge():
+    # adaptive domain starting 0.6 lattice locations into location 2 with 4 voxels per location, so location 2 starts sampling 2.4 voxels before the grid
+    domain_res = [20, 20, 20]
+    shape = (8, 8, 8)
+    s_idx = (2.6, 0, 0)
+    e_idx = (7.6, 5, 5)
+    quality = 1
+    assert get_sample_range(2, s_idx[0], 4, quality, clamp=False).start < 0
+    grids = get_random_smoke_grids(domain_res, seed=0)
+    sums, counts = get_smoke_sums_vectorized(grids, shape, s_idx, e_idx, domain_res, quality)
+    expected_sums, expected_counts = get_smoke_sums_per_voxel(grids, shape, s_idx, e_idx, domain_res, quality, clamp=True)
+    assert np.array_equal(counts, expected_counts)
+    assert np.allclose(sums, expected_sums)
+    # the per-voxel loop wrapped negative indices around to the far end of the grid instead
+    unclamped_sums, _ = get_smoke_sums_per_voxel(grids, shape, s_idx, e_idx, domain_res, quality, clamp=False)
+    assert not np.allclose(unclamped_sums[:, 2], sums[:, 2])
+    assert np.allclose(unclamped_sums[:, 3:], sums[:, 3:])
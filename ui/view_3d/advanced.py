@@ -105,8 +105,10 @@ class VIEW3D_PT_bricker_ray_casting(BrickerPanel, Panel):
 
         col = layout.column(align=True)
         col.prop(cm, "insideness_ray_cast_dir", text="")
+        col.prop(cm, "voxelize_method", text="")
 
         col = layout.column(align=True)
         right_align(col)
         col.prop(cm, "use_normals")
         col.prop(cm, "calc_internals")
+        col.prop(cm, "incremental_updates")
@@ -65,6 +65,9 @@ class VIEW3D_PT_bricker_animation(BrickerPanel, Panel):
         col.prop(cm, "start_frame", text="Frame Start")
         col.prop(cm, "stop_frame", text="End")
         col.prop(cm, "step_frame", text="Step")
+        col = layout.column(align=True)
+        col.active = cm.animated or cm.use_animation
+        col.prop(cm, "temporal_coherence")
         if cm.animated:
             col = layout.column(align=True)
             col.enabled = False
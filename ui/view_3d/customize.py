@@ -51,6 +51,8 @@ class VIEW3D_PT_bricker_customize(BrickerPanel, Panel):
             return False
         if cm.last_instance_method == "POINT_CLOUD":
             return False
+        if cm.last_instance_method == "INSTANCE_VARIANTS" and not cm.last_split_model:
+            return False
         return True
 
     def draw(self, context):
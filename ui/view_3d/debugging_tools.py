@@ -28,7 +28,8 @@ from bpy.props import *
 from ..created_model_uilist import *
 from ..matslot_uilist import *
 from ..panel_info import *
-from ...lib.caches import cache_exists
+from ...lib.caches import cache_exists, bricker_mesh_cache, bricker_source_mesh_cache, bricker_rgba_vals_cache
+from ...lib.undo_stack import UndoStack
 from ...operators.revert_settings import *
 from ...operators.brickify import *
 from ...functions import *
@@ -54,6 +55,8 @@ class VIEW3D_PT_bricker_debugging_tools(BrickerPanel, Panel):
         col = layout.column(align=True)
         row = col.row(align=True)
         row.operator("bricker.clear_cache", text="Clear Cache", icon="CON_TRANSFORM_CACHE")
+        row = col.row(align=True)
+        row.operator("bricker.benchmark_bfm_cache", icon="TIME")
 
         source_name = cm.source_obj.name if cm.source_obj else ""
         layout.operator("bricker.generate_brick", icon="MOD_BUILD")
@@ -122,6 +125,19 @@ class VIEW3D_PT_bricker_matrix_details(BrickerPanel, Panel):
             layout.label(text="Matrix not cached!")
             return
 
+        col = layout.column(align=True)
+        col.label(text="Cache Usage:")
+        for name, cache in (("Brick Meshes", bricker_mesh_cache), ("Source Meshes", bricker_source_mesh_cache), ("Colors", bricker_rgba_vals_cache)):
+            mb_used = round(cache.num_bytes / 1048576, 1)
+            mb_max = round(cache.max_bytes / 1048576) if cache.max_bytes > 0 else "inf"
+            col.label(text="%(name)s: %(num)s (%(used)s/%(max)s MB)" % {"name": name, "num": len(cache), "used": mb_used, "max": mb_max})
+            col.label(text="    hits %(hits)s, misses %(misses)s, evictions %(evictions)s" % {"hits": cache.hits, "misses": cache.misses, "evictions": cache.evictions})
+        undo_stack = UndoStack.instance
+        if undo_stack is not None:
+            for name, stack_type in (("Undo", "undo"), ("Redo", "redo")):
+                mb_used = round(undo_stack.get_memory_usage(stack_type) / 1048576, 1)
+                col.label(text="%(name)s Steps: %(num)s (%(used)s MB)" % {"name": name, "num": len(getattr(undo_stack, stack_type)), "used": mb_used})
+
         col1 = layout.column(align=True)
         row = col1.row(align=True)
         row.prop(cm, "active_key", text="")
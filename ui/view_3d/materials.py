@@ -100,6 +100,7 @@ class VIEW3D_PT_bricker_materials(BrickerPanel, Panel):
                col = row.column()
                col.prop(cm, "blur_radius")
                col.prop(cm, "color_depth")
+               col.prop(cm, "max_rgb_materials")
                col.enabled = False
                col.label(text="Unavailable in Demo Version")
             if cm.color_snap == "ABS":